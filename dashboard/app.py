@@ -12,6 +12,7 @@ import time
 from datetime import datetime, timedelta
 import json
 import asyncio
+from collections import deque
 
 # 페이지 설정
 st.set_page_config(
@@ -116,6 +117,36 @@ def get_user_stats(user_id):
     except requests.exceptions.RequestException:
         return None
 
+def get_users_stats(user_ids=None):
+    """여러 사용자 통계 일괄 조회 (None 이면 오늘 활성 사용자 전체)
+
+    사용자 ID -> 통계 딕셔너리를 반환하며 요청 한 번으로 조회합니다.
+    """
+    try:
+        response = requests.post(f"{API_BASE_URL}/stats/batch", json={"user_ids": user_ids}, timeout=5)
+        if response.status_code == 200:
+            return {stats["user_id"]: stats for stats in response.json().get("users", [])}
+        else:
+            return {}
+    except requests.exceptions.RequestException:
+        return {}
+
+def iter_usage_events():
+    """GET /stream/usage (Server-Sent Events) 구독
+
+    서버가 주기마다 보내는 사용량 변화량 이벤트를 하나씩 반환합니다. 연결이
+    끊기면 조용히 종료하며, 다음 화면 실행 때 다시 연결합니다.
+    """
+    try:
+        with requests.get(f"{API_BASE_URL}/stream/usage", stream=True, timeout=(5, 30)) as response:
+            if response.status_code != 200:
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: "):])
+    except requests.exceptions.RequestException:
+        return
+
 def get_token_info(text="안녕하세요"):
     """토큰 계산 테스트"""
     try:
@@ -159,11 +190,10 @@ st.markdown('<h1 class="main-header">🇰🇷 Korean Token Limiter Dashboard</h1
 with st.sidebar:
     st.header("⚡ 실시간 상태")
 
-    # 자동 새로고침 설정
-    auto_refresh = st.checkbox("자동 새로고침 (5초)", value=True)
-    if auto_refresh:
-        time.sleep(0.1)  # 작은 지연으로 새로고침 효과
-        st.rerun()
+    # 실시간 스트림 (서버 푸시, 폴링/재실행 없음)
+    auto_refresh = st.checkbox("실시간 스트림", value=True,
+                               help="서버가 보내는 사용량 이벤트(/stream/usage)로 갱신합니다")
+    sidebar_live = st.empty()
 
     # 시스템 상태
     health = get_system_health()
@@ -259,6 +289,8 @@ with tab1:
             {"엔드포인트": "/v1/chat/completions", "상태": "✅", "설명": "채팅 완성 API"},
             {"엔드포인트": "/v1/completions", "상태": "✅", "설명": "텍스트 완성 API"},
             {"엔드포인트": "/stats/{user_id}", "상태": "✅", "설명": "사용자 통계"},
+            {"엔드포인트": "/stats/batch", "상태": "✅", "설명": "사용자 통계 일괄 조회"},
+            {"엔드포인트": "/stream/usage", "상태": "✅", "설명": "실시간 사용량 스트림 (SSE)"},
             {"엔드포인트": "/token-info", "상태": "✅", "설명": "토큰 계산"}
         ]
         st.dataframe(pd.DataFrame(endpoints), hide_index=True)
@@ -272,18 +304,17 @@ with tab2:
     if user_list.get("total_count", 0) > 0:
         st.subheader(f"총 {user_list['total_count']}명의 사용자")
 
-        # 사용자별 통계 수집
+        # 사용자별 통계 수집 (일괄 조회 한 번)
         user_stats_list = []
+        user_entries = [
+            (user_info.get("user_id"), user_info.get("display_name", user_info.get("user_id")))
+            if isinstance(user_info, dict) else (user_info, user_info)
+            for user_info in user_list.get("users", [])
+        ]
+        all_stats = get_users_stats([user_id for user_id, _ in user_entries])
 
-        for user_info in user_list.get("users", []):
-            if isinstance(user_info, dict):
-                user_id = user_info.get("user_id")
-                display_name = user_info.get("display_name", user_id)
-            else:
-                user_id = user_info
-                display_name = user_id
-
-            stats = get_user_stats(user_id)
+        for user_id, display_name in user_entries:
+            stats = all_stats.get(user_id)
             if stats:
                 user_stats_list.append({
                     "사용자 ID": user_id,
@@ -475,10 +506,11 @@ with tab3:
 with tab4:
     st.header("📈 실시간 모니터링")
 
-    # 자동 새로고침
-    if st.checkbox("실시간 업데이트 (5초 간격)", value=False, key="monitoring_refresh"):
-        time.sleep(5)
-        st.rerun()
+    # 실시간 사용량 (사이드바의 실시간 스트림이 켜져 있으면 서버 푸시로 갱신)
+    st.subheader("📡 최근 60초 사용량")
+    live_placeholder = st.empty()
+    if not auto_refresh:
+        live_placeholder.info("사이드바에서 '실시간 스트림'을 켜면 사용량이 실시간으로 표시됩니다.")
 
     # 시스템 상태 모니터링
     st.subheader("🖥️ 시스템 상태")
@@ -508,19 +540,12 @@ with tab4:
 
     user_list = get_user_list()
     if user_list.get("users"):
-        # 활성 사용자 찾기
+        # 활성 사용자 찾기 (오늘 사용 기록이 있는 사용자만 일괄 조회)
         active_users = []
 
-        for user_info in user_list["users"]:
-            if isinstance(user_info, dict):
-                user_id = user_info.get("user_id")
-                display_name = user_info.get("display_name", user_id)
-            else:
-                user_id = user_info
-                display_name = user_id
-
-            stats = get_user_stats(user_id)
-            if stats and (stats.get("requests_this_minute", 0) > 0 or stats.get("tokens_this_minute", 0) > 0):
+        for user_id, stats in get_users_stats().items():
+            display_name = stats.get("display_name", user_id)
+            if (stats.get("requests_this_minute", 0) > 0 or stats.get("tokens_this_minute", 0) > 0):
                 active_users.append({
                     "사용자": display_name,
                     "분당 요청": stats.get("requests_this_minute", 0),
@@ -601,6 +626,8 @@ with tab5:
             "POST /v1/chat/completions",
             "POST /v1/completions",
             "GET /stats/{user_id}",
+            "POST /stats/batch",
+            "GET /stream/usage",
             "GET /token-info",
             "GET /admin/users",
             "GET /models"
@@ -610,13 +637,15 @@ with tab5:
             "채팅 형태 AI 응답 생성",
             "텍스트 완성 AI 응답 생성",
             "사용자별 사용량 통계",
+            "여러 사용자 통계 일괄 조회",
+            "실시간 사용량 스트림 (SSE)",
             "텍스트 토큰 수 계산",
             "전체 사용자 목록",
             "사용 가능한 모델 목록"
         ],
         "인증": [
             "불필요", "API 키 필요", "API 키 필요",
-            "불필요", "불필요", "불필요", "불필요"
+            "불필요", "불필요", "불필요", "불필요", "불필요", "불필요"
         ]
     }
 
@@ -658,4 +687,51 @@ st.markdown("""
     🇰🇷 Korean Token Limiter Dashboard v1.0<br>
     실시간 모니터링 및 관리 시스템
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# 실시간 스트림 수신 (화면을 모두 그린 뒤 placeholder 만 갱신)
+def render_live_usage(events):
+    """최근 60초 이벤트를 합산해 사용자별 토큰/요청/429 와 사유별 거부 표시"""
+    users = {}
+    reasons = {}
+    for event in events:
+        for user_id, delta in event.get("users", {}).items():
+            total = users.setdefault(user_id, {"토큰": 0, "요청": 0, "429": 0})
+            total["토큰"] += delta.get("tokens", 0)
+            total["요청"] += delta.get("requests", 0)
+            total["429"] += delta.get("rejections", 0)
+        for reason, count in event.get("rejections", {}).get("by_reason", {}).items():
+            reasons[reason] = reasons.get(reason, 0) + count
+    latest = events[-1] if events else {}
+    queue = latest.get("queue") or {}
+
+    with live_placeholder.container():
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("토큰 (60초)", f"{sum(u['토큰'] for u in users.values()):,}")
+        col2.metric("요청 (60초)", f"{sum(u['요청'] for u in users.values()):,}")
+        col3.metric("429 (60초)", f"{sum(u['429'] for u in users.values()):,}")
+        col4.metric("대기 중 요청", queue.get("waiting", 0))
+
+        if users:
+            rows = [{"사용자": user_id, **total} for user_id, total in users.items()]
+            df = pd.DataFrame(rows).sort_values("토큰", ascending=False)
+            st.dataframe(df, hide_index=True, use_container_width=True)
+        else:
+            st.info("최근 60초 동안 사용 기록이 없습니다.")
+        if reasons:
+            st.dataframe(pd.DataFrame({"거부 사유": list(reasons), "횟수": list(reasons.values())}),
+                         hide_index=True, use_container_width=True)
+
+    sidebar_live.caption(
+        f"📡 {datetime.fromtimestamp(latest.get('timestamp', time.time())).strftime('%H:%M:%S')} · "
+        f"활성 사용자 {len(users)}명 · 처리 중 {queue.get('in_flight', 0)}"
+    )
+
+if auto_refresh:
+    live_events = deque()
+    for usage_event in iter_usage_events():
+        live_events.append(usage_event)
+        while live_events and live_events[0].get("timestamp", 0) < usage_event.get("timestamp", 0) - 60:
+            live_events.popleft()
+        render_live_usage(live_events)
+    sidebar_live.warning("📡 실시간 스트림 연결 끊김 (새로고침 시 재연결)")
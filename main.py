@@ -4,6 +4,7 @@ Korean Llama Token Limiter - 모델명 문제 수정
 """
 
 import asyncio
+import contextlib
 import json
 import time
 import logging
@@ -14,12 +15,13 @@ import urllib.parse
 try:
     import uvicorn
     from fastapi import FastAPI, Request, HTTPException
-    from fastapi.responses import JSONResponse
+    from fastapi.responses import JSONResponse, Response, StreamingResponse
     from fastapi.middleware.cors import CORSMiddleware
     import httpx
+    import yaml
 except ImportError as e:
     print(f"❌ 필수 패키지 누락: {e}")
-    print("pip install fastapi uvicorn httpx 를 실행하세요.")
+    print("pip install fastapi uvicorn httpx pyyaml 를 실행하세요.")
     sys.exit(1)
 
 # 로깅 설정
@@ -29,6 +31,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+from src.core.cleanup_scheduler import CleanupScheduler
+from src.core.storage_health import StorageHealthChecker
+from src.core.config_index import ConfigValidationError, UsersConfigReloader, build_default_limits
+from src.core.cooldown_cache import RedisCooldownBus
+from src.core.load_controller import LoadController, UpstreamGate
+from src.core.near_cache import NearCache
+from src.core.usage_buffer import UsageBuffer
+from src.core.rate_limiter import ALGORITHM_FIXED_WINDOW, KoreanRateLimiter
+from src.proxy.upstream_pool import UpstreamPool
+from src.proxy.micro_batcher import MicroBatcher
+from src.utils.metrics import metrics
+from src.utils.tracing import tracer, record_span
+from src.utils.usage_stream import UsageStream
+
+
+def load_yaml_config(path: str = "config/korean_model.yaml") -> dict:
+    """YAML 설정 로드 (파일이 없으면 빈 설정)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"⚠️ YAML 설정 파일 로드 실패: {e}")
+        return {}
+
+
+USERS_CONFIG_PATH = "config/korean_users.yaml"
+MODEL_CONFIG = load_yaml_config()
+USERS_CONFIG = load_yaml_config(USERS_CONFIG_PATH)
+
+# Prometheus 메트릭 (monitoring.enable_metrics)
+_monitoring_config = MODEL_CONFIG.get('monitoring') or {}
+metrics.configure(
+    enabled=bool(_monitoring_config.get('enable_metrics', False)),
+    max_user_labels=int(_monitoring_config.get('max_user_labels', 100)),
+    max_group_labels=int(_monitoring_config.get('max_group_labels', 100))
+)
+
+# 요청 단계 추적 (monitoring.tracing)
+_tracing_config = _monitoring_config.get('tracing') or {}
+tracer.configure(
+    server_timing=bool(_tracing_config.get('server_timing', False)),
+    sample_rate=float(_tracing_config.get('sample_rate', 0.0)),
+    slow_threshold_ms=float(_tracing_config.get('slow_threshold_ms', 1000)),
+    buffer_size=int(_tracing_config.get('buffer_size', 200))
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    """단계 지연을 메트릭과 현재 요청 트레이스에 기록"""
+    metrics.observe_stage(stage, seconds)
+    record_span(stage, seconds)
+
+
+def add_token_metrics(user_id: str, usage: dict):
+    """응답 usage 의 토큰을 사용자/소속 그룹 레이블로 기록"""
+    metrics.add_tokens(user_id, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                       rate_limiter.index.user_groups.get(user_id, ()))
+
 # FastAPI 앱 생성
 app = FastAPI(
     title="🇰🇷 Korean Token Limiter",
@@ -47,6 +109,39 @@ app.add_middleware(
 # 전역 변수로 실제 모델명 저장
 ACTUAL_MODEL_NAME = None
 
+# vLLM 서버 주소 (LLM_SERVER_URL 환경 변수 > llm_server.url > 기본값)
+VLLM_BASE_URL = (
+    os.getenv("LLM_SERVER_URL")
+    or (MODEL_CONFIG.get('llm_server') or {}).get('url')
+    or "http://localhost:8000"
+).rstrip('/')
+
+# 다중 vLLM 백엔드 풀 (llm_server.backends 에 2개 이상 설정된 경우에만 사용)
+upstream_pool = UpstreamPool.from_config(MODEL_CONFIG.get('llm_server') or {})
+
+# 고부하 제어기 (special_events.high_load) 와 업스트림 동시 요청 게이트 (performance.max_concurrent_requests)
+_performance_config = MODEL_CONFIG.get('performance') or {}
+load_controller = LoadController.from_config(
+    (USERS_CONFIG.get('special_events') or {}).get('high_load'),
+    _performance_config,
+    USERS_CONFIG.get('performance_thresholds')
+)
+_max_concurrent = int(_performance_config.get('max_concurrent_requests') or 0)
+upstream_gate = UpstreamGate(
+    _max_concurrent,
+    controller=load_controller,
+    on_wait=lambda seconds: observe_stage('queue_wait', seconds)
+) if _max_concurrent > 0 else None
+
+
+def upstream_slot():
+    """업스트림 호출 슬롯 (게이트 미설정 시 즉시 통과, 고부하 제어기에는 진행 중 요청/지연 반영)"""
+    if upstream_gate:
+        return upstream_gate.slot()
+    if load_controller:
+        return load_controller.track()
+    return contextlib.nullcontext()
+
 
 class SimpleTokenCounter:
     """간단한 토큰 카운터"""
@@ -76,147 +171,156 @@ class SimpleTokenCounter:
         return total + 4  # 대화 오버헤드
 
 
-class SimpleRateLimiter:
-    """간단한 속도 제한기"""
-
-    def __init__(self):
-        self.users = {}
-        self.default_limits = {
-            'rpm': 30,
-            'tpm': 5000,
-            'daily': 500000
-        }
-
-        # 사용자별 API 키 매핑 (한국어 -> 영어 변환)
-        self.api_keys = {
-            'sk-user1-korean-key-def': 'user1',
-            'sk-user2-korean-key-ghi': 'user2',
-            'sk-dev1-korean-key-789': 'developer1',
-            'sk-test-korean-key-stu': 'test',
-            'sk-guest-korean-key-vwx': 'guest'
-        }
-
-        # 영어 -> 한국어 매핑 (표시용)
-        self.user_display_names = {
-            'user1': '사용자1',
-            'user2': '사용자2',
-            'developer1': '개발자1',
-            'test': '테스트',
-            'guest': '게스트'
-        }
+def create_storage(storage_config: dict):
+    """storage.type 에 따라 저장소 생성 (STORAGE_TYPE / REDIS_URL / REDIS_CLUSTER / SQLITE_PATH / MEMORY_SNAPSHOT_PATH 환경 변수 우선)"""
+    # 설정이 없으면 이전 버전과 같이 프로세스 내 저장소 (외부 서버 불필요)
+    storage_type = (os.getenv("STORAGE_TYPE") or storage_config.get('type') or 'memory').lower()
+    if storage_type == 'sqlite':
+        from src.storage.sqlite_storage import SQLiteStorage
+        retention = storage_config.get('retention') or {}
+        return SQLiteStorage(
+            os.getenv("SQLITE_PATH") or storage_config.get('sqlite_path', 'korean_usage.db'),
+            usage_retention_days=retention.get('usage_days', 7),
+            history_retention_days=retention.get('history_days', 7),
+            history_per_user=retention.get('history_per_user', 1000),
+            cleanup_chunk_size=retention.get('cleanup_chunk_size', 500),
+            vacuum_on_upgrade=bool(storage_config.get('sqlite_vacuum_on_upgrade', False))
+        )
+    if storage_type == 'memory':
+        from src.storage.memory_storage import MemoryStorage
+        memory_config = storage_config.get('memory') or {}
+        return MemoryStorage(
+            snapshot_path=os.getenv("MEMORY_SNAPSHOT_PATH") or memory_config.get('snapshot_path'),
+            snapshot_interval=float(memory_config.get('snapshot_interval', 10)),
+            history_per_user=(storage_config.get('retention') or {}).get('history_per_user', 1000)
+        )
+    if storage_type == 'redis':
+        from src.storage.redis_storage import RedisStorage
+        history = storage_config.get('redis_history') or {}
+        cluster = storage_config.get('redis_cluster') or {}
+        pool = storage_config.get('redis_pool') or {}
+        cluster_env = os.getenv("REDIS_CLUSTER")
+        return RedisStorage(
+            os.getenv("REDIS_URL") or storage_config.get('redis_url', 'redis://localhost:6379'),
+            history_shards=int(history.get('shards', 8)),
+            history_maxlen=int(history.get('maxlen', 100000)),
+            history_scan_limit=int(history.get('scan_limit', 20000)),
+            history_retention_days=(storage_config.get('retention') or {}).get('history_days', 7),
+            cluster=(cluster_env.lower() in ('1', 'true', 'yes') if cluster_env
+                     else bool(cluster.get('enabled', False))),
+            aggregate_shards=cluster.get('aggregate_shards'),
+            max_connections=int(pool.get('max_connections', 64)),
+            socket_timeout=float(pool.get('socket_timeout_ms', 250)) / 1000,
+            connect_timeout=float(pool.get('connect_timeout_ms', 500)) / 1000,
+            pool_timeout=float(pool.get('pool_timeout_ms', 100)) / 1000,
+            retries=int(pool.get('retries', 2)),
+            backoff_base=float(pool.get('backoff_base_ms', 5)) / 1000,
+            backoff_cap=float(pool.get('backoff_cap_ms', 50)) / 1000,
+            idle_check_interval=float(pool.get('idle_check_interval', 30))
+        )
+    raise ValueError(f"지원하지 않는 저장소 타입: {storage_type}")
 
-    def get_user_from_api_key(self, api_key: str) -> str:
-        """API 키에서 사용자 ID 추출 (ASCII 안전)"""
-        return self.api_keys.get(api_key, 'guest')
-
-    def get_display_name(self, user_id: str) -> str:
-        """사용자 표시명 조회"""
-        return self.user_display_names.get(user_id, user_id)
-
-    def check_limits(self, user_id: str, tokens: int) -> tuple:
-        """사용량 제한 확인"""
-        now = time.time()
-
-        if user_id not in self.users:
-            self.users[user_id] = {
-                'requests_minute': [],
-                'tokens_minute': [],
-                'tokens_daily': [],
-                'total_requests': 0,
-                'total_tokens': 0
-            }
 
-        user_data = self.users[user_id]
+# 전역 인스턴스
+token_counter = SimpleTokenCounter()
 
-        # 1분 이내 데이터만 유지
-        minute_ago = now - 60
-        user_data['requests_minute'] = [t for t in user_data['requests_minute'] if t > minute_ago]
-        user_data['tokens_minute'] = [t for t in user_data['tokens_minute'] if t[0] > minute_ago]
+_storage_config = MODEL_CONFIG.get('storage') or {}
+storage = create_storage(_storage_config)
 
-        # 하루 이내 데이터만 유지
-        day_ago = now - 86400
-        user_data['tokens_daily'] = [t for t in user_data['tokens_daily'] if t[0] > day_ago]
+rate_limiter = KoreanRateLimiter(
+    storage,
+    algorithm=(MODEL_CONFIG.get('rate_limiting') or {}).get('algorithm', ALGORITHM_FIXED_WINDOW)
+)
+rate_limiter.set_default_limits(build_default_limits(MODEL_CONFIG.get('default_limits')))
+rate_limiter.set_load_controller(load_controller)
+rate_limiter.set_near_cache(NearCache.from_config(storage, _storage_config.get('near_cache')))
+rate_limiter.set_usage_buffer(UsageBuffer.from_config(storage, _storage_config.get('write_behind')))
+
+# 저장소 장애 감지 (장애 중에는 storage.degradation.mode 에 따라 로컬 판정/허용/거절)
+storage_health = StorageHealthChecker.from_config(storage, _storage_config.get('degradation'))
+rate_limiter.set_storage_health(storage_health)
+
+# korean_users.yaml -> API 키/사용자/그룹 인덱스 (변경 시 검증 후 교체)
+config_reloader = UsersConfigReloader(
+    USERS_CONFIG_PATH,
+    rate_limiter,
+    poll_interval=float(_performance_config.get('config_reload_interval', 5))
+)
 
-        # 현재 사용량 계산
-        current_rpm = len(user_data['requests_minute'])
-        current_tpm = sum(t[1] for t in user_data['tokens_minute'])
-        current_daily = sum(t[1] for t in user_data['tokens_daily'])
+# 만료 데이터 정리 (회당 시간 예산 안에서 조금씩)
+cleanup_scheduler = CleanupScheduler(
+    rate_limiter.cleanup_expired_data,
+    interval=float(_performance_config.get('cleanup_interval', 300)),
+    time_budget=float(_performance_config.get('cleanup_time_budget_ms', 50)) / 1000
+)
+try:
+    config_reloader.load()
+except FileNotFoundError:
+    logger.warning(f"⚠️ {USERS_CONFIG_PATH} 없음 - 기본 제한만 적용")
 
-        # 제한 확인
-        if current_rpm >= self.default_limits['rpm']:
-            return False, f"분당 요청 제한 초과 ({self.default_limits['rpm']}개)"
+# 등록되지 않은 API 키와 사용자 헤더가 없는 요청에 적용할 사용자
+GUEST_USER_ID = "guest"
 
-        if current_tpm + tokens > self.default_limits['tpm']:
-            return False, f"분당 토큰 제한 초과 ({self.default_limits['tpm']}개)"
 
-        if current_daily + tokens > self.default_limits['daily']:
-            return False, f"일일 토큰 제한 초과 ({self.default_limits['daily']}개)"
 
-        return True, None
+def _queue_stats() -> dict:
+    """실시간 스트림에 싣는 대기열/업스트림 상태"""
+    stats = {}
+    if upstream_gate:
+        stats.update(upstream_gate.get_stats())
+    if load_controller:
+        stats['load_percent'] = round(load_controller.load_percent, 1)
+        stats['limit_multiplier'] = rate_limiter.get_limit_multiplier()
+    return stats
 
-    def record_usage(self, user_id: str, tokens: int):
-        """사용량 기록"""
-        now = time.time()
 
-        if user_id not in self.users:
-            self.users[user_id] = {
-                'requests_minute': [],
-                'tokens_minute': [],
-                'tokens_daily': [],
-                'total_requests': 0,
-                'total_tokens': 0
-            }
+# 대시보드용 실시간 사용량 스트림 (monitoring.usage_stream)
+usage_stream = UsageStream.from_config(
+    _monitoring_config.get('usage_stream'),
+    groups_of=rate_limiter.get_user_groups,
+    stats_fn=_queue_stats
+)
+if usage_stream:
+    metrics.rejection_listener = usage_stream.count_reason
 
-        user_data = self.users[user_id]
-        user_data['requests_minute'].append(now)
-        user_data['tokens_minute'].append((now, tokens))
-        user_data['tokens_daily'].append((now, tokens))
-        user_data['total_requests'] += 1
-        user_data['total_tokens'] += tokens
-
-    def get_user_stats(self, user_id: str) -> dict:
-        """사용자 통계 조회"""
-        # 한국어 사용자 ID 처리
-        if user_id in self.user_display_names.values():
-            # 한국어 -> 영어 변환
-            for eng_id, kor_name in self.user_display_names.items():
-                if kor_name == user_id:
-                    user_id = eng_id
-                    break
-
-        if user_id not in self.users:
-            return {
-                'user_id': user_id,
-                'display_name': self.get_display_name(user_id),
-                'requests_this_minute': 0,
-                'tokens_this_minute': 0,
-                'tokens_today': 0,
-                'total_requests': 0,
-                'total_tokens': 0,
-                'limits': self.default_limits
-            }
 
-        now = time.time()
-        minute_ago = now - 60
-        day_ago = now - 86400
+async def post_completion(payload: dict) -> httpx.Response:
+    """vLLM completion API 호출 (업스트림 풀 설정 시 풀 사용)"""
+    async with upstream_slot():
+        start = time.perf_counter()
+        try:
+            if upstream_pool:
+                return await upstream_pool.post(
+                    "/v1/completions",
+                    payload,
+                    hedge=upstream_pool.is_hedge_eligible(payload)
+                )
 
-        user_data = self.users[user_id]
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                return await client.post(
+                    f"{VLLM_BASE_URL}/v1/completions",
+                    json=payload
+                )
+        finally:
+            # 비스트리밍 호출은 첫 토큰 시점 = 전체 응답 시점
+            observe_stage('upstream_ttft', time.perf_counter() - start)
 
-        return {
-            'user_id': user_id,
-            'display_name': self.get_display_name(user_id),
-            'requests_this_minute': len([t for t in user_data['requests_minute'] if t > minute_ago]),
-            'tokens_this_minute': sum(t[1] for t in user_data['tokens_minute'] if t[0] > minute_ago),
-            'tokens_today': sum(t[1] for t in user_data['tokens_daily'] if t[0] > day_ago),
-            'total_requests': user_data['total_requests'],
-            'total_tokens': user_data['total_tokens'],
-            'limits': self.default_limits
-        }
 
+# 비스트리밍 completion 마이크로 배처 (performance.micro_batching.enabled 시에만 사용)
+micro_batcher = MicroBatcher.from_config(
+    (MODEL_CONFIG.get('performance') or {}).get('micro_batching') or {},
+    post_completion,
+    token_counter=token_counter.count_tokens
+)
 
-# 전역 인스턴스
-token_counter = SimpleTokenCounter()
-rate_limiter = SimpleRateLimiter()
+if upstream_pool:
+    metrics.register_stats('korean_limiter_upstream_pool', upstream_pool.get_stats)
+if micro_batcher:
+    metrics.register_stats('korean_limiter_micro_batch', micro_batcher.get_stats)
+if load_controller:
+    metrics.register_stats('korean_limiter_load', load_controller.get_stats)
+if upstream_gate:
+    metrics.register_stats('korean_limiter_upstream_gate', upstream_gate.get_stats)
 
 
 async def get_vllm_model_name():
@@ -228,7 +332,7 @@ async def get_vllm_model_name():
 
     try:
         async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get("http://localhost:8000/v1/models")
+            response = await client.get(f"{VLLM_BASE_URL}/v1/models")
 
             if response.status_code == 200:
                 models_data = response.json()
@@ -245,7 +349,7 @@ async def get_vllm_model_name():
         try:
             async with httpx.AsyncClient(timeout=5.0) as client:
                 test_response = await client.post(
-                    "http://localhost:8000/v1/completions",
+                    f"{VLLM_BASE_URL}/v1/completions",
                     json={
                         "model": model,
                         "prompt": "test",
@@ -270,14 +374,14 @@ def extract_user_id(request: Request) -> str:
     auth_header = request.headers.get("authorization", "")
     if auth_header.startswith("Bearer "):
         api_key = auth_header[7:]
-        return rate_limiter.get_user_from_api_key(api_key)
+        return rate_limiter.get_user_from_api_key(api_key) or GUEST_USER_ID
 
     # X-User-ID 헤더
     user_id = request.headers.get("x-user-id")
     if user_id:
         return user_id
 
-    return "guest"
+    return GUEST_USER_ID
 
 
 def convert_to_completion_format(messages):
@@ -309,7 +413,9 @@ async def token_limit_middleware(request: Request, call_next):
     if not any(path in request.url.path for path in ["/v1/chat/completions", "/v1/completions"]):
         return await call_next(request)
 
+    request_start = time.perf_counter()
     user_id = extract_user_id(request)
+    trace = tracer.start(request.url.path, user_id)
 
     # 요청 본문 읽기
     body = await request.body()
@@ -317,12 +423,15 @@ async def token_limit_middleware(request: Request, call_next):
     try:
         request_data = json.loads(body) if body else {}
     except json.JSONDecodeError:
-        return JSONResponse(
+        response = JSONResponse(
             status_code=400,
             content={"error": "잘못된 JSON 형식입니다"}
         )
+        tracer.finish(trace, response)
+        return response
 
     # 토큰 계산
+    tokenize_start = time.perf_counter()
     estimated_tokens = 0
     if 'messages' in request_data:
         estimated_tokens = token_counter.count_messages_tokens(request_data['messages'])
@@ -330,13 +439,20 @@ async def token_limit_middleware(request: Request, call_next):
         estimated_tokens = token_counter.count_tokens(str(request_data['prompt']))
 
     estimated_tokens += request_data.get('max_tokens', 100)
+    limiter_start = time.perf_counter()
+    observe_stage('tokenization', limiter_start - tokenize_start)
 
     # 제한 확인
-    allowed, reason = rate_limiter.check_limits(user_id, estimated_tokens)
+    allowed, reason = await rate_limiter.check_limit(user_id, estimated_tokens)
 
     if not allowed:
+        observe_stage('limiter', time.perf_counter() - limiter_start)
+        if load_controller and load_controller.active and load_controller.message:
+            reason = f"{reason} - {load_controller.message}"
         logger.warning(f"Rate limit exceeded for user '{user_id}': {reason}")
-        return JSONResponse(
+        if usage_stream:
+            usage_stream.count_rejection(user_id)
+        response = JSONResponse(
             status_code=429,
             content={
                 "error": {
@@ -347,9 +463,14 @@ async def token_limit_middleware(request: Request, call_next):
                 }
             }
         )
+        tracer.finish(trace, response)
+        return response
 
     # 사용량 기록
-    rate_limiter.record_usage(user_id, estimated_tokens)
+    await rate_limiter.record_usage(user_id, estimated_tokens, 0)
+    if usage_stream:
+        usage_stream.record(user_id, estimated_tokens)
+    observe_stage('limiter', time.perf_counter() - limiter_start)
 
     # 요청 본문 복원
     async def receive():
@@ -364,6 +485,8 @@ async def token_limit_middleware(request: Request, call_next):
     safe_user_id = urllib.parse.quote(user_id.encode('utf-8'))
     response.headers["X-User-ID"] = safe_user_id
 
+    metrics.observe_stage('total', time.perf_counter() - request_start)
+    tracer.finish(trace, response)
     return response
 
 
@@ -398,11 +521,7 @@ async def chat_completions_proxy(request: Request):
         logger.info(f"🔄 vLLM 요청: 모델={actual_model}, 사용자={user_id}")
 
         # vLLM completion API 호출
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            llm_response = await client.post(
-                "http://localhost:8000/v1/completions",
-                json=completion_request
-            )
+        llm_response = await post_completion(completion_request)
 
         if llm_response.status_code != 200:
             error_detail = llm_response.text
@@ -442,6 +561,9 @@ async def chat_completions_proxy(request: Request):
                 })
             }
 
+            usage = chat_response["usage"]
+            add_token_metrics(user_id, usage)
+
             logger.info(f"✅ 응답 생성 완료: 사용자={user_id}, 길이={len(generated_text)}")
             return JSONResponse(content=chat_response)
         else:
@@ -478,6 +600,14 @@ async def completions_proxy(request: Request):
         actual_model = await get_vllm_model_name()
         request_data["model"] = actual_model
 
+        # 배치 가능한 요청은 마이크로 배처를 통해 전송
+        if micro_batcher and micro_batcher.is_batchable(request_data):
+            status_code, response_content = await micro_batcher.submit(request_data, user_id)
+            if status_code == 200:
+                usage = response_content.get("usage", {})
+                add_token_metrics(user_id, usage)
+            return JSONResponse(content=response_content, status_code=status_code)
+
         # 수정된 요청 데이터
         modified_body = json.dumps(request_data).encode('utf-8')
 
@@ -487,17 +617,27 @@ async def completions_proxy(request: Request):
         headers["content-length"] = str(len(modified_body))
 
         # vLLM 서버로 요청 전달
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            llm_response = await client.post(
-                "http://localhost:8000/v1/completions",
-                content=modified_body,
-                headers=headers
-            )
+        if upstream_pool and not request_data.get("stream"):
+            llm_response = await post_completion(request_data)
+        else:
+            async with upstream_slot():
+                upstream_start = time.perf_counter()
+                async with httpx.AsyncClient(timeout=30.0) as client:
+                    llm_response = await client.post(
+                        f"{VLLM_BASE_URL}/v1/completions",
+                        content=modified_body,
+                        headers=headers
+                    )
+                observe_stage('upstream_ttft', time.perf_counter() - upstream_start)
 
         # 응답 반환
         response_content = llm_response.json() if llm_response.headers.get("content-type", "").startswith(
             "application/json") else llm_response.text
 
+        if isinstance(response_content, dict) and "usage" in response_content:
+            usage = response_content["usage"] or {}
+            add_token_metrics(user_id, usage)
+
         return JSONResponse(
             content=response_content,
             status_code=llm_response.status_code,
@@ -525,7 +665,7 @@ async def health_check():
     try:
         # vLLM 서버 확인
         async with httpx.AsyncClient(timeout=5.0) as client:
-            vllm_response = await client.get("http://localhost:8000/health")
+            vllm_response = await client.get(f"{VLLM_BASE_URL}/health")
             vllm_status = vllm_response.status_code == 200
 
         # 실제 모델명 조회
@@ -535,7 +675,7 @@ async def health_check():
         vllm_status = False
         actual_model = "unknown"
 
-    return {
+    health = {
         "status": "healthy",
         "vllm_server": "connected" if vllm_status else "disconnected",
         "model": "korean-llama",
@@ -545,6 +685,28 @@ async def health_check():
         "timestamp": time.time()
     }
 
+    if upstream_pool:
+        health["upstream_pool"] = upstream_pool.get_stats()
+    if micro_batcher:
+        health["micro_batching"] = micro_batcher.get_stats()
+    if upstream_gate:
+        health["upstream_gate"] = upstream_gate.get_stats()
+    if load_controller:
+        health["high_load"] = load_controller.get_stats()
+    if rate_limiter.near_cache:
+        health["near_cache"] = rate_limiter.near_cache.get_stats()
+    if rate_limiter.usage_buffer:
+        health["write_behind"] = rate_limiter.usage_buffer.get_stats()
+    if usage_stream:
+        health["usage_stream"] = usage_stream.get_stats()
+    health["users_config"] = config_reloader.get_status()
+    health["cleanup"] = cleanup_scheduler.get_status()
+    if storage_health:
+        health["storage_health"] = storage_health.get_status()
+    health["api_keys"] = rate_limiter.index.api_keys.get_stats()
+
+    return health
+
 
 @app.get("/models")
 async def list_models():
@@ -566,14 +728,71 @@ async def list_models():
         return {"error": f"모델 목록 조회 실패: {str(e)}"}
 
 
+def format_user_stats(status: dict) -> dict:
+    """get_user_status 결과를 대시보드 호환 형식으로 변환"""
+    usage = status.get('usage', {})
+    stats = {
+        'user_id': status['user_id'],
+        'display_name': status['user_id'],
+        'description': status['limits'].get('description', ''),
+        'requests_this_minute': usage.get('requests_this_minute', 0),
+        'tokens_this_minute': usage.get('tokens_this_minute', 0),
+        'tokens_this_hour': usage.get('tokens_this_hour', 0),
+        'tokens_today': usage.get('tokens_today', 0),
+        'total_requests': usage.get('total_requests', 0),
+        'total_tokens': usage.get('total_tokens', 0),
+        'limits': status['limits'],
+        'remaining': status['remaining'],
+        'cooldown': status['cooldown'],
+        'status_summary': status['status_summary']
+    }
+    if 'groups' in status:
+        stats['groups'] = status['groups']
+    return stats
+
+
 @app.get("/stats/{user_id}")
 async def get_user_stats(user_id: str):
-    """사용자 통계 조회"""
+    """사용자 통계 조회 (대시보드 호환 형식)"""
     try:
         # URL 디코딩
         user_id = urllib.parse.unquote(user_id)
-        stats = rate_limiter.get_user_stats(user_id)
-        return stats
+        status = await rate_limiter.get_user_status(user_id)
+        if 'error' in status:
+            raise HTTPException(status_code=500, detail=status['error'])
+        return format_user_stats(status)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"통계 조회 실패: {str(e)}")
+
+
+@app.post("/stats/batch")
+async def get_users_stats(request: Request):
+    """여러 사용자 통계 일괄 조회
+
+    본문 {"user_ids": [...]} 또는 목록 (생략 또는 null 이면 오늘 활성 사용자 전체).
+    저장소 왕복 한 번(Redis 파이프라인 / SQLite JOIN 쿼리)으로 조회합니다.
+    """
+    try:
+        body = await request.body()
+        payload = json.loads(body) if body else {}
+        user_ids = payload.get('user_ids') if isinstance(payload, dict) else payload
+        if user_ids is not None and (not isinstance(user_ids, list)
+                                     or not all(isinstance(user_id, str) for user_id in user_ids)):
+            raise HTTPException(status_code=400, detail="user_ids 는 문자열 목록이어야 합니다")
+
+        statuses = await rate_limiter.get_users_status(user_ids)
+        users = [format_user_stats(status) for status in statuses]
+        return {
+            "users": users,
+            "total_count": len(users),
+            "timestamp": time.time()
+        }
+    except HTTPException:
+        raise
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="잘못된 JSON 형식입니다")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"통계 조회 실패: {str(e)}")
 
@@ -594,14 +813,15 @@ async def get_token_info(text: str = "안녕하세요! 한국어 토큰 계산 
 
 @app.get("/admin/users")
 async def list_users():
-    """사용자 목록 조회"""
+    """사용자 목록 조회 (설정된 사용자 + 사용 기록이 있는 사용자)"""
     try:
-        users_with_display = []
-        for user_id in rate_limiter.users.keys():
-            users_with_display.append({
-                "user_id": user_id,
-                "display_name": rate_limiter.get_display_name(user_id)
-            })
+        user_ids = list(rate_limiter.index.user_limits)
+        user_ids.extend(await storage.get_all_users())
+
+        users_with_display = [
+            {"user_id": user_id, "display_name": user_id}
+            for user_id in dict.fromkeys(user_ids)
+        ]
 
         return {
             "users": users_with_display,
@@ -611,6 +831,123 @@ async def list_users():
         raise HTTPException(status_code=500, detail=f"사용자 목록 조회 실패: {str(e)}")
 
 
+@app.post("/admin/reload-config")
+async def reload_users_config():
+    """korean_users.yaml 다시 로드 (검증 실패 시 기존 설정 유지)"""
+    try:
+        return {"status": "reloaded", **await config_reloader.reload()}
+    except ConfigValidationError as e:
+        raise HTTPException(status_code=400, detail={"message": "설정 검증 실패", "errors": e.errors})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"설정 로드 실패: {str(e)}")
+
+
+@app.get("/stream/usage")
+async def stream_usage():
+    """실시간 사용량 변화량 (Server-Sent Events, monitoring.usage_stream.interval_seconds 주기)"""
+    if not usage_stream:
+        raise HTTPException(status_code=404, detail="실시간 스트림이 비활성화되어 있습니다 (monitoring.usage_stream)")
+    return StreamingResponse(
+        usage_stream.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/admin/traces")
+async def get_slow_traces(limit: int = 100):
+    """샘플링된 느린 요청 트레이스 조회"""
+    return {
+        "enabled": tracer.enabled,
+        "sample_rate": tracer.sample_rate,
+        "slow_threshold_ms": tracer.slow_threshold * 1000,
+        "traces": tracer.dump(limit)
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 메트릭"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="메트릭이 비활성화되어 있습니다 (monitoring.enable_metrics)")
+
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+
+# Redis 가 시작 시 없으면 이전 키 변환/쿨다운 전파를 다시 시도하는 태스크
+redis_startup_task = None
+_redis_migrated = False
+
+
+async def start_redis_services() -> bool:
+    """(Redis) 이전 키 변환과 워커 간 쿨다운 전파 시작 (끝난 단계는 건너뜀, 실패 시 False)"""
+    global _redis_migrated
+    try:
+        if not _redis_migrated:
+            await storage.migrate_legacy_keys()
+            _redis_migrated = True
+        if rate_limiter.cooldown_bus is None:
+            bus = RedisCooldownBus(storage.redis)
+            try:
+                await rate_limiter.set_cooldown_bus(bus)
+            except Exception:
+                with contextlib.suppress(Exception):
+                    await bus.close()
+                raise
+        return True
+    except Exception as e:
+        logger.debug(f"Redis startup services failed: {e}")
+        return False
+
+
+async def retry_redis_services(max_delay: float = 30.0):
+    """Redis 가 복구될 때까지 백오프로 start_redis_services 재시도"""
+    delay = 1.0
+    while True:
+        await asyncio.sleep(delay)
+        if await start_redis_services():
+            logger.info("✅ Redis legacy key migration and cooldown bus started after retry")
+            return
+        delay = min(delay * 2, max_delay)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """설정 파일 감시, 데이터 정리, (Redis) 이전 키 변환과 워커 간 쿨다운 전파 시작"""
+    global redis_startup_task
+    config_reloader.start()
+    cleanup_scheduler.start()
+    if storage_health:
+        storage_health.start()
+    if getattr(storage, 'redis', None) is not None and not await start_redis_services():
+        # Redis 없이도 저하 모드로 시작하고, 변환/구독은 백그라운드에서 재시도
+        logger.warning("⚠️ Redis unavailable at startup; legacy key migration and cooldown bus "
+                       "will be retried in the background")
+        redis_startup_task = asyncio.create_task(retry_redis_services())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """종료 시 미기록 사용량 반영 및 업스트림/저장소 연결 정리"""
+    await config_reloader.stop()
+    await cleanup_scheduler.stop()
+    if redis_startup_task is not None and not redis_startup_task.done():
+        redis_startup_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await redis_startup_task
+    if storage_health:
+        await storage_health.stop()
+    if usage_stream:
+        await usage_stream.close()
+    if micro_batcher:
+        await micro_batcher.close()
+    await rate_limiter.close()
+    await storage.close()
+    if upstream_pool:
+        await upstream_pool.close()
+
+
 if __name__ == "__main__":
     print("🇰🇷 Korean Token Limiter 시작 중...")
 
@@ -0,0 +1,92 @@
+"""
+Salted-hash API key index with constant-time verification
+"""
+
+import hashlib
+import hmac
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+DIGEST_SIZE = 16
+PREFIX_SIZE = 6
+
+
+class ApiKeyIndex:
+    """솔트 해시 접두사 -> (해시 나머지, 사용자 ID) 인덱스
+
+    원본 키는 보관하지 않고 keyed BLAKE2b(16바이트) 해시만 저장합니다. 해시 앞
+    6바이트로 후보를 찾고 나머지를 hmac.compare_digest 로 후보 전체와 비교하므로
+    일치 위치에 따라 시간이 달라지지 않습니다. 접두사는 솔트 해시에서 나오므로
+    키 형식(예: 공통 접두사 'sk-')과 무관하게 후보가 고르게 나뉩니다.
+
+    확인 결과 캐시는 두지 않습니다. 원본 키를 캐시 키로 쓰면 평문이 메모리에 남고,
+    해시를 캐시 키로 쓰면 조회마다 해시를 이미 계산한 뒤라 아끼는 것이 dict 조회와
+    compare_digest 한 번뿐이기 때문입니다 (조회 전체가 수 µs).
+    """
+
+    def __init__(self, salt: Optional[bytes] = None):
+        self.salt = salt or os.urandom(16)
+        self._entries: Dict[bytes, Tuple[bytes, str]] = {}
+        self._collisions: Dict[bytes, Tuple[Tuple[bytes, str], ...]] = {}
+        self._count = 0
+        self.verifications = 0
+
+    @classmethod
+    def build(cls, keys: Iterable[Tuple[str, str]], **kwargs) -> 'ApiKeyIndex':
+        """(API 키, 사용자 ID) 목록으로 인덱스 생성"""
+        index = cls(**kwargs)
+        entries = index._entries
+        blake2b, salt = hashlib.blake2b, index.salt
+        for api_key, user_id in keys:
+            digest = blake2b(api_key.encode('utf-8'), key=salt, digest_size=DIGEST_SIZE).digest()
+            prefix = digest[:PREFIX_SIZE]
+            if prefix in entries:
+                # 드문 접두사 충돌/중복 키만 일반 경로로 처리
+                index.add(api_key, user_id)
+            else:
+                entries[prefix] = (digest[PREFIX_SIZE:], user_id)
+                index._count += 1
+        return index
+
+    def _digest(self, api_key: str) -> bytes:
+        return hashlib.blake2b(api_key.encode('utf-8'), key=self.salt, digest_size=DIGEST_SIZE).digest()
+
+    def _candidates(self, prefix: bytes) -> Tuple[Tuple[bytes, str], ...]:
+        entry = self._entries.get(prefix)
+        if entry is None:
+            return ()
+        return self._collisions.get(prefix) or (entry,)
+
+    def add(self, api_key: str, user_id: str):
+        """키 등록 (같은 키를 다시 등록하면 사용자만 교체)"""
+        digest = self._digest(api_key)
+        prefix, rest = digest[:PREFIX_SIZE], digest[PREFIX_SIZE:]
+        candidates = self._candidates(prefix)
+        kept = tuple(entry for entry in candidates if entry[0] != rest)
+        self._count += 1 + len(kept) - len(candidates)
+
+        # 대부분의 접두사는 후보가 하나이므로 튜플 하나만 저장
+        self._entries[prefix] = (rest, user_id)
+        if kept:
+            self._collisions[prefix] = kept + ((rest, user_id),)
+
+    def lookup(self, api_key: str) -> Optional[str]:
+        """등록된 키면 사용자 ID, 아니면 None"""
+        digest = self._digest(api_key)
+        self.verifications += 1
+        user_id = None
+        rest = digest[PREFIX_SIZE:]
+        for candidate, candidate_user in self._candidates(digest[:PREFIX_SIZE]):
+            # 일치해도 멈추지 않고 모든 후보 비교
+            if hmac.compare_digest(candidate, rest):
+                user_id = candidate_user
+        return user_id
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'keys': self._count,
+            'verifications': self.verifications
+        }
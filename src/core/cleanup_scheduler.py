@@ -0,0 +1,76 @@
+"""
+Background scheduler for time-budgeted storage cleanup
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CleanupScheduler:
+    """interval 초마다 만료 데이터 정리를 time_budget 초 이내로 실행
+
+    한 번에 끝나지 않으면 resume_delay 초 쉬었다가 이어서 정리하므로, 쌓인 정리
+    작업이 많아도 요청 처리와 기록이 한 번에 오래 막히지 않습니다.
+    """
+
+    def __init__(self, cleanup: Callable[[Optional[float]], Awaitable[bool]], interval: float = 300.0,
+                 time_budget: float = 0.05, resume_delay: float = 1.0):
+        self.cleanup = cleanup
+        self.interval = interval
+        self.time_budget = time_budget
+        self.resume_delay = resume_delay
+        self.runs = 0
+        self.pending = False
+        self.last_run_at = 0.0
+        self.last_duration = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> bool:
+        """정리 한 번 실행 (예산 안에 모두 끝나면 True)"""
+        start = time.perf_counter()
+        try:
+            done = await self.cleanup(self.time_budget)
+        except Exception as e:
+            logger.error(f"❌ Scheduled cleanup failed: {e}")
+            done = True
+        self.runs += 1
+        self.pending = not done
+        self.last_run_at = time.time()
+        self.last_duration = time.perf_counter() - start
+        return done
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            while not await self.run_once():
+                await asyncio.sleep(self.resume_delay)
+
+    def start(self):
+        """정리 주기 시작 (이벤트 루프 안에서 호출, interval <= 0 이면 비활성)"""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"✅ Storage cleanup every {self.interval}s "
+                        f"({self.time_budget * 1000:.0f}ms budget per run)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'interval': self.interval,
+            'time_budget_ms': self.time_budget * 1000,
+            'runs': self.runs,
+            'pending': self.pending,
+            'last_run_at': self.last_run_at,
+            'last_duration_ms': round(self.last_duration * 1000, 2)
+        }
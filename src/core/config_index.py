@@ -0,0 +1,280 @@
+"""
+Hot-reloadable limiter config index built from korean_users.yaml
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+import yaml
+
+from src.core.api_key_index import ApiKeyIndex
+from src.core.limit_schedule import LimitSchedule
+from src.core.rate_limiter import KoreanRateLimiter, LimiterIndex, UserLimits
+
+logger = logging.getLogger(__name__)
+
+# libyaml 이 있으면 C 로더 사용 (API 키 10만 개 규모에서 순수 Python 로더 대비 수 배 빠름)
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+LIMIT_FIELDS = ('rpm', 'tpm', 'tph', 'daily')
+
+
+class ConfigValidationError(ValueError):
+    """korean_users.yaml 검증 실패 (기존 설정은 그대로 유지)"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(f"설정 검증 실패 ({len(errors)}건): " + "; ".join(errors[:10]))
+
+
+def _check_limit_values(prefix: str, values: Dict[str, Any], fields: Tuple[str, ...],
+                        errors: List[str]):
+    for name in fields:
+        value = values.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            errors.append(f"{prefix}.{name}: 양의 정수여야 합니다 ({value!r})")
+
+
+def build_default_limits(limits_config: Optional[Dict[str, Any]]) -> UserLimits:
+    """korean_model.yaml 의 default_limits 검증 후 UserLimits 생성 (사용자/그룹과 같은 규칙)"""
+    limits_config = limits_config or {}
+    if not isinstance(limits_config, dict):
+        raise ConfigValidationError(["default_limits: 매핑이어야 합니다"])
+    errors: List[str] = []
+    unknown = set(limits_config) - set(LIMIT_FIELDS) - {'cooldown_minutes', 'description'}
+    for name in sorted(unknown):
+        errors.append(f"default_limits.{name}: 알 수 없는 항목입니다")
+    _check_limit_values("default_limits", limits_config, LIMIT_FIELDS, errors)
+    cooldown = limits_config.get('cooldown_minutes', UserLimits.cooldown_minutes)
+    if isinstance(cooldown, bool) or not isinstance(cooldown, int) or cooldown < 0:
+        errors.append(f"default_limits.cooldown_minutes: 0 이상의 정수여야 합니다 ({cooldown!r})")
+    if errors:
+        raise ConfigValidationError(errors)
+    return UserLimits(**limits_config)
+
+
+def read_api_keys_file(path: str, errors: List[str]) -> Iterator[Tuple[str, str]]:
+    """api_keys_file 읽기 (한 줄에 '<API 키> <사용자 ID>', # 주석 허용)
+
+    키가 많을 때 YAML 매핑보다 훨씬 빠르게 읽힙니다 (10만 개 기준 수십 ms).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                parts = line.split(None, 1)
+                if len(parts) != 2:
+                    errors.append(f"{path}:{line_no}: '<API 키> <사용자 ID>' 형식이 아닙니다")
+                    continue
+                yield parts[0], parts[1].strip()
+    except OSError as e:
+        errors.append(f"api_keys_file: {e}")
+
+
+def _key_label(position: int, api_key: str) -> str:
+    """오류/로그용 API 키 표시 (원본 대신 순번과 솔트 없는 해시 앞부분)"""
+    fingerprint = hashlib.blake2b(api_key.encode('utf-8'), digest_size=4).hexdigest()
+    return f"#{position} (hash {fingerprint})"
+
+
+def _iter_api_keys(users_config: Dict[str, Any], user_limits: Dict[str, UserLimits],
+                   errors: List[str]) -> Iterator[Tuple[str, str]]:
+    """api_keys 매핑과 api_keys_file 의 (키, 사용자) 검증 후 반환"""
+    sources = [iter((users_config.get('api_keys') or {}).items())]
+    keys_file = users_config.get('api_keys_file')
+    if keys_file:
+        sources.append(read_api_keys_file(keys_file, errors))
+
+    position = 0
+    for source in sources:
+        for api_key, user_id in source:
+            position += 1
+            if not isinstance(api_key, str) or not api_key:
+                errors.append(f"api_keys #{position}: 잘못된 API 키 (빈 값 또는 문자열이 아님)")
+            elif str(user_id) not in user_limits:
+                errors.append(f"api_keys {_key_label(position, api_key)}: 정의되지 않은 사용자 '{user_id}'")
+            else:
+                yield api_key, str(user_id)
+
+
+def build_limiter_index(users_config: Dict[str, Any], default_limits: UserLimits, version: int = 0
+                        ) -> Tuple[LimiterIndex, Optional[LimitSchedule]]:
+    """users / api_keys / groups / time_based_limits 를 검증하고 새 인덱스 생성
+
+    오류를 모두 모은 뒤 ConfigValidationError 로 한 번에 보고합니다.
+    """
+    errors: List[str] = []
+
+    users = users_config.get('users') or {}
+    if not isinstance(users, dict):
+        raise ConfigValidationError(["users: 사용자 ID -> 제한 매핑이어야 합니다"])
+
+    user_limits: Dict[str, UserLimits] = {}
+    for user_id, user_config in users.items():
+        user_config = user_config or {}
+        if not isinstance(user_config, dict):
+            errors.append(f"users.{user_id}: 매핑이어야 합니다")
+            continue
+        _check_limit_values(f"users.{user_id}", user_config, LIMIT_FIELDS, errors)
+        cooldown = user_config.get('cooldown_minutes', default_limits.cooldown_minutes)
+        if isinstance(cooldown, bool) or not isinstance(cooldown, int) or cooldown < 0:
+            errors.append(f"users.{user_id}.cooldown_minutes: 0 이상의 정수여야 합니다 ({cooldown!r})")
+        user_limits[str(user_id)] = UserLimits(
+            rpm=user_config.get('rpm', default_limits.rpm),
+            tpm=user_config.get('tpm', default_limits.tpm),
+            tph=user_config.get('tph', default_limits.tph),
+            daily=user_config.get('daily', default_limits.daily),
+            cooldown_minutes=cooldown,
+            description=str(user_config.get('description', ''))
+        )
+
+    # 원본 키는 솔트 해시로만 보관
+    api_keys = ApiKeyIndex.build(_iter_api_keys(users_config, user_limits, errors))
+
+    groups_config = users_config.get('groups') or {}
+    for group_id, group_config in groups_config.items():
+        shared = (group_config or {}).get('shared_limits')
+        if not shared:
+            continue
+        _check_limit_values(f"groups.{group_id}.shared_limits", shared, LIMIT_FIELDS, errors)
+        for user_id in group_config.get('users') or []:
+            if str(user_id) not in user_limits:
+                errors.append(f"groups.{group_id}.users: 정의되지 않은 사용자 '{user_id}'")
+    group_limits, group_members = KoreanRateLimiter._parse_groups(groups_config, default_limits)
+
+    schedule = None
+    try:
+        schedule = LimitSchedule.from_config(users_config.get('time_based_limits'))
+    except (KeyError, TypeError, ValueError) as e:
+        errors.append(f"time_based_limits: {e}")
+
+    if errors:
+        raise ConfigValidationError(errors)
+
+    index = LimiterIndex(
+        api_keys=api_keys,
+        user_limits=user_limits,
+        group_limits=group_limits,
+        group_members=group_members,
+        user_groups=KoreanRateLimiter._build_user_groups(group_members),
+        version=version
+    )
+    return index, schedule
+
+
+class UsersConfigReloader:
+    """korean_users.yaml 변경 시 새 인덱스를 검증해 제한기에 교체 적용
+
+    파일 읽기와 검증은 별도 스레드에서 수행하고, 이벤트 루프에서는 참조 교체만
+    합니다. 검증에 실패하면 기존 인덱스를 그대로 유지합니다.
+    """
+
+    def __init__(self, path: str, limiter: KoreanRateLimiter, poll_interval: float = 5.0):
+        self.path = path
+        self.limiter = limiter
+        self.poll_interval = poll_interval
+        self.version = 0
+        self.last_error: Optional[str] = None
+        self.last_loaded_at = 0.0
+        self._watch_paths: List[str] = [path]
+        self._mtime: Optional[Tuple[float, ...]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload_lock = asyncio.Lock()
+
+    def _stat(self) -> Optional[Tuple[float, ...]]:
+        """설정 파일과 api_keys_file 의 수정 시각 (설정 파일이 없으면 None)"""
+        mtimes = []
+        for path in self._watch_paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:
+                if path == self.path:
+                    return None
+                mtimes.append(0.0)
+        return tuple(mtimes)
+
+    def _build(self) -> Tuple[LimiterIndex, Optional[LimitSchedule], Optional[Tuple[float, ...]]]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            users_config = yaml.load(f, Loader=_YamlLoader) or {}
+        if not isinstance(users_config, dict):
+            raise ConfigValidationError(["최상위 항목이 매핑이 아닙니다"])
+        keys_file = users_config.get('api_keys_file')
+        self._watch_paths = [self.path] + ([keys_file] if keys_file else [])
+        mtime = self._stat()
+        index, schedule = build_limiter_index(users_config, self.limiter.default_limits, self.version + 1)
+        return index, schedule, mtime
+
+    def _apply(self, index: LimiterIndex, schedule: Optional[LimitSchedule],
+               mtime: Optional[Tuple[float, ...]]):
+        self.limiter.limit_schedule = schedule
+        self.limiter.apply_index(index)
+        self.version = index.version
+        self._mtime = mtime
+        self.last_error = None
+        self.last_loaded_at = time.time()
+
+    def load(self) -> LimiterIndex:
+        """시작 시 동기 로드 (검증 실패 시 예외)"""
+        index, schedule, mtime = self._build()
+        self._apply(index, schedule, mtime)
+        return index
+
+    async def reload(self) -> Dict[str, Any]:
+        """파일을 다시 읽어 검증 후 교체 (관리자 호출 또는 파일 변경 감지)"""
+        async with self._reload_lock:
+            try:
+                index, schedule, mtime = await asyncio.to_thread(self._build)
+            except Exception as e:
+                self.last_error = str(e)
+                # 같은 잘못된 파일을 반복 로드하지 않도록 mtime 은 기록
+                self._mtime = self._stat()
+                logger.error(f"❌ Korean users config reload rejected, keeping v{self.version}: {e}")
+                raise
+            self._apply(index, schedule, mtime)
+            return self.get_status()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            mtime = self._stat()
+            if mtime is None or mtime == self._mtime:
+                continue
+            try:
+                await self.reload()
+            except Exception:
+                pass
+
+    def start(self):
+        """파일 변경 감시 시작 (이벤트 루프 안에서 호출, poll_interval <= 0 이면 비활성)"""
+        if self._task is None and self.poll_interval > 0:
+            self._task = asyncio.create_task(self._watch())
+            logger.info(f"✅ Watching {self.path} for changes (every {self.poll_interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        index = self.limiter.index
+        return {
+            'path': self.path,
+            'version': self.version,
+            'users': len(index.user_limits),
+            'api_keys': len(index.api_keys),
+            'groups': len(index.group_limits),
+            'loaded_at': self.last_loaded_at,
+            'last_error': self.last_error
+        }
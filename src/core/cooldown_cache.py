@@ -0,0 +1,118 @@
+"""
+In-process cooldown map with optional Redis pub/sub invalidation across workers
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CooldownCache:
+    """사용자 -> cooldown_until 맵 (쿨다운 중인 사용자의 반복 요청을 I/O 없이 거절)
+
+    _apply_cooldown 과 저장소 조회 결과로 채워지며, 만료된 항목은 조회 시 또는
+    max_entries 초과 시 정리합니다.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._until: Dict[str, float] = {}
+        self.hits = 0
+
+    def get(self, user_id: str, now: Optional[float] = None) -> float:
+        """쿨다운 종료 시각 (쿨다운 중이 아니면 0)"""
+        until = self._until.get(user_id)
+        if until is None:
+            return 0.0
+        if now is None:
+            now = time.time()
+        if until <= now:
+            self._until.pop(user_id, None)
+            return 0.0
+        self.hits += 1
+        return until
+
+    def set(self, user_id: str, until: float):
+        if until <= time.time():
+            self._until.pop(user_id, None)
+            return
+        if len(self._until) >= self.max_entries and user_id not in self._until:
+            self.prune()
+        self._until[user_id] = until
+
+    def clear(self, user_id: str):
+        self._until.pop(user_id, None)
+
+    def prune(self):
+        """만료된 항목 정리"""
+        now = time.time()
+        self._until = {user_id: until for user_id, until in self._until.items() if until > now}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._until), 'hits': self.hits}
+
+
+class RedisCooldownBus:
+    """Redis pub/sub 으로 쿨다운 설정/해제를 다른 워커의 CooldownCache 에 전파"""
+
+    def __init__(self, redis_client, channel: str = "korean_cooldown"):
+        self.redis = redis_client
+        self.channel = channel
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+    async def start(self, cache: CooldownCache):
+        """구독 시작 (이벤트 루프 안에서 호출)"""
+        if self._task is not None:
+            return
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._task = asyncio.create_task(self._listen(cache))
+        logger.info(f"✅ Cooldown invalidation subscribed: {self.channel}")
+
+    async def _listen(self, cache: CooldownCache):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message is None or message.get('type') != 'message':
+                    continue
+                event = json.loads(message['data'])
+                if event.get('origin') == self.origin:
+                    continue
+                if event.get('until', 0) > 0:
+                    cache.set(event['user_id'], float(event['until']))
+                else:
+                    cache.clear(event['user_id'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Cooldown invalidation message failed: {e}")
+                await asyncio.sleep(1.0)
+
+    async def publish(self, user_id: str, until: float):
+        """쿨다운 설정(until > 0) 또는 해제(until = 0) 전파"""
+        try:
+            await self.redis.publish(self.channel, json.dumps(
+                {'user_id': user_id, 'until': until, 'origin': self.origin}, ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"⚠️ Cooldown invalidation publish failed for {user_id}: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+            self._pubsub = None
@@ -0,0 +1,119 @@
+"""
+Time-of-day limit multipliers (work_hours / night_hours)
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_hhmm(value: str) -> int:
+    """'HH:MM' 문자열을 자정 기준 분으로 변환"""
+    hour, minute = str(value).strip().split(':')
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour <= 24 and 0 <= minute < 60) or hour * 60 + minute > MINUTES_PER_DAY:
+        raise ValueError(f"잘못된 시간 형식: {value}")
+    return hour * 60 + minute
+
+
+class LimitSchedule:
+    """하루 1440분의 배수 테이블을 미리 계산해두고 경계 시각에만 현재 배수를 갱신
+
+    구간은 [start, end) 이며 end <= start 이면 자정을 넘는 구간(예: 22:00-06:00)
+    으로 처리합니다. 구간이 겹치면 배수를 곱합니다. 요청 경로에서는 다음 경계
+    시각과의 float 비교 한 번만 수행합니다.
+    """
+
+    def __init__(self, windows: List[Tuple[str, int, int, float]]):
+        self.windows = windows
+        self._table = [1.0] * MINUTES_PER_DAY
+        for _, start, end, multiplier in windows:
+            for minute in self._minutes(start, end):
+                self._table[minute % MINUTES_PER_DAY] *= multiplier
+
+        # 배수가 바뀌는 분 (경계)
+        self._boundaries = [
+            minute for minute in range(MINUTES_PER_DAY)
+            if self._table[minute] != self._table[minute - 1]
+        ]
+
+        self.multiplier = 1.0
+        self.active_windows: Tuple[str, ...] = ()
+        self._next_flip = 0.0
+
+    @staticmethod
+    def _minutes(start: int, end: int) -> range:
+        if end > start:
+            return range(start, end)
+        # 자정을 넘는 구간
+        return range(start, end + MINUTES_PER_DAY)
+
+    def _in_window(self, minute: int, start: int, end: int) -> bool:
+        if end > start:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    @classmethod
+    def from_config(cls, time_config: Optional[Dict[str, Any]]) -> Optional['LimitSchedule']:
+        """time_based_limits 설정에서 생성 (구간이 없으면 None)"""
+        windows = []
+        for name, window in (time_config or {}).items():
+            if not isinstance(window, dict) or window.get('enabled', True) is False:
+                continue
+            windows.append((
+                name,
+                parse_hhmm(window['start_time']),
+                parse_hhmm(window['end_time']) % MINUTES_PER_DAY,
+                float(window.get('multiplier', 1.0))
+            ))
+
+        if not windows:
+            return None
+
+        schedule = cls(windows)
+        logger.info(f"✅ Time-based limit schedule loaded: "
+                    f"{', '.join(f'{name} x{multiplier}' for name, _, _, multiplier in windows)}")
+        return schedule
+
+    def current(self, now: Optional[float] = None) -> float:
+        """현재 배수 (경계 시각을 지났을 때만 테이블 재조회)"""
+        if now is None:
+            now = time.time()
+        if now >= self._next_flip:
+            self._flip(now)
+        return self.multiplier
+
+    def _flip(self, now: float):
+        dt = datetime.fromtimestamp(now)
+        minute = dt.hour * 60 + dt.minute
+
+        multiplier = self._table[minute]
+        self.multiplier = multiplier
+        self.active_windows = tuple(
+            name for name, start, end, _ in self.windows if self._in_window(minute, start, end)
+        )
+
+        # 다음 경계까지 남은 분 계산 (경계가 없으면 하루 뒤 재확인)
+        upcoming = [b for b in self._boundaries if b > minute]
+        next_minute = upcoming[0] if upcoming else (
+            self._boundaries[0] + MINUTES_PER_DAY if self._boundaries else minute + MINUTES_PER_DAY
+        )
+        minute_start = int(now) - dt.second
+        self._next_flip = minute_start + (next_minute - minute) * 60
+
+        logger.debug(f"🕒 Limit multiplier x{multiplier} ({', '.join(self.active_windows) or 'default'}), "
+                     f"next change at {datetime.fromtimestamp(self._next_flip):%H:%M}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """현재 배수 상태"""
+        multiplier = self.current()
+        return {
+            'multiplier': multiplier,
+            'active_windows': list(self.active_windows),
+            'next_change_at': self._next_flip
+        }
@@ -0,0 +1,224 @@
+"""
+High-load feedback controller and upstream concurrency gate
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamGate:
+    """업스트림 동시 요청 수 제한 (performance.max_concurrent_requests)
+
+    게이트 대기 시간은 queue_wait 단계로, 게이트 안에서 보낸 시간은 업스트림
+    지연으로 LoadController 에 전달됩니다.
+    """
+
+    def __init__(self, max_concurrent: int, controller: Optional['LoadController'] = None,
+                 on_wait=None):
+        self.max_concurrent = max_concurrent
+        self.controller = controller
+        self.on_wait = on_wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        """업스트림 호출 한 건의 슬롯 획득 (async with gate.slot(): ...)"""
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+        entered_at = time.perf_counter()
+        waited = entered_at - start
+        self.total_wait_seconds += waited
+        if self.on_wait:
+            self.on_wait(waited)
+        if self.controller:
+            self.controller.update(self.in_flight, self.waiting)
+
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            if self.controller:
+                self.controller.observe_latency(time.perf_counter() - entered_at)
+                self.controller.update(self.in_flight, self.waiting)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'total_wait_seconds': round(self.total_wait_seconds, 3)
+        }
+
+
+class LoadController:
+    """special_events.high_load 피드백 제어기
+
+    진행 중 요청 수, 대기열 길이, 업스트림 지연(EWMA)을 각각 용량 대비 비율로
+    환산해 가장 높은 값을 부하율(%)로 사용합니다. 부하율이 trigger_threshold
+    이상이면 제한 배수를 reduced_multiplier 로 낮추고, release_threshold 미만으로
+    min_hold_seconds 이상 유지되어야 1.0 으로 복귀합니다 (히스테리시스).
+
+    지연 EWMA 는 마지막 표본 이후 경과 시간에 따라 latency_half_life 초마다 절반으로
+    줄어듭니다. 업스트림 호출이 멈춰도 복귀할 수 있도록, 고부하 상태에서 multiplier
+    를 읽을 때 마지막 갱신 후 REFRESH_INTERVAL 초가 지났으면 마지막으로 본 진행 중/
+    대기 수와 줄어든 EWMA 로 부하율을 다시 계산합니다.
+
+    제한기는 multiplier 속성 하나만 읽습니다. 값 교체는 단일 대입이라
+    요청 경로에서 잠금이 필요 없습니다.
+    """
+
+    REFRESH_INTERVAL = 1.0
+
+    def __init__(self, max_concurrent: int = 4, max_queue_size: int = 100,
+                 max_response_time: float = 5.0, trigger_threshold: float = 80,
+                 release_threshold: Optional[float] = None, reduced_multiplier: float = 0.7,
+                 min_hold_seconds: float = 10.0, latency_alpha: float = 0.2,
+                 latency_half_life: float = 5.0, message: str = ""):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue_size = max(1, max_queue_size)
+        self.max_response_time = max_response_time
+        self.trigger_threshold = trigger_threshold
+        self.release_threshold = (release_threshold if release_threshold is not None
+                                  else trigger_threshold * 0.75)
+        self.reduced_multiplier = reduced_multiplier
+        self.min_hold_seconds = min_hold_seconds
+        self.latency_alpha = latency_alpha
+        self.latency_half_life = latency_half_life
+        self.message = message
+
+        self._multiplier = 1.0
+        self.active = False
+        self.load_percent = 0.0
+        self.latency_ewma = 0.0
+        self.activations = 0
+        self.in_flight = 0  # track() 로 집계하는 진행 중 요청 수 (게이트가 없을 때)
+        self._last_change = 0.0
+        # 마지막 update 입력과 시각, EWMA 를 마지막으로 줄인 시각 (monotonic)
+        self._seen_in_flight = 0
+        self._seen_waiting = 0
+        self._last_update = 0.0
+        self._decayed_at = 0.0
+
+    @classmethod
+    def from_config(cls, high_load_config: Optional[Dict[str, Any]],
+                    performance_config: Optional[Dict[str, Any]] = None,
+                    thresholds: Optional[Dict[str, Any]] = None) -> Optional['LoadController']:
+        """special_events.high_load 설정에서 생성 (비활성화 시 None)"""
+        high_load_config = high_load_config or {}
+        if not high_load_config.get('enabled', False):
+            return None
+
+        performance_config = performance_config or {}
+        thresholds = thresholds or {}
+        controller = cls(
+            max_concurrent=int(performance_config.get('max_concurrent_requests') or 4),
+            max_queue_size=int(thresholds.get('max_queue_size', 100)),
+            max_response_time=float(thresholds.get('max_response_time', 5.0)),
+            trigger_threshold=float(high_load_config.get('trigger_threshold', 80)),
+            release_threshold=high_load_config.get('release_threshold'),
+            reduced_multiplier=float(high_load_config.get('reduced_multiplier', 0.7)),
+            min_hold_seconds=float(high_load_config.get('min_hold_seconds', 10)),
+            latency_half_life=float(high_load_config.get('latency_half_life_seconds', 5)),
+            message=high_load_config.get('message', '')
+        )
+        logger.info(f"✅ High-load controller enabled (trigger {controller.trigger_threshold}%, "
+                    f"release {controller.release_threshold}%, x{controller.reduced_multiplier})")
+        return controller
+
+    @asynccontextmanager
+    async def track(self):
+        """게이트 없이 업스트림 호출 한 건의 진행 중 요청 수와 지연을 반영 (대기열은 0)
+
+        performance.max_concurrent_requests 가 없어 UpstreamGate 를 만들지 않은
+        경우에도 고부하 제어가 동작하도록 프록시 경로에서 사용합니다.
+        """
+        self.in_flight += 1
+        self.update(self.in_flight, 0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.observe_latency(time.perf_counter() - start)
+            self.update(self.in_flight, 0)
+
+    @property
+    def multiplier(self) -> float:
+        """현재 제한 배수 (고부하 중이면 호출이 없어도 주기적으로 다시 판정)"""
+        if self.active:
+            now = time.monotonic()
+            if now - self._last_update >= self.REFRESH_INTERVAL:
+                self.update(self._seen_in_flight, self._seen_waiting, now)
+        return self._multiplier
+
+    def _decay(self, now: float):
+        """마지막 표본 이후 경과 시간만큼 지연 EWMA 감소"""
+        if self.latency_ewma and self.latency_half_life > 0 and now > self._decayed_at:
+            self.latency_ewma *= 0.5 ** ((now - self._decayed_at) / self.latency_half_life)
+        self._decayed_at = now
+
+    def observe_latency(self, seconds: float, now: Optional[float] = None):
+        """업스트림 지연 EWMA 갱신"""
+        if now is None:
+            now = time.monotonic()
+        self._decay(now)
+        if self.latency_ewma == 0.0:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += self.latency_alpha * (seconds - self.latency_ewma)
+
+    def update(self, in_flight: int, waiting: int, now: Optional[float] = None):
+        """현재 부하율 계산 및 배수 전환"""
+        if now is None:
+            now = time.monotonic()
+        self._seen_in_flight = in_flight
+        self._seen_waiting = waiting
+        self._last_update = now
+        self._decay(now)
+
+        self.load_percent = 100 * max(
+            in_flight / self.max_concurrent,
+            waiting / self.max_queue_size,
+            self.latency_ewma / self.max_response_time if self.max_response_time > 0 else 0.0
+        )
+
+        if not self.active:
+            if self.load_percent >= self.trigger_threshold:
+                self.active = True
+                self.activations += 1
+                self._last_change = now
+                self._multiplier = self.reduced_multiplier
+                logger.warning(f"⚠️ High load detected ({self.load_percent:.0f}%), "
+                               f"limits reduced x{self.reduced_multiplier}")
+        elif self.load_percent >= self.release_threshold:
+            # 임계값 근처에서 유지 중이면 복귀 대기 시간 재시작
+            self._last_change = now
+        elif now - self._last_change >= self.min_hold_seconds:
+            self.active = False
+            self._last_change = now
+            self._multiplier = 1.0
+            logger.info(f"✅ Load recovered ({self.load_percent:.0f}%), limits restored")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'active': self.active,
+            'multiplier': self.multiplier,
+            'load_percent': round(self.load_percent, 1),
+            'latency_ewma_ms': round(self.latency_ewma * 1000, 1),
+            'activations': self.activations
+        }
@@ -0,0 +1,190 @@
+"""
+Approximate local near-cache for rate limiting (leased budgets + batched flushes)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import logging
+
+from src.core.usage_buffer import UsageBuffer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Lease:
+    """저장소 조회 없이 로컬에서 소비할 수 있는 사용자별 예산"""
+    minute_bucket: int
+    expires_at: float
+    tokens: int
+    requests: int
+    used_tokens: int = 0
+    used_requests: int = 0
+
+
+class NearCache:
+    """근사 모드: 남은 할당량의 일부를 로컬 예산(lease)으로 받아 I/O 없이 판정
+
+    - 저장소에서 사용량을 읽어 모든 창(분/시간/일, 그룹 포함)의 남은 양이
+      strict_below 비율 이상이면 남은 양의 lease_fraction 만큼(상한
+      max_lease_tokens / max_lease_requests) 예산을 부여합니다.
+    - 예산이 남아 있고 lease_ttl 이 지나지 않았으며 같은 분 안이면 저장소 조회
+      없이 허용합니다. 사용량은 내부 UsageBuffer 에 (분 구간, 사용자) 별로
+      누적했다가 flush_interval_ms 마다 또는 flush_max_pending 건이 쌓이면
+      record_usage_many 한 번으로 기록합니다. 저장소 조회 결과에는 기록 중인
+      값까지 원래 구간(분/시간/일)에만 더합니다.
+    - 남은 양이 strict_below 미만이면 예산을 주지 않고 매 요청 저장소를 조회하는
+      엄격 모드로 동작합니다.
+
+    최악의 초과량: 워커(프로세스) 수를 W 라 할 때 사용자당 창마다
+    W x min(max_lease_tokens, lease_fraction x 남은 토큰) 토큰,
+    W x max_lease_requests 요청을 넘지 않습니다. 각 워커가 다른 워커의
+    미기록 사용량을 보지 못한 채 자기 예산을 모두 쓰는 경우이며, 한도의
+    strict_below 이하 구간에서는 예산을 주지 않으므로 한도 근처에서는 이
+    초과량이 발생하지 않습니다.
+    """
+
+    def __init__(self, storage, lease_fraction: float = 0.1, max_lease_tokens: int = 2000,
+                 max_lease_requests: int = 5, strict_below: float = 0.2,
+                 lease_ttl_seconds: float = 1.0, flush_interval_ms: float = 50,
+                 flush_max_pending: int = 256):
+        self.storage = storage
+        self.lease_fraction = lease_fraction
+        self.max_lease_tokens = max_lease_tokens
+        self.max_lease_requests = max_lease_requests
+        self.strict_below = strict_below
+        self.lease_ttl = lease_ttl_seconds
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_pending = flush_max_pending
+
+        self._leases: Dict[str, _Lease] = {}
+        self._buffer = UsageBuffer(storage, flush_interval_ms=flush_interval_ms,
+                                   flush_max_pending=flush_max_pending)
+
+        self.local_hits = 0
+        self.leases_granted = 0
+        self.storage_checks = 0
+
+    @classmethod
+    def from_config(cls, storage, near_cache_config: Optional[Dict[str, Any]]) -> Optional['NearCache']:
+        """storage.near_cache 설정에서 생성 (비활성화 시 None)"""
+        near_cache_config = near_cache_config or {}
+        if not near_cache_config.get('enabled', False):
+            return None
+        cache = cls(
+            storage,
+            lease_fraction=float(near_cache_config.get('lease_fraction', 0.1)),
+            max_lease_tokens=int(near_cache_config.get('max_lease_tokens', 2000)),
+            max_lease_requests=int(near_cache_config.get('max_lease_requests', 5)),
+            strict_below=float(near_cache_config.get('strict_below', 0.2)),
+            lease_ttl_seconds=float(near_cache_config.get('lease_ttl_seconds', 1.0)),
+            flush_interval_ms=float(near_cache_config.get('flush_interval_ms', 50)),
+            flush_max_pending=int(near_cache_config.get('flush_max_pending', 256))
+        )
+        logger.info(f"✅ Approximate near-cache enabled (lease {cache.lease_fraction:.0%}, "
+                    f"max {cache.max_lease_tokens} tokens / {cache.max_lease_requests} requests, "
+                    f"strict below {cache.strict_below:.0%})")
+        return cache
+
+    @staticmethod
+    def _minute_bucket(now: float) -> int:
+        return int(now // 60)
+
+    def try_consume(self, user_id: str, estimated_tokens: int, now: Optional[float] = None) -> bool:
+        """로컬 예산으로 허용 가능하면 예산을 차감하고 True"""
+        lease = self._leases.get(user_id)
+        if lease is None:
+            return False
+
+        if now is None:
+            now = time.time()
+        if (now >= lease.expires_at or self._minute_bucket(now) != lease.minute_bucket
+                or lease.used_tokens + estimated_tokens > lease.tokens
+                or lease.used_requests + 1 > lease.requests):
+            # 만료/소진된 예산은 버리고 저장소 경로로
+            del self._leases[user_id]
+            return False
+
+        lease.used_tokens += estimated_tokens
+        lease.used_requests += 1
+        self.local_hits += 1
+        return True
+
+    def merge_pending(self, user_id: str, group_ids: Sequence[str], usage: Dict[str, Any]) -> Dict[str, Any]:
+        """저장소 사용량에 아직 기록되지 않은 로컬 누적분(기록 중인 값 포함)을 구간별로 더함"""
+        self.storage_checks += 1
+        return self._buffer.merge_pending(user_id, group_ids, usage)
+
+    def grant_lease(self, user_id: str, windows: Iterable[Tuple[int, int, int, int]],
+                    estimated_tokens: int, now: Optional[float] = None) -> bool:
+        """저장소 경로에서 허용된 직후 다음 요청들을 위한 예산 부여
+
+        windows 는 (토큰 한도, 현재 토큰, 요청 한도, 현재 요청) 목록이며 요청
+        한도가 없는 창은 요청 항목을 0 으로 전달합니다.
+        """
+        if now is None:
+            now = time.time()
+
+        token_room = None
+        request_room = None
+        for token_limit, token_used, request_limit, request_used in windows:
+            remaining_tokens = token_limit - token_used - estimated_tokens
+            if token_limit <= 0 or remaining_tokens < token_limit * self.strict_below:
+                self._leases.pop(user_id, None)
+                return False
+            token_room = remaining_tokens if token_room is None else min(token_room, remaining_tokens)
+
+            if request_limit > 0:
+                remaining_requests = request_limit - request_used - 1
+                if remaining_requests < request_limit * self.strict_below:
+                    self._leases.pop(user_id, None)
+                    return False
+                request_room = (remaining_requests if request_room is None
+                                else min(request_room, remaining_requests))
+
+        lease_tokens = min(int((token_room or 0) * self.lease_fraction), self.max_lease_tokens)
+        lease_requests = min(int((request_room or 0) * self.lease_fraction), self.max_lease_requests)
+        if lease_tokens <= 0 or lease_requests <= 0:
+            self._leases.pop(user_id, None)
+            return False
+
+        self._leases[user_id] = _Lease(
+            minute_bucket=self._minute_bucket(now),
+            expires_at=now + self.lease_ttl,
+            tokens=lease_tokens,
+            requests=lease_requests
+        )
+        self.leases_granted += 1
+        return True
+
+    def drop_lease(self, user_id: str):
+        """예산 폐기 (쿨다운/초기화 시)"""
+        self._leases.pop(user_id, None)
+
+    def has_lease(self, user_id: str) -> bool:
+        return user_id in self._leases
+
+    def record(self, user_id: str, tokens: int, requests: int, group_ids: Sequence[str] = ()):
+        """사용량을 로컬에 누적 (주기적으로 저장소에 일괄 기록)"""
+        self._buffer.record(user_id, tokens, requests, group_ids)
+
+    async def flush(self):
+        """누적 사용량을 저장소에 일괄 기록 (동시에 하나만 진행, 실패 시 다음 주기에 재시도)"""
+        await self._buffer.flush()
+
+    async def close(self):
+        """플러시 태스크 종료 및 남은 사용량 기록"""
+        await self._buffer.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        buffer_stats = self._buffer.get_stats()
+        return {
+            'active_leases': len(self._leases),
+            'pending_users': buffer_stats['pending_users'],
+            'local_hits': self.local_hits,
+            'storage_checks': self.storage_checks,
+            'leases_granted': self.leases_granted,
+            'flushes': buffer_stats['flushes'],
+            'flush_errors': buffer_stats['flush_errors']
+        }
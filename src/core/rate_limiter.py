@@ -4,11 +4,17 @@ Rate limiter for Korean token usage control
 
 import time
 import asyncio
-from typing import Dict, Optional, Tuple, List
-from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple, List
+from dataclasses import dataclass, asdict, field, replace
 from enum import Enum
 import logging
 
+from src.core.api_key_index import ApiKeyIndex
+from src.core.cooldown_cache import CooldownCache
+from src.core.limit_schedule import LimitSchedule
+from src.storage.base import UsageStorage
+from src.utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,90 +51,473 @@ class UsageInfo:
     cooldown_until: float = 0
 
 
+@dataclass(frozen=True)
+class LimiterIndex:
+    """요청 경로에서 읽는 설정 인덱스 (korean_users.yaml 에서 생성)
+    
+    제한기는 인덱스 참조 하나만 들고 있으며, 설정 변경은 새 인덱스를 만든 뒤
+    참조를 한 번에 교체합니다. 요청은 시작 시점의 인덱스를 끝까지 사용하므로
+    잠금 없이도 교체 도중의 반쯤 바뀐 설정을 보지 않습니다.
+    """
+    api_keys: ApiKeyIndex = field(default_factory=ApiKeyIndex)  # API 키 해시 -> 사용자 ID
+    user_limits: Dict[str, UserLimits] = field(default_factory=dict)  # 사용자 ID -> 제한
+    group_limits: Dict[str, UserLimits] = field(default_factory=dict)  # 그룹 ID -> 공유 제한
+    group_members: Dict[str, Tuple[str, ...]] = field(default_factory=dict)  # 그룹 ID -> 소속 사용자
+    user_groups: Dict[str, Tuple[str, ...]] = field(default_factory=dict)  # 사용자 ID -> 소속 그룹
+    version: int = 0
+
+
+# 제한 알고리즘
+ALGORITHM_FIXED_WINDOW = "fixed_window"  # 분/시간/일 고정 창 카운터
+ALGORITHM_GCRA = "gcra"  # 제한 키마다 TAT 하나만 저장하는 GCRA (토큰 버킷과 동일한 동작)
+
+# GCRA 제한별 주기 (초)
+GCRA_PERIODS = (('rpm', 60), ('tpm', 60), ('tph', 3600), ('daily', 86400))
+
+
 class KoreanRateLimiter:
     """한국어 토큰 사용량 기반 속도 제한기"""
     
-    def __init__(self, storage):
+    def __init__(self, storage: UsageStorage, algorithm: str = ALGORITHM_FIXED_WINDOW):
+        if algorithm not in (ALGORITHM_FIXED_WINDOW, ALGORITHM_GCRA):
+            raise ValueError(f"지원하지 않는 제한 알고리즘: {algorithm}")
         self.storage = storage
-        self.user_limits: Dict[str, UserLimits] = {}
+        self.algorithm = algorithm
         self.default_limits = UserLimits()
-        self.api_key_mapping: Dict[str, str] = {}  # API 키 -> 사용자 ID 매핑
+        self.index = LimiterIndex()  # API 키/사용자/그룹 설정 (교체 단위)
+        self.limit_schedule: Optional[LimitSchedule] = None  # 시간대별 배수
+        self.load_controller = None  # 고부하 배수 (LoadController.multiplier)
+        self.near_cache = None  # 근사 모드 로컬 예산 (NearCache)
+        self.usage_buffer = None  # 사용량 write-behind 버퍼 (UsageBuffer)
+        self.cooldowns = CooldownCache()  # 사용자 -> cooldown_until (I/O 없는 쿨다운 거절)
+        self.cooldown_bus = None  # 워커 간 쿨다운 전파 (RedisCooldownBus)
+        self.storage_health = None  # 저장소 장애 감지 및 저하 모드 (StorageHealthChecker)
+        self._scaled_limits: Dict[str, UserLimits] = {}
+        self._scaled_multiplier = 1.0
+    
+    @property
+    def user_limits(self) -> Dict[str, UserLimits]:
+        return self.index.user_limits
+    
+    @property
+    def group_limits(self) -> Dict[str, UserLimits]:
+        return self.index.group_limits
+    
+    @property
+    def group_members(self) -> Dict[str, Tuple[str, ...]]:
+        return self.index.group_members
+    
+    @property
+    def user_groups(self) -> Dict[str, Tuple[str, ...]]:
+        return self.index.user_groups
+    
+    def apply_index(self, index: LimiterIndex):
+        """검증된 설정 인덱스로 한 번에 교체"""
+        self.index = index
+        self._scaled_limits = {}
+        logger.info(f"✅ Applied Korean limiter config v{index.version}: {len(index.user_limits)} users, "
+                    f"{len(index.api_keys)} API keys, {len(index.group_limits)} groups")
     
     def set_user_limits(self, user_id: str, limits: UserLimits):
         """사용자별 제한 설정"""
-        self.user_limits[user_id] = limits
+        self.index = replace(self.index, user_limits={**self.index.user_limits, user_id: limits})
+        self._scaled_limits.pop(user_id, None)
         logger.info(f"✅ Set limits for Korean user '{user_id}': RPM={limits.rpm}, TPM={limits.tpm}")
     
     def set_api_key_mapping(self, api_key: str, user_id: str):
         """API 키와 사용자 ID 매핑 설정"""
-        self.api_key_mapping[api_key] = user_id
-        logger.debug(f"✅ Mapped API key to user: {api_key[:8]}... -> {user_id}")
+        self.index.api_keys.add(api_key, user_id)
+        logger.debug(f"✅ Mapped API key to user: {user_id}")
+    
+    def get_user_from_api_key(self, api_key: str) -> Optional[str]:
+        """API 키로부터 사용자 ID 조회 (등록되지 않은 키는 None)"""
+        return self.index.api_keys.lookup(api_key)
+    
+    def set_time_based_limits(self, time_config: Optional[Dict[str, Any]]):
+        """korean_users.yaml 의 time_based_limits 섹션 로드 (work_hours/night_hours 배수)"""
+        self.limit_schedule = LimitSchedule.from_config(time_config)
+        self._scaled_limits = {}
+    
+    def set_load_controller(self, controller):
+        """고부하 제어기 연결 (special_events.high_load)"""
+        self.load_controller = controller
+        self._scaled_limits = {}
+    
+    def set_near_cache(self, near_cache):
+        """근사 모드 연결 (storage.near_cache, 비활성화 시 None)"""
+        self.near_cache = near_cache
+    
+    def set_usage_buffer(self, usage_buffer):
+        """사용량 write-behind 버퍼 연결 (storage.write_behind, 비활성화 시 None)"""
+        self.usage_buffer = usage_buffer
+        if usage_buffer is not None:
+            usage_buffer.storage_health = self.storage_health
+    
+    def set_storage_health(self, checker):
+        """저장소 상태 확인기 연결 (storage.degradation, 비활성화 시 None 이면 오류 시 허용)"""
+        self.storage_health = checker
+        self._scaled_limits = {}
+        if self.usage_buffer is not None:
+            # 버퍼의 기록 실패도 장애 판정에 반영
+            self.usage_buffer.storage_health = checker
+    
+    async def set_cooldown_bus(self, bus):
+        """워커 간 쿨다운 설정/해제 전파 연결 (이벤트 루프 안에서 호출, 구독에 성공해야 연결)"""
+        await bus.start(self.cooldowns)
+        self.cooldown_bus = bus
+    
+    def get_limit_multiplier(self) -> float:
+        """현재 적용 중인 제한 배수 (시간대 x 고부하 x 저하 모드 로컬 판정)"""
+        multiplier = 1.0
+        if self.limit_schedule is not None:
+            multiplier = self.limit_schedule.current()
+        if self.load_controller is not None:
+            multiplier *= self.load_controller.multiplier
+        if self.storage_health is not None:
+            multiplier *= self.storage_health.limit_multiplier
+        return multiplier
+    
+    def get_user_limits(self, user_id: str, index: Optional[LimiterIndex] = None) -> UserLimits:
+        """사용자 제한 설정 조회 (시간대/고부하 배수 적용)"""
+        current_index = self.index
+        base = (index or current_index).user_limits.get(user_id, self.default_limits)
+        return self._scale_limits(user_id, base, index, current_index)
+    
+    def get_group_limits(self, group_id: str, index: Optional[LimiterIndex] = None) -> UserLimits:
+        """그룹 공유 제한 조회 (사용자와 같은 시간대/고부하 배수 적용)"""
+        current_index = self.index
+        base = (index or current_index).group_limits[group_id]
+        return self._scale_limits(f"group:{group_id}", base, index, current_index)
+    
+    def _scale_limits(self, cache_key: str, base: UserLimits, index: Optional[LimiterIndex],
+                      current_index: LimiterIndex) -> UserLimits:
+        """배수 적용 제한 (사용자는 ID, 그룹은 'group:<그룹>' 키로 캐시)"""
+        if self.limit_schedule is None and self.load_controller is None and self.storage_health is None:
+            return base
+        
+        multiplier = self.get_limit_multiplier()
+        if multiplier != self._scaled_multiplier:
+            # 배수가 바뀐 경우에만 캐시 초기화
+            self._scaled_limits = {}
+            self._scaled_multiplier = multiplier
+        if multiplier == 1.0:
+            return base
+        
+        scaled = self._scaled_limits.get(cache_key)
+        if scaled is None:
+            # 일일 한도는 하루 총량이므로 배수를 적용하지 않음
+            scaled = replace(
+                base,
+                rpm=max(1, int(base.rpm * multiplier)),
+                tpm=max(1, int(base.tpm * multiplier)),
+                tph=max(1, int(base.tph * multiplier))
+            )
+            if index is None or index is current_index:
+                # 교체 전 인덱스로 계산한 값은 캐시하지 않음
+                self._scaled_limits[cache_key] = scaled
+        return scaled
+    
+    def set_group_limits(self, group_id: str, limits: UserLimits, members: List[str]):
+        """그룹 공유 제한 설정 (사용자 -> 그룹 인덱스 재계산)"""
+        group_members = {**self.index.group_members, group_id: tuple(dict.fromkeys(members))}
+        self.index = replace(
+            self.index,
+            group_limits={**self.index.group_limits, group_id: limits},
+            group_members=group_members,
+            user_groups=self._build_user_groups(group_members)
+        )
+        self._scaled_limits.pop(f"group:{group_id}", None)
+        logger.info(f"✅ Set shared limits for group '{group_id}' ({len(members)} users): RPM={limits.rpm}, TPM={limits.tpm}")
+    
+    def load_groups(self, groups_config: Dict[str, Any]) -> int:
+        """korean_users.yaml 의 groups 섹션 로드 (shared_limits 가 있는 그룹만)"""
+        group_limits, group_members = self._parse_groups(groups_config, self.default_limits)
+        
+        # 전체를 만든 뒤 한 번에 교체
+        self.index = replace(
+            self.index,
+            group_limits=group_limits,
+            group_members=group_members,
+            user_groups=self._build_user_groups(group_members)
+        )
+        
+        logger.info(f"✅ Loaded {len(group_limits)} Korean user groups with shared limits")
+        return len(group_limits)
     
-    def get_user_from_api_key(self, api_key: str) -> str:
-        """API 키로부터 사용자 ID 조회"""
-        return self.api_key_mapping.get(api_key, api_key)
+    @staticmethod
+    def _parse_groups(groups_config: Optional[Dict[str, Any]], default_limits: UserLimits
+                      ) -> Tuple[Dict[str, UserLimits], Dict[str, Tuple[str, ...]]]:
+        group_limits: Dict[str, UserLimits] = {}
+        group_members: Dict[str, Tuple[str, ...]] = {}
+        for group_id, group_config in (groups_config or {}).items():
+            shared = (group_config or {}).get('shared_limits')
+            if not shared:
+                continue
+            group_limits[group_id] = UserLimits(
+                rpm=shared.get('rpm', default_limits.rpm),
+                tpm=shared.get('tpm', default_limits.tpm),
+                tph=shared.get('tph', default_limits.tph),
+                daily=shared.get('daily', default_limits.daily),
+                cooldown_minutes=0,
+                description=group_config.get('description', '')
+            )
+            group_members[group_id] = tuple(dict.fromkeys(group_config.get('users') or []))
+        return group_limits, group_members
     
-    def get_user_limits(self, user_id: str) -> UserLimits:
-        """사용자 제한 설정 조회"""
-        return self.user_limits.get(user_id, self.default_limits)
+    @staticmethod
+    def _build_user_groups(group_members: Dict[str, Tuple[str, ...]]) -> Dict[str, Tuple[str, ...]]:
+        index: Dict[str, List[str]] = {}
+        for group_id, members in group_members.items():
+            for user_id in members:
+                index.setdefault(user_id, []).append(group_id)
+        return {user_id: tuple(groups) for user_id, groups in index.items()}
+    
+    def get_user_groups(self, user_id: str) -> Tuple[str, ...]:
+        """사용자가 속한 그룹 목록"""
+        return self.index.user_groups.get(user_id, ())
     
     async def check_limit(self, user_id: str, estimated_tokens: int) -> Tuple[bool, Optional[str]]:
         """사용량 제한 확인 (한국어 메시지)"""
+        # 알려진 쿨다운은 저장소 조회 없이 거절
+        cooldown_until = self.cooldowns.get(user_id)
+        if cooldown_until:
+            metrics.count_rejection('cooldown')
+            return False, f"🚫 쿨다운 중입니다. {int(cooldown_until - time.time())}초 후 다시 시도하세요."
+        
+        health = self.storage_health
+        if health is not None and not health.healthy:
+            return await self._check_limit_degraded(user_id, estimated_tokens)
+        
         try:
-            limits = self.get_user_limits(user_id)
-            current_time = time.time()
-            
-            # 현재 사용량 조회
-            usage = await self.storage.get_user_usage(user_id)
-            
-            # 쿨다운 상태 확인
-            cooldown_until = usage.get('cooldown_until', 0)
-            if cooldown_until > current_time:
-                remaining_cooldown = int(cooldown_until - current_time)
-                return False, f"🚫 쿨다운 중입니다. {remaining_cooldown}초 후 다시 시도하세요."
-            
-            # 분당 요청 수 확인
-            current_requests = usage.get('requests_this_minute', 0)
-            if current_requests >= limits.rpm:
-                await self._apply_cooldown(user_id, limits.cooldown_minutes)
-                return False, f"⏰ 분당 요청 제한 초과 ({limits.rpm}개). {limits.cooldown_minutes}분 후 다시 시도하세요."
-            
-            # 분당 토큰 수 확인
-            current_minute_tokens = usage.get('tokens_this_minute', 0)
-            if current_minute_tokens + estimated_tokens > limits.tpm:
-                await self._apply_cooldown(user_id, limits.cooldown_minutes)
-                return False, f"🔢 분당 토큰 제한 초과 ({limits.tpm:,}개). 현재: {current_minute_tokens:,}, 요청: {estimated_tokens:,}"
-            
-            # 시간당 토큰 수 확인
-            current_hour_tokens = usage.get('tokens_this_hour', 0)
-            if current_hour_tokens + estimated_tokens > limits.tph:
-                await self._apply_cooldown(user_id, limits.cooldown_minutes)
-                return False, f"⏳ 시간당 토큰 제한 초과 ({limits.tph:,}개). 현재: {current_hour_tokens:,}, 요청: {estimated_tokens:,}"
-            
-            # 일일 토큰 수 확인
-            current_daily_tokens = usage.get('tokens_today', 0)
-            if current_daily_tokens + estimated_tokens > limits.daily:
-                await self._apply_cooldown(user_id, limits.cooldown_minutes * 2)  # 일일 제한은 더 긴 쿨다운
-                return False, f"📅 일일 토큰 제한 초과 ({limits.daily:,}개). 현재: {current_daily_tokens:,}, 요청: {estimated_tokens:,}"
-            
-            return True, None
+            if self.algorithm == ALGORITHM_GCRA:
+                return await self._check_limit_gcra(self.storage, user_id, estimated_tokens)
+            return await self._check_limit_fixed(self.storage, user_id, estimated_tokens)
             
         except Exception as e:
             logger.error(f"❌ Rate limit check failed for Korean user {user_id}: {e}")
-            # 에러 시 허용 (fail-open 정책)
+            if health is None:
+                # 상태 확인기가 없으면 에러 시 허용 (fail-open 정책)
+                return True, None
+            health.report_failure()
+            return await self._check_limit_degraded(user_id, estimated_tokens)
+    
+    async def _check_limit_degraded(self, user_id: str, estimated_tokens: int) -> Tuple[bool, Optional[str]]:
+        """저장소 장애 중 판정 (local 모드는 워커 로컬 메모리 저장소로 같은 제한 확인)"""
+        health = self.storage_health
+        fallback = health.fallback
+        if fallback is None:
+            return health.degraded_result()
+        
+        health.degraded_decisions += 1
+        try:
+            if self.algorithm == ALGORITHM_GCRA:
+                return await self._check_limit_gcra(fallback, user_id, estimated_tokens)
+            return await self._check_limit_fixed(fallback, user_id, estimated_tokens)
+        except Exception as e:
+            logger.error(f"❌ Degraded rate limit check failed for Korean user {user_id}: {e}")
+            return True, None
+    
+    async def _check_limit_fixed(self, storage: UsageStorage, user_id: str,
+                                 estimated_tokens: int) -> Tuple[bool, Optional[str]]:
+        """고정 창 제한 확인 (storage 가 공유 저장소가 아니면 근사 모드/버퍼 합산 생략)"""
+        shared = storage is self.storage
+        
+        # 근사 모드: 로컬 예산이 남아 있으면 저장소 조회 없이 허용
+        near_cache = self.near_cache if shared else None
+        if near_cache is not None and near_cache.try_consume(user_id, estimated_tokens):
             return True, None
+        
+        # 설정 교체와 무관하게 요청 처리 동안 같은 인덱스 사용
+        index = self.index
+        limits = self.get_user_limits(user_id, index)
+        groups = index.user_groups.get(user_id, ())
+        current_time = time.time()
+        
+        # 현재 사용량 조회 (소속 그룹 사용량도 같은 왕복에서 조회)
+        usage = await storage.get_user_usage(user_id, groups)
+        if shared and self.usage_buffer is not None:
+            usage = self.usage_buffer.merge_pending(user_id, groups, usage)
+        if near_cache is not None:
+            usage = near_cache.merge_pending(user_id, groups, usage)
+            
+        # 쿨다운 상태 확인
+        cooldown_until = usage.get('cooldown_until', 0)
+        if cooldown_until > current_time:
+            self.cooldowns.set(user_id, cooldown_until)
+            remaining_cooldown = int(cooldown_until - current_time)
+            metrics.count_rejection('cooldown')
+            return False, f"🚫 쿨다운 중입니다. {remaining_cooldown}초 후 다시 시도하세요."
+        
+        # 분당 요청 수 확인
+        current_requests = usage.get('requests_this_minute', 0)
+        if current_requests >= limits.rpm:
+            metrics.count_rejection('rpm')
+            await self._apply_cooldown(user_id, limits.cooldown_minutes, storage)
+            return False, f"⏰ 분당 요청 제한 초과 ({limits.rpm}개). {limits.cooldown_minutes}분 후 다시 시도하세요."
+        
+        # 분당 토큰 수 확인
+        current_minute_tokens = usage.get('tokens_this_minute', 0)
+        if current_minute_tokens + estimated_tokens > limits.tpm:
+            metrics.count_rejection('tpm')
+            await self._apply_cooldown(user_id, limits.cooldown_minutes, storage)
+            return False, f"🔢 분당 토큰 제한 초과 ({limits.tpm:,}개). 현재: {current_minute_tokens:,}, 요청: {estimated_tokens:,}"
+        
+        # 시간당 토큰 수 확인
+        current_hour_tokens = usage.get('tokens_this_hour', 0)
+        if current_hour_tokens + estimated_tokens > limits.tph:
+            metrics.count_rejection('tph')
+            await self._apply_cooldown(user_id, limits.cooldown_minutes, storage)
+            return False, f"⏳ 시간당 토큰 제한 초과 ({limits.tph:,}개). 현재: {current_hour_tokens:,}, 요청: {estimated_tokens:,}"
+        
+        # 일일 토큰 수 확인
+        current_daily_tokens = usage.get('tokens_today', 0)
+        if current_daily_tokens + estimated_tokens > limits.daily:
+            metrics.count_rejection('daily')
+            await self._apply_cooldown(user_id, limits.cooldown_minutes * 2, storage)  # 일일 제한은 더 긴 쿨다운
+            return False, f"📅 일일 토큰 제한 초과 ({limits.daily:,}개). 현재: {current_daily_tokens:,}, 요청: {estimated_tokens:,}"
+        
+        # 그룹 공유 제한 확인 (그룹 초과는 개인 쿨다운을 걸지 않음)
+        if groups:
+            group_usage = usage.get('groups', {})
+            for group_id in groups:
+                message = self._check_group_limit(group_id, self.get_group_limits(group_id, index),
+                                                  group_usage.get(group_id, {}), estimated_tokens)
+                if message:
+                    return False, message
+        
+        if near_cache is not None:
+            near_cache.grant_lease(user_id, self._lease_windows(limits, usage, groups, index),
+                                   estimated_tokens)
+        
+        return True, None
+    
+    async def _check_limit_gcra(self, storage: UsageStorage, user_id: str,
+                                estimated_tokens: int) -> Tuple[bool, Optional[str]]:
+        """GCRA 제한 확인 (쿨다운/개인/그룹 제한을 저장소 호출 한 번으로 확인 및 차감)
+        
+        일일 제한은 달력 기준이 아니라 최근 24시간 기준으로 동작합니다.
+        """
+        index = self.index
+        limits = self.get_user_limits(user_id, index)
+        groups = index.user_groups.get(user_id, ())
+        
+        entries = []
+        subjects = [(user_id, None, limits)]
+        subjects.extend((f"group:{group_id}", group_id, self.get_group_limits(group_id, index))
+                        for group_id in groups)
+        for subject, group_id, subject_limits in subjects:
+            for name, period in GCRA_PERIODS:
+                cost = 1 if name == 'rpm' else estimated_tokens
+                entries.append((subject, name, getattr(subject_limits, name), period, cost))
+        
+        status, value = await storage.gcra_acquire(user_id, entries)
+        if status == 0:
+            return True, None
+        
+        if status < 0:
+            self.cooldowns.set(user_id, value)
+            metrics.count_rejection('cooldown')
+            return False, f"🚫 쿨다운 중입니다. {int(value - time.time())}초 후 다시 시도하세요."
+        
+        subject, name, limit, _, _ = entries[status - 1]
+        retry_after = max(1, int(value + 0.999))
+        group_id = subjects[(status - 1) // len(GCRA_PERIODS)][1]
+        labels = {'rpm': '분당 요청', 'tpm': '분당 토큰', 'tph': '시간당 토큰', 'daily': '24시간 토큰'}
+        
+        if group_id is not None:
+            metrics.count_rejection(f'group_{name}')
+            return False, f"👥 그룹 '{group_id}' {labels[name]} 제한 초과 ({limit:,}개). {retry_after}초 후 다시 시도하세요."
+        
+        # 일일 제한은 더 긴 쿨다운
+        cooldown_minutes = limits.cooldown_minutes * (2 if name == 'daily' else 1)
+        metrics.count_rejection(name)
+        await self._apply_cooldown(user_id, cooldown_minutes, storage)
+        return False, f"⏰ {labels[name]} 제한 초과 ({limit:,}개). {cooldown_minutes}분 후 다시 시도하세요."
+    
+    def _check_group_limit(self, group_id: str, limits: UserLimits, usage: Dict[str, int],
+                           estimated_tokens: int) -> Optional[str]:
+        """그룹 공유 제한 확인 (초과 시 한국어 메시지 반환)"""
+        current_requests = usage.get('requests_this_minute', 0)
+        if current_requests >= limits.rpm:
+            metrics.count_rejection('group_rpm')
+            return f"👥 그룹 '{group_id}' 분당 요청 제한 초과 ({limits.rpm}개). 잠시 후 다시 시도하세요."
+        
+        current_minute_tokens = usage.get('tokens_this_minute', 0)
+        if current_minute_tokens + estimated_tokens > limits.tpm:
+            metrics.count_rejection('group_tpm')
+            return f"👥 그룹 '{group_id}' 분당 토큰 제한 초과 ({limits.tpm:,}개). 현재: {current_minute_tokens:,}, 요청: {estimated_tokens:,}"
+        
+        current_hour_tokens = usage.get('tokens_this_hour', 0)
+        if current_hour_tokens + estimated_tokens > limits.tph:
+            metrics.count_rejection('group_tph')
+            return f"👥 그룹 '{group_id}' 시간당 토큰 제한 초과 ({limits.tph:,}개). 현재: {current_hour_tokens:,}, 요청: {estimated_tokens:,}"
+        
+        current_daily_tokens = usage.get('tokens_today', 0)
+        if current_daily_tokens + estimated_tokens > limits.daily:
+            metrics.count_rejection('group_daily')
+            return f"👥 그룹 '{group_id}' 일일 토큰 제한 초과 ({limits.daily:,}개). 현재: {current_daily_tokens:,}, 요청: {estimated_tokens:,}"
+        
+        return None
+    
+    def _lease_windows(self, limits: UserLimits, usage: Dict, groups: Tuple[str, ...],
+                       index: LimiterIndex) -> List[Tuple[int, int, int, int]]:
+        """근사 모드 예산 계산용 (토큰 한도, 현재 토큰, 요청 한도, 현재 요청) 목록"""
+        windows = [
+            (limits.tpm, usage.get('tokens_this_minute', 0), limits.rpm, usage.get('requests_this_minute', 0)),
+            (limits.tph, usage.get('tokens_this_hour', 0), 0, 0),
+            (limits.daily, usage.get('tokens_today', 0), 0, 0)
+        ]
+        group_usage = usage.get('groups', {})
+        for group_id in groups:
+            shared = self.get_group_limits(group_id, index)
+            current = group_usage.get(group_id, {})
+            windows.append((shared.tpm, current.get('tokens_this_minute', 0),
+                            shared.rpm, current.get('requests_this_minute', 0)))
+            windows.append((shared.tph, current.get('tokens_this_hour', 0), 0, 0))
+            windows.append((shared.daily, current.get('tokens_today', 0), 0, 0))
+        return windows
     
-    async def _apply_cooldown(self, user_id: str, cooldown_minutes: int):
-        """쿨다운 적용"""
+    async def _apply_cooldown(self, user_id: str, cooldown_minutes: int,
+                              storage: Optional[UsageStorage] = None):
+        """쿨다운 적용 (저하 모드의 로컬 저장소면 다른 워커에 전파하지 않음)"""
+        if self.near_cache is not None:
+            self.near_cache.drop_lease(user_id)
         cooldown_until = time.time() + (cooldown_minutes * 60)
-        await self.storage.set_user_cooldown(user_id, cooldown_until)
+        self.cooldowns.set(user_id, cooldown_until)
+        if storage is None:
+            storage = self.storage
+        await storage.set_user_cooldown(user_id, cooldown_until)
+        if self.cooldown_bus is not None and storage is self.storage:
+            await self.cooldown_bus.publish(user_id, cooldown_until)
         logger.warning(f"⚠️ Applied {cooldown_minutes}min cooldown for Korean user '{user_id}'")
     
     async def record_usage(self, user_id: str, input_tokens: int, output_tokens: int, requests: int = 1):
         """사용량 기록 (추정치)"""
+        total_tokens = input_tokens + output_tokens
+        groups = self.index.user_groups.get(user_id, ())
+        health = self.storage_health
         try:
-            total_tokens = input_tokens + output_tokens
-            await self.storage.record_usage(user_id, total_tokens, requests)
+            if health is not None and not health.healthy and health.fallback is not None:
+                # 저하 모드: 로컬 판정용으로 기록, 버퍼가 있으면 복구 후 공유 저장소에도 반영
+                await health.fallback.record_usage(user_id, total_tokens, requests, groups)
+                if self.usage_buffer is not None:
+                    self.usage_buffer.record(user_id, total_tokens, requests, groups)
+            elif self.near_cache is not None and self.near_cache.has_lease(user_id):
+                # 예산 안의 사용량은 로컬에 누적 후 일괄 기록
+                self.near_cache.record(user_id, total_tokens, requests, groups)
+            elif self.usage_buffer is not None:
+                # 저장소 쓰기는 버퍼가 모아서 처리 (요청 지연에서 제외)
+                self.usage_buffer.record(user_id, total_tokens, requests, groups)
+            else:
+                try:
+                    await self.storage.record_usage(user_id, total_tokens, requests, groups)
+                except Exception:
+                    if health is not None:
+                        # 기록 실패도 장애 판정에 반영하고, 로컬 판정에는 사용량을 남김
+                        health.report_failure()
+                        if health.fallback is not None:
+                            await health.fallback.record_usage(user_id, total_tokens, requests, groups)
+                    raise
             
             logger.debug(f"📊 Recorded usage for Korean user '{user_id}': {input_tokens}+{output_tokens}={total_tokens} tokens, {requests} requests")
             
@@ -149,51 +538,12 @@ class KoreanRateLimiter:
     async def get_user_status(self, user_id: str) -> Dict:
         """사용자 상태 조회 (한국어 사용자명 지원)"""
         try:
-            usage = await self.storage.get_user_usage(user_id)
-            limits = self.get_user_limits(user_id)
-            current_time = time.time()
-            
-            # 남은 할당량 계산
-            remaining_rpm = max(0, limits.rpm - usage.get('requests_this_minute', 0))
-            remaining_tpm = max(0, limits.tpm - usage.get('tokens_this_minute', 0))
-            remaining_tph = max(0, limits.tph - usage.get('tokens_this_hour', 0))
-            remaining_daily = max(0, limits.daily - usage.get('tokens_today', 0))
-            
-            # 쿨다운 상태
-            cooldown_until = usage.get('cooldown_until', 0)
-            is_cooldown = cooldown_until > current_time
-            cooldown_remaining = max(0, int(cooldown_until - current_time)) if is_cooldown else 0
-            
-            # 사용률 계산
-            rpm_percent = (usage.get('requests_this_minute', 0) / limits.rpm) * 100 if limits.rpm > 0 else 0
-            tpm_percent = (usage.get('tokens_this_minute', 0) / limits.tpm) * 100 if limits.tpm > 0 else 0
-            tph_percent = (usage.get('tokens_this_hour', 0) / limits.tph) * 100 if limits.tph > 0 else 0
-            daily_percent = (usage.get('tokens_today', 0) / limits.daily) * 100 if limits.daily > 0 else 0
-            
-            return {
-                'user_id': user_id,
-                'user_type': 'korean_user',
-                'limits': limits._asdict(),
-                'usage': usage,
-                'remaining': {
-                    'requests_this_minute': remaining_rpm,
-                    'tokens_this_minute': remaining_tpm,
-                    'tokens_this_hour': remaining_tph,
-                    'tokens_today': remaining_daily
-                },
-                'cooldown': {
-                    'is_active': is_cooldown,
-                    'remaining_seconds': cooldown_remaining,
-                    'status_message': f"쿨다운 {cooldown_remaining}초 남음" if is_cooldown else "정상"
-                },
-                'utilization': {
-                    'rpm_percent': round(rpm_percent, 1),
-                    'tpm_percent': round(tpm_percent, 1),
-                    'tph_percent': round(tph_percent, 1),
-                    'daily_percent': round(daily_percent, 1)
-                },
-                'status_summary': self._get_status_summary(rpm_percent, tpm_percent, tph_percent, daily_percent, is_cooldown)
-            }
+            index = self.index
+            groups = index.user_groups.get(user_id, ())
+            usage = await self.storage.get_user_usage(user_id, groups)
+            if self.usage_buffer is not None:
+                usage = self.usage_buffer.merge_pending(user_id, groups, usage)
+            return self._build_user_status(user_id, usage, index, groups)
         
         except Exception as e:
             logger.error(f"❌ User status retrieval failed for Korean user {user_id}: {e}")
@@ -202,6 +552,81 @@ class KoreanRateLimiter:
                 'error': f"통계 조회 실패: {str(e)}"
             }
     
+    async def get_users_status(self, user_ids: Optional[List[str]] = None) -> List[Dict]:
+        """여러 사용자 상태를 저장소 왕복 한 번으로 조회 (None 이면 오늘 활성 사용자 전체)
+        
+        그룹 사용량은 조회하지 않으므로 결과에 'groups' 항목이 없습니다.
+        """
+        index = self.index
+        usages = await self.storage.get_users_usage(user_ids)
+        return [self._build_user_status(user_id, usage, index) for user_id, usage in usages.items()]
+    
+    def _build_user_status(self, user_id: str, usage: Dict, index: LimiterIndex,
+                           groups: Optional[Tuple[str, ...]] = None) -> Dict:
+        """저장소 사용량과 제한으로 상태 응답 생성 (groups 가 None 이면 그룹 상태 생략)"""
+        limits = self.get_user_limits(user_id, index)
+        current_time = time.time()
+        
+        # 남은 할당량 계산
+        remaining_rpm = max(0, limits.rpm - usage.get('requests_this_minute', 0))
+        remaining_tpm = max(0, limits.tpm - usage.get('tokens_this_minute', 0))
+        remaining_tph = max(0, limits.tph - usage.get('tokens_this_hour', 0))
+        remaining_daily = max(0, limits.daily - usage.get('tokens_today', 0))
+        
+        # 쿨다운 상태
+        cooldown_until = usage.get('cooldown_until', 0)
+        is_cooldown = cooldown_until > current_time
+        cooldown_remaining = max(0, int(cooldown_until - current_time)) if is_cooldown else 0
+        
+        # 사용률 계산
+        rpm_percent = (usage.get('requests_this_minute', 0) / limits.rpm) * 100 if limits.rpm > 0 else 0
+        tpm_percent = (usage.get('tokens_this_minute', 0) / limits.tpm) * 100 if limits.tpm > 0 else 0
+        tph_percent = (usage.get('tokens_this_hour', 0) / limits.tph) * 100 if limits.tph > 0 else 0
+        daily_percent = (usage.get('tokens_today', 0) / limits.daily) * 100 if limits.daily > 0 else 0
+        
+        group_status = {}
+        for group_id in groups or ():
+            group_limits = self.get_group_limits(group_id, index)
+            group_usage = usage.get('groups', {}).get(group_id, {})
+            group_status[group_id] = {
+                'limits': group_limits._asdict(),
+                'remaining': {
+                    'requests_this_minute': max(0, group_limits.rpm - group_usage.get('requests_this_minute', 0)),
+                    'tokens_this_minute': max(0, group_limits.tpm - group_usage.get('tokens_this_minute', 0)),
+                    'tokens_this_hour': max(0, group_limits.tph - group_usage.get('tokens_this_hour', 0)),
+                    'tokens_today': max(0, group_limits.daily - group_usage.get('tokens_today', 0))
+                }
+            }
+        
+        status = {
+            'user_id': user_id,
+            'user_type': 'korean_user',
+            'limits': limits._asdict(),
+            'usage': usage,
+            'time_multiplier': self.limit_schedule.get_status() if self.limit_schedule else None,
+            'remaining': {
+                'requests_this_minute': remaining_rpm,
+                'tokens_this_minute': remaining_tpm,
+                'tokens_this_hour': remaining_tph,
+                'tokens_today': remaining_daily
+            },
+            'cooldown': {
+                'is_active': is_cooldown,
+                'remaining_seconds': cooldown_remaining,
+                'status_message': f"쿨다운 {cooldown_remaining}초 남음" if is_cooldown else "정상"
+            },
+            'utilization': {
+                'rpm_percent': round(rpm_percent, 1),
+                'tpm_percent': round(tpm_percent, 1),
+                'tph_percent': round(tph_percent, 1),
+                'daily_percent': round(daily_percent, 1)
+            },
+            'status_summary': self._get_status_summary(rpm_percent, tpm_percent, tph_percent, daily_percent, is_cooldown)
+        }
+        if groups is not None:
+            status['groups'] = group_status
+        return status
+    
     def _get_status_summary(self, rpm_percent: float, tpm_percent: float, tph_percent: float, daily_percent: float, is_cooldown: bool) -> str:
         """상태 요약 메시지 생성 (한국어)"""
         if is_cooldown:
@@ -221,7 +646,15 @@ class KoreanRateLimiter:
     async def reset_user_usage(self, user_id: str):
         """사용자 사용량 초기화"""
         try:
+            if self.near_cache is not None:
+                self.near_cache.drop_lease(user_id)
+                await self.near_cache.flush()
+            if self.usage_buffer is not None:
+                await self.usage_buffer.flush()
             await self.storage.reset_user_usage(user_id)
+            self.cooldowns.clear(user_id)
+            if self.cooldown_bus is not None:
+                await self.cooldown_bus.publish(user_id, 0)
             logger.info(f"🔄 Reset usage for Korean user '{user_id}'")
         except Exception as e:
             logger.error(f"❌ Usage reset failed for Korean user {user_id}: {e}")
@@ -230,15 +663,27 @@ class KoreanRateLimiter:
     def set_default_limits(self, limits: UserLimits):
         """기본 제한 설정"""
         self.default_limits = limits
+        self._scaled_limits = {}
         logger.info(f"✅ Set default Korean limits: {limits}")
     
-    async def cleanup_expired_data(self):
-        """만료된 데이터 정리 (백그라운드 태스크용)"""
+    async def close(self):
+        """종료 시 근사 모드/write-behind 버퍼의 미기록 사용량 반영 및 쿨다운 구독 해제"""
+        if self.near_cache is not None:
+            await self.near_cache.close()
+        if self.usage_buffer is not None:
+            await self.usage_buffer.close()
+        if self.cooldown_bus is not None:
+            await self.cooldown_bus.close()
+    
+    async def cleanup_expired_data(self, time_budget: Optional[float] = None) -> bool:
+        """만료된 데이터 정리 (CleanupScheduler 에서 호출, 시간 예산 안에 끝나면 True)"""
         try:
-            await self.storage.cleanup_expired_data()
+            done = await self.storage.cleanup_expired_data(time_budget=time_budget)
             logger.debug("🧹 Cleaned up expired Korean usage data")
+            return done
         except Exception as e:
             logger.error(f"❌ Data cleanup failed: {e}")
+            return True
     
     async def get_top_users(self, limit: int = 10, period: str = "today") -> list:
         """상위 사용자 조회 (한국어 사용자명 지원)"""
@@ -0,0 +1,180 @@
+"""
+Background storage health checker and degraded-mode fallback
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 저장소 장애 시 제한 판정 방식
+DEGRADATION_LOCAL = "local"    # 워커 로컬 메모리 저장소로 같은 제한 적용
+DEGRADATION_OPEN = "open"      # 모두 허용 (이전 동작)
+DEGRADATION_CLOSED = "closed"  # 모두 거절
+DEGRADATION_MODES = (DEGRADATION_LOCAL, DEGRADATION_OPEN, DEGRADATION_CLOSED)
+
+
+class StorageHealthChecker:
+    """저장소 상태를 주기적으로 확인하고 장애 시 저하 모드 판정 방식을 제공
+
+    - interval 초마다 ping 을 timeout 초 안에 확인합니다. 요청 경로의 저장소
+      오류도 report_failure 로 같은 연속 실패 횟수에 더합니다.
+    - failure_threshold 번 연속 실패하면 장애(healthy=False)로 전환하고, 저장소에
+      reconnect 가 있으면 풀의 연결을 끊어 복구 후 새 연결을 쓰게 합니다.
+    - 장애 중에는 ping 이 recovery_threshold 번 연속 성공해야 복구합니다.
+    - 장애 중 제한기는 mode 에 따라 로컬 메모리 저장소(fallback)로 판정하거나
+      모두 허용/거절합니다. local 에서는 워커마다 따로 세므로 제한에
+      local_limit_ratio 배수를 곱해 워커 수만큼 늘어나는 한도를 줄일 수 있습니다.
+
+    제한기는 healthy 속성 하나만 읽습니다 (단일 대입이라 잠금 불필요).
+    """
+
+    def __init__(self, storage, mode: str = DEGRADATION_LOCAL, interval: float = 1.0,
+                 timeout: float = 0.5, failure_threshold: int = 2, recovery_threshold: int = 2,
+                 local_limit_ratio: float = 1.0):
+        if mode not in DEGRADATION_MODES:
+            raise ValueError(f"지원하지 않는 저하 모드: {mode}")
+        self.storage = storage
+        self.mode = mode
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_threshold = max(1, recovery_threshold)
+        self.local_limit_ratio = local_limit_ratio
+        self.fallback = None
+        if mode == DEGRADATION_LOCAL:
+            from src.storage.memory_storage import MemoryStorage
+            self.fallback = MemoryStorage()
+
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.checks = 0
+        self.failures = 0
+        self.outages = 0
+        self.degraded_decisions = 0
+        self.last_check_at = 0.0
+        self.last_latency = 0.0
+        self.degraded_since = 0.0
+        self.degraded_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, storage, health_config: Optional[Dict[str, Any]]) -> Optional['StorageHealthChecker']:
+        """storage.degradation 설정에서 생성 (비활성화 시 None, 예외 시 이전처럼 허용)"""
+        health_config = health_config or {}
+        if not health_config.get('enabled', True):
+            return None
+        checker = cls(
+            storage,
+            mode=health_config.get('mode', DEGRADATION_LOCAL),
+            interval=float(health_config.get('check_interval_ms', 1000)) / 1000,
+            timeout=float(health_config.get('check_timeout_ms', 500)) / 1000,
+            failure_threshold=int(health_config.get('failure_threshold', 2)),
+            recovery_threshold=int(health_config.get('recovery_threshold', 2)),
+            local_limit_ratio=float(health_config.get('local_limit_ratio', 1.0))
+        )
+        logger.info(f"✅ Storage health check every {checker.interval * 1000:g}ms "
+                    f"(degraded mode: {checker.mode})")
+        return checker
+
+    @property
+    def limit_multiplier(self) -> float:
+        """장애 중 로컬 판정에 곱할 제한 배수 (정상이면 1.0)"""
+        if self.healthy or self.mode != DEGRADATION_LOCAL:
+            return 1.0
+        return self.local_limit_ratio
+
+    def degraded_result(self) -> Tuple[bool, Optional[str]]:
+        """open/closed 모드의 판정 결과"""
+        self.degraded_decisions += 1
+        if self.mode == DEGRADATION_CLOSED:
+            return False, "🛠️ 사용량 저장소 장애로 잠시 요청을 받을 수 없습니다. 잠시 후 다시 시도하세요."
+        return True, None
+
+    def report_failure(self):
+        """ping 또는 요청 경로의 저장소 오류 한 번"""
+        self.failures += 1
+        self.consecutive_successes = 0
+        self.consecutive_failures += 1
+        if self.healthy and self.consecutive_failures >= self.failure_threshold:
+            self.healthy = False
+            self.outages += 1
+            self.degraded_since = time.time()
+            logger.error(f"❌ Usage storage unavailable after {self.consecutive_failures} failures, "
+                         f"switching to degraded mode ({self.mode})")
+            reconnect = getattr(self.storage, 'reconnect', None)
+            if reconnect is not None:
+                try:
+                    self._reconnect_task = asyncio.get_running_loop().create_task(reconnect())
+                except RuntimeError:
+                    pass
+
+    def report_success(self):
+        """ping 성공 한 번"""
+        self.consecutive_failures = 0
+        self.consecutive_successes += 1
+        if not self.healthy and self.consecutive_successes >= self.recovery_threshold:
+            self.healthy = True
+            outage = time.time() - self.degraded_since
+            self.degraded_seconds += outage
+            logger.info(f"✅ Usage storage recovered after {outage:.1f}s in degraded mode")
+
+    async def check_once(self) -> bool:
+        """ping 한 번 (timeout 초 안에 성공해야 정상)"""
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(self.storage.ping(), timeout=self.timeout)
+        except Exception:
+            ok = False
+        self.checks += 1
+        self.last_check_at = time.time()
+        self.last_latency = time.perf_counter() - start
+        if ok:
+            self.report_success()
+        else:
+            self.report_failure()
+        return ok
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check_once()
+
+    def start(self):
+        """확인 주기 시작 (이벤트 루프 안에서 호출, interval <= 0 이면 요청 경로 오류만 반영)"""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        degraded_seconds = self.degraded_seconds
+        if not self.healthy:
+            degraded_seconds += time.time() - self.degraded_since
+        status = {
+            'healthy': self.healthy,
+            'mode': self.mode,
+            'checks': self.checks,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'outages': self.outages,
+            'degraded_seconds': round(degraded_seconds, 1),
+            'degraded_decisions': self.degraded_decisions,
+            'last_check_at': self.last_check_at,
+            'last_latency_ms': round(self.last_latency * 1000, 2)
+        }
+        pool_stats = getattr(self.storage, 'get_pool_stats', None)
+        if pool_stats is not None:
+            status['pool'] = pool_stats()
+        return status
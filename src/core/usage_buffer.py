@@ -0,0 +1,330 @@
+"""
+Write-behind usage buffer (coalesced per user per window, batched flushes)
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _minute_bucket(ts: float) -> int:
+    """로컬 시각 기준 분 번호 (// 60 은 시간, // 1440 은 날짜 번호와 같은 경계)"""
+    return (int(ts) + time.localtime(ts).tm_gmtoff) // 60
+
+
+@dataclass
+class _WindowDelta:
+    tokens: int = 0
+    requests: int = 0
+    group_ids: Tuple[str, ...] = ()
+
+
+class UsageBuffer:
+    """요청 경로에서 저장소 쓰기를 떼어내는 write-behind 버퍼
+
+    - record 는 I/O 없이 (분 구간, 사용자) 별로 토큰/요청을 합산합니다.
+    - flush_interval_ms 마다 또는 flush_max_pending 건이 쌓이면 분 구간별로
+      record_usage_many 한 번(Redis 파이프라인, SQLite 트랜잭션)으로 기록합니다.
+      구간의 마지막 기록 시각을 함께 넘기므로 분 경계를 넘겨 기록해도 원래
+      구간에 반영됩니다.
+    - merge_pending 은 아직 저장소에 반영되지 않은 값(기록 중인 값 포함)을 현재
+      분/시간/일 구간에 더해, 제한 확인이 자기 워커의 미기록 사용량을 보게 합니다.
+    - 기록 실패분은 다시 합쳐 재시도하며, 실패가 이어지면 재시도 간격을
+      flush_interval 부터 두 배씩 retry_max_ms 까지 늘립니다. 오류 로그는 장애마다
+      한 번, 복구 시 한 번만 남깁니다. 미기록 사용자 수가 max_pending_users 를
+      넘으면 가장 오래된 분 구간부터 버리고 dropped_* 통계에 셉니다.
+      close 에서 남은 사용량을 한 번 더 기록합니다.
+
+    히스토리는 사용자/분 구간마다 기록 주기당 한 건(합산값)으로 남습니다.
+    """
+
+    def __init__(self, storage, flush_interval_ms: float = 5, flush_max_pending: int = 512,
+                 retry_max_ms: float = 5000, max_pending_users: int = 100000):
+        self.storage = storage
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_pending = flush_max_pending
+        self.retry_max = max(retry_max_ms / 1000, self.flush_interval)
+        self.max_pending_users = max(1, max_pending_users)
+
+        # 분 구간 -> 사용자/그룹 -> 누적분, 분 구간 -> 마지막 기록 시각
+        self._pending: Dict[int, Dict[str, _WindowDelta]] = {}
+        self._pending_groups: Dict[int, Dict[str, _WindowDelta]] = {}
+        self._pending_times: Dict[int, float] = {}
+        self._inflight: List[Tuple[Dict[int, Dict[str, _WindowDelta]], Dict[int, Dict[str, _WindowDelta]]]] = []
+        self._pending_events = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+        # 연속 실패 중 재시도 간격(0 이면 정상)과 다음 재시도 시각 (monotonic)
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+        self._failed_attempts = 0
+        self._drop_logged = False
+
+        self.events = 0
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.flush_errors = 0
+        self.dropped_users = 0
+        # 기록 실패를 알릴 저장소 상태 확인기 (StorageHealthChecker, 제한기가 연결)
+        self.storage_health = None
+        self.dropped_tokens = 0
+
+    @classmethod
+    def from_config(cls, storage, buffer_config: Optional[Dict[str, Any]]) -> Optional['UsageBuffer']:
+        """storage.write_behind 설정에서 생성 (비활성화 시 None)"""
+        buffer_config = buffer_config or {}
+        if not buffer_config.get('enabled', False):
+            return None
+        buffer = cls(
+            storage,
+            flush_interval_ms=float(buffer_config.get('flush_interval_ms', 5)),
+            flush_max_pending=int(buffer_config.get('flush_max_pending', 512)),
+            retry_max_ms=float(buffer_config.get('retry_max_ms', 5000)),
+            max_pending_users=int(buffer_config.get('max_pending_users', 100000))
+        )
+        logger.info(f"✅ Write-behind usage buffer enabled (flush every {buffer.flush_interval * 1000:g}ms "
+                    f"or {buffer.flush_max_pending} events)")
+        return buffer
+
+    def record(self, user_id: str, tokens: int, requests: int, group_ids: Sequence[str] = (),
+               now: Optional[float] = None):
+        """사용량을 (분 구간, 사용자) 별로 누적 (주기적으로 저장소에 일괄 기록)"""
+        if now is None:
+            now = time.time()
+        bucket = _minute_bucket(now)
+
+        users = self._pending.get(bucket)
+        if users is None:
+            users = self._pending[bucket] = {}
+        delta = users.get(user_id)
+        if delta is None:
+            delta = users[user_id] = _WindowDelta(group_ids=tuple(group_ids))
+        delta.tokens += tokens
+        delta.requests += requests
+
+        if group_ids:
+            groups = self._pending_groups.get(bucket)
+            if groups is None:
+                groups = self._pending_groups[bucket] = {}
+            for group_id in group_ids:
+                group_delta = groups.get(group_id)
+                if group_delta is None:
+                    group_delta = groups[group_id] = _WindowDelta()
+                group_delta.tokens += tokens
+                group_delta.requests += requests
+
+        self._pending_times[bucket] = max(self._pending_times.get(bucket, 0.0), now)
+        self.events += 1
+        self._pending_events += 1
+        self._ensure_flusher()
+        # 재시도 대기 중에는 건수로 앞당기지 않음
+        if self._pending_events >= self.flush_max_pending and self._flush_now is not None and not self._retry_delay:
+            self._flush_now.set()
+
+    def merge_pending(self, user_id: str, group_ids: Sequence[str], usage: Dict[str, Any],
+                      now: Optional[float] = None) -> Dict[str, Any]:
+        """저장소 사용량에 아직 반영되지 않은 이 워커의 누적분을 더함"""
+        if not self._pending and not self._inflight:
+            return usage
+        current = _minute_bucket(time.time() if now is None else now)
+
+        sources = [(self._pending, self._pending_groups)]
+        sources.extend(self._inflight)
+        merged = None
+        merged_groups = None
+        for pending, pending_groups in sources:
+            for bucket, users in pending.items():
+                if bucket // 1440 != current // 1440:
+                    continue
+                delta = users.get(user_id)
+                if delta is not None:
+                    if merged is None:
+                        merged = dict(usage)
+                    self._add_delta(merged, delta, bucket, current)
+                    merged['total_tokens'] = merged.get('total_tokens', 0) + delta.tokens
+                    merged['total_requests'] = merged.get('total_requests', 0) + delta.requests
+
+                groups = pending_groups.get(bucket) if group_ids else None
+                if not groups or 'groups' not in usage:
+                    continue
+                for group_id in group_ids:
+                    group_delta = groups.get(group_id)
+                    if group_delta is None or group_id not in usage['groups']:
+                        continue
+                    if merged is None:
+                        merged = dict(usage)
+                    if merged_groups is None:
+                        merged_groups = merged['groups'] = dict(usage['groups'])
+                    group_usage = merged_groups[group_id]
+                    if group_usage is usage['groups'][group_id]:
+                        group_usage = merged_groups[group_id] = dict(group_usage)
+                    self._add_delta(group_usage, group_delta, bucket, current)
+        return usage if merged is None else merged
+
+    @staticmethod
+    def _add_delta(usage: Dict[str, Any], delta: _WindowDelta, bucket: int, current: int):
+        """같은 날 누적분을 해당하는 구간(분/시간/일)에만 더함"""
+        usage['tokens_today'] = usage.get('tokens_today', 0) + delta.tokens
+        if bucket // 60 == current // 60:
+            usage['tokens_this_hour'] = usage.get('tokens_this_hour', 0) + delta.tokens
+            if bucket == current:
+                usage['tokens_this_minute'] = usage.get('tokens_this_minute', 0) + delta.tokens
+                usage['requests_this_minute'] = usage.get('requests_this_minute', 0) + delta.requests
+
+    def _ensure_flusher(self):
+        if self._closing or (self._flush_task is not None and not self._flush_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_now = asyncio.Event()
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while not self._closing:
+            timeout = self.flush_interval
+            if self._retry_delay:
+                timeout = max(self._retry_at - time.monotonic(), 0.0)
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            if self._closing or (self._retry_delay and time.monotonic() < self._retry_at):
+                continue
+            if self._pending:
+                await self.flush()
+
+    async def flush(self):
+        """누적 사용량을 분 구간별로 저장소에 일괄 기록 (실패 시 백오프 후 재시도)
+
+        진행 중인 기록이 있으면 끝날 때까지 기다리므로, 반환 후에는 호출 전까지의
+        사용량이 모두 저장소에 반영되어 있습니다.
+        """
+        if not self._pending and not self._inflight:
+            return
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        # 기록 순서를 지키기 위해 한 번에 하나의 flush 만 진행
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            pending_groups, self._pending_groups = self._pending_groups, {}
+            pending_times, self._pending_times = self._pending_times, {}
+            self._pending_events = 0
+            inflight = (pending, pending_groups)
+            self._inflight.append(inflight)
+
+            try:
+                for bucket in sorted(pending):
+                    entries = [(user_id, delta.tokens, delta.requests, delta.group_ids)
+                               for user_id, delta in pending[bucket].items() if delta.requests or delta.tokens]
+                    if entries:
+                        await self.storage.record_usage_many(entries, timestamp=pending_times[bucket])
+                        self.flushed_entries += len(entries)
+                    # 기록이 끝난 구간은 바로 합산 대상에서 제외
+                    del pending[bucket]
+                    pending_groups.pop(bucket, None)
+                self.flushes += 1
+            except Exception as e:
+                self.flush_errors += 1
+                self._requeue(pending, pending_groups, pending_times)
+                self._on_flush_failure(e)
+            else:
+                self._on_flush_success()
+            finally:
+                self._inflight.remove(inflight)
+
+    def _on_flush_failure(self, error: Exception):
+        """재시도 간격을 두 배로 늘리고 장애의 첫 실패만 오류로 남김"""
+        self._failed_attempts += 1
+        self._retry_delay = min(max(self._retry_delay * 2, self.flush_interval), self.retry_max)
+        self._retry_at = time.monotonic() + self._retry_delay
+        if self.storage_health is not None:
+            self.storage_health.report_failure()
+        if self._failed_attempts == 1:
+            logger.error(f"❌ Write-behind flush failed ({sum(map(len, self._pending.values()))} users), "
+                         f"retrying with backoff up to {self.retry_max * 1000:g}ms: {error}")
+        else:
+            logger.debug(f"Write-behind flush retry {self._failed_attempts} failed: {error}")
+
+    def _on_flush_success(self):
+        if self._failed_attempts:
+            logger.info(f"✅ Write-behind flush recovered after {self._failed_attempts} failed attempts")
+        self._failed_attempts = 0
+        self._retry_delay = 0.0
+        self._drop_logged = False
+
+    def _requeue(self, pending: Dict[int, Dict[str, _WindowDelta]],
+                 pending_groups: Dict[int, Dict[str, _WindowDelta]], pending_times: Dict[int, float]):
+        """기록 실패분을 현재 누적분에 다시 합침"""
+        for target, source in ((self._pending, pending), (self._pending_groups, pending_groups)):
+            for bucket, deltas in source.items():
+                current = target.setdefault(bucket, {})
+                for key, delta in deltas.items():
+                    existing = current.get(key)
+                    if existing is None:
+                        current[key] = delta
+                    else:
+                        existing.tokens += delta.tokens
+                        existing.requests += delta.requests
+        for bucket in pending:
+            self._pending_times[bucket] = max(self._pending_times.get(bucket, 0.0), pending_times[bucket])
+        self._trim_pending()
+
+    def _trim_pending(self):
+        """미기록 사용자 수가 max_pending_users 를 넘으면 가장 오래된 분 구간부터 버림 (최신 구간은 유지)"""
+        total = sum(map(len, self._pending.values()))
+        dropped = 0
+        while total > self.max_pending_users and len(self._pending) > 1:
+            oldest = min(self._pending)
+            users = self._pending.pop(oldest)
+            self._pending_groups.pop(oldest, None)
+            self._pending_times.pop(oldest, None)
+            total -= len(users)
+            dropped += len(users)
+            self.dropped_tokens += sum(delta.tokens for delta in users.values())
+        if dropped:
+            if not self._drop_logged:
+                self._drop_logged = True
+                logger.warning(f"⚠️ Write-behind buffer over {self.max_pending_users} pending users, "
+                               f"dropping oldest minute windows")
+            self.dropped_users += dropped
+
+    async def close(self):
+        """플러시 태스크 종료 및 남은 사용량 기록"""
+        self._closing = True
+        if self._flush_task is not None:
+            # 진행 중인 flush 가 끊기지 않도록 취소 대신 종료 신호 후 대기
+            self._flush_now.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+        if self._pending:
+            logger.error(f"❌ Write-behind buffer closed with {sum(map(len, self._pending.values()))} "
+                         f"unrecorded users")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'pending_users': sum(map(len, self._pending.values())),
+            'pending_events': self._pending_events,
+            'events': self.events,
+            'flushes': self.flushes,
+            'flushed_entries': self.flushed_entries,
+            'flush_errors': self.flush_errors,
+            'retry_delay_ms': round(self._retry_delay * 1000, 1),
+            'dropped_users': self.dropped_users,
+            'dropped_tokens': self.dropped_tokens,
+            'coalescing_ratio': round(self.events / self.flushed_entries, 2) if self.flushed_entries else 0.0
+        }
@@ -0,0 +1,240 @@
+"""
+Micro-batching of compatible completion requests into multi-prompt vLLM calls
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import logging
+
+import httpx
+
+from src.utils.metrics import metrics
+from src.utils.tracing import detach_trace, record_span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _BatchItem:
+    prompt: str
+    user_id: str
+    future: asyncio.Future
+    enqueued_at: float = 0
+    dispatched_at: float = 0
+    upstream_seconds: float = 0
+
+
+@dataclass
+class _PendingBatch:
+    key: str
+    template: Dict[str, Any]
+    items: List[_BatchItem] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+def split_proportionally(total: int, weights: List[int]) -> List[int]:
+    """합계를 가중치 비율로 정수 분배 (최대 나머지 방식, 합계 보존)"""
+    if not weights:
+        return []
+
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+
+    exact = [total * w / weight_sum for w in weights]
+    shares = [int(x) for x in exact]
+    remainder = total - sum(shares)
+    order = sorted(range(len(exact)), key=lambda i: exact[i] - shares[i], reverse=True)
+    for i in order[:remainder]:
+        shares[i] += 1
+    return shares
+
+
+class MicroBatcher:
+    """같은 모델/샘플링 파라미터의 비스트리밍 completion 요청을 묶어 전송
+
+    window_ms 동안 모인 요청(또는 max_batch_size 도달 시 즉시)을 prompt 리스트
+    하나로 업스트림에 보내고, choices 를 호출자별로 나누어 돌려줍니다. vLLM 은
+    usage 를 배치 전체 합계로만 반환하므로 프롬프트/생성 토큰 수를 호출자별
+    추정치 비율로 분배합니다.
+    """
+
+    def __init__(self, sender: Callable[[Dict[str, Any]], Awaitable[httpx.Response]],
+                 window_ms: float = 5, max_batch_size: int = 16,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        self.sender = sender
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.token_counter = token_counter or (lambda text: max(1, len(text) // 4))
+
+        self._pending: Dict[str, _PendingBatch] = {}
+        # 전송 중인 배치 (이벤트 루프는 태스크를 약하게만 참조하므로 끝날 때까지 보관)
+        self._sending: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_requests = 0
+
+    @classmethod
+    def from_config(cls, batch_config: Dict[str, Any], sender,
+                    token_counter=None) -> Optional['MicroBatcher']:
+        """performance.micro_batching 설정에서 생성 (비활성화 시 None)"""
+        if not batch_config.get('enabled', False):
+            return None
+        return cls(
+            sender,
+            window_ms=float(batch_config.get('window_ms', 5)),
+            max_batch_size=int(batch_config.get('max_batch_size', 16)),
+            token_counter=token_counter
+        )
+
+    @staticmethod
+    def is_batchable(payload: Dict[str, Any]) -> bool:
+        """배치 가능한 요청인지 확인 (단일 문자열 프롬프트, 비스트리밍)"""
+        return isinstance(payload.get('prompt'), str) and not payload.get('stream')
+
+    @staticmethod
+    def _batch_key(payload: Dict[str, Any]) -> str:
+        params = {k: v for k, v in payload.items() if k not in ('prompt', 'user')}
+        return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+    async def submit(self, payload: Dict[str, Any], user_id: str) -> Tuple[int, Any]:
+        """요청을 배치에 추가하고 (상태 코드, 응답 본문) 을 반환"""
+        key = self._batch_key(payload)
+        loop = asyncio.get_running_loop()
+
+        batch = self._pending.get(key)
+        if batch is None:
+            template = {k: v for k, v in payload.items() if k not in ('prompt', 'user')}
+            batch = _PendingBatch(key=key, template=template)
+            batch.timer = loop.call_later(self.window, self._flush_key, key)
+            self._pending[key] = batch
+
+        item = _BatchItem(prompt=payload['prompt'], user_id=user_id, future=loop.create_future(),
+                          enqueued_at=time.perf_counter())
+        batch.items.append(item)
+
+        if len(batch.items) >= self.max_batch_size:
+            self._flush_key(key)
+
+        result = await item.future
+        record_span('queue_wait', item.dispatched_at - item.enqueued_at)
+        record_span('upstream_ttft', item.upstream_seconds)
+        return result
+
+    def _flush_key(self, key: str):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._send_batch(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def close(self):
+        """대기 중인 배치를 바로 보내고 전송 중인 배치가 끝날 때까지 대기 (종료 시 호출)"""
+        for key in list(self._pending):
+            self._flush_key(key)
+        if self._sending:
+            results = await asyncio.gather(*self._sending, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    logger.error(f"❌ Micro-batch send failed during shutdown: {result}")
+
+    async def _send_batch(self, batch: _PendingBatch):
+        # 타이머를 만든 첫 요청의 트레이스에 배치 전체 시간이 기록되지 않도록 분리
+        detach_trace()
+
+        items = batch.items
+        payload = dict(batch.template)
+        payload['prompt'] = [item.prompt for item in items]
+
+        self.batches += 1
+        self.batched_requests += len(items)
+
+        dispatched_at = time.perf_counter()
+        for item in items:
+            item.dispatched_at = dispatched_at
+            metrics.observe_stage('queue_wait', dispatched_at - item.enqueued_at)
+
+        try:
+            response = await self.sender(payload)
+            upstream_seconds = time.perf_counter() - dispatched_at
+            for item in items:
+                item.upstream_seconds = upstream_seconds
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        try:
+            is_json = response.headers.get("content-type", "").startswith("application/json")
+            body = response.json() if is_json else response.text
+
+            if response.status_code != 200 or not isinstance(body, dict):
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_result((response.status_code, body))
+                return
+
+            for item, result in zip(items, self._fan_out(body, items, int(payload.get('n') or 1))):
+                if not item.future.done():
+                    item.future.set_result((200, result))
+
+            logger.debug(f"📦 Micro-batch sent: {len(items)} prompts")
+
+        except Exception as e:
+            logger.error(f"❌ Micro-batch fan-out failed: {e}")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+    def _fan_out(self, body: Dict[str, Any], items: List[_BatchItem], n: int) -> List[Dict[str, Any]]:
+        """배치 응답의 choices 를 호출자별 응답으로 분할"""
+        choices = sorted(body.get('choices', []), key=lambda c: c.get('index', 0))
+        per_item: List[List[Dict[str, Any]]] = [[] for _ in items]
+        for position, choice in enumerate(choices):
+            owner = choice.get('index', position) // n
+            if 0 <= owner < len(items):
+                per_item[owner].append(choice)
+
+        usage = body.get('usage') or {}
+        prompt_shares = split_proportionally(
+            int(usage.get('prompt_tokens', 0)),
+            [self.token_counter(item.prompt) for item in items]
+        )
+        completion_shares = split_proportionally(
+            int(usage.get('completion_tokens', 0)),
+            [sum(self.token_counter(c.get('text', '')) for c in owned) for owned in per_item]
+        )
+
+        created = body.get('created', int(time.time()))
+        results = []
+        for i, owned in enumerate(per_item):
+            results.append({
+                'id': f"{body.get('id', 'cmpl')}-{i}",
+                'object': body.get('object', 'text_completion'),
+                'created': created,
+                'model': body.get('model'),
+                'choices': [dict(choice, index=j) for j, choice in enumerate(owned)],
+                'usage': {
+                    'prompt_tokens': prompt_shares[i],
+                    'completion_tokens': completion_shares[i],
+                    'total_tokens': prompt_shares[i] + completion_shares[i]
+                }
+            })
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """배치 통계"""
+        return {
+            'batches': self.batches,
+            'batched_requests': self.batched_requests,
+            'average_batch_size': round(self.batched_requests / max(self.batches, 1), 2),
+            'pending_batches': len(self._pending),
+            'sending_batches': len(self._sending)
+        }
@@ -0,0 +1,273 @@
+"""
+Multi-backend vLLM upstream pool with hedged and retried requests
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UpstreamBackend:
+    """vLLM 백엔드 상태"""
+    url: str
+    in_flight: int = 0
+    total_requests: int = 0
+    connect_errors: int = 0
+    down_until: float = 0
+
+    def is_available(self, now: float) -> bool:
+        return self.down_until <= now
+
+
+@dataclass
+class HedgingPolicy:
+    """헤징 설정 (짧은 비스트리밍 completion 전용)"""
+    enabled: bool = False
+    max_tokens: int = 64  # 이 값 이하의 max_tokens 요청만 헤징
+    percentile: float = 95.0  # 헤징 지연 기준 백분위
+    initial_delay_ms: float = 500  # 표본이 부족할 때 사용하는 지연
+    min_delay_ms: float = 50
+    max_delay_ms: float = 2000
+    min_samples: int = 20
+
+
+@dataclass
+class RetryPolicy:
+    """연결 오류 재시도 설정"""
+    max_retries: int = 2
+    budget_ratio: float = 0.1  # 요청 1건당 적립되는 재시도 토큰
+    budget_cap: float = 10.0  # 재시도 토큰 최대 적립량
+    backoff_ms: float = 20
+    backend_cooldown_s: float = 5.0  # 연결 실패 백엔드 제외 시간
+
+
+@dataclass
+class PoolStats:
+    """풀 통계"""
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    retries: int = 0
+    retries_denied: int = 0
+    failures: int = 0
+
+
+class UpstreamPool:
+    """여러 vLLM 백엔드에 대한 요청 분배, 헤징 및 재시도
+
+    쿼터는 미들웨어에서 요청당 한 번만 차감되며, 헤징/재시도는 프록시 내부에서만
+    일어나므로 중복 전송이 사용량에 다시 기록되지 않습니다. 클라이언트에는 먼저
+    완료된 응답 하나만 반환되고 나머지 요청은 취소됩니다.
+    """
+
+    LATENCY_WINDOW = 256
+
+    def __init__(self, urls: List[str], hedging: Optional[HedgingPolicy] = None,
+                 retry: Optional[RetryPolicy] = None, timeout: float = 30.0):
+        if not urls:
+            raise ValueError("At least one upstream backend URL is required")
+
+        self.backends = [UpstreamBackend(url=url.rstrip('/')) for url in urls]
+        self.hedging = hedging or HedgingPolicy()
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.stats = PoolStats()
+
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._latency_samples = 0
+        self._hedge_delay = self.hedging.initial_delay_ms / 1000
+        self._retry_tokens = self.retry.budget_cap
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_config(cls, llm_config: Dict[str, Any]) -> Optional['UpstreamPool']:
+        """llm_server 설정에서 풀 생성 (백엔드가 2개 미만이면 None)"""
+        urls = llm_config.get('backends') or []
+        if len(urls) < 2:
+            return None
+
+        hedging_config = llm_config.get('hedging') or {}
+        retry_config = llm_config.get('retry') or {}
+
+        hedging = HedgingPolicy(**{k: v for k, v in hedging_config.items()
+                                   if k in HedgingPolicy.__dataclass_fields__})
+        retry = RetryPolicy(**{k: v for k, v in retry_config.items()
+                               if k in RetryPolicy.__dataclass_fields__})
+
+        return cls(urls, hedging=hedging, retry=retry,
+                   timeout=float(llm_config.get('timeout', 30.0)))
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def close(self):
+        """HTTP 클라이언트 종료"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def is_hedge_eligible(self, payload: Dict[str, Any]) -> bool:
+        """헤징 대상 요청인지 확인 (짧고 스트리밍이 아닌 completion)"""
+        if not self.hedging.enabled or payload.get('stream'):
+            return False
+        return int(payload.get('max_tokens') or 16) <= self.hedging.max_tokens
+
+    def hedge_delay(self) -> float:
+        """현재 헤징 지연 (초, 헤징 대상 요청의 지연 백분위 기준)"""
+        return self._hedge_delay
+
+    def _record_latency(self, latency: float):
+        self._latencies.append(latency)
+        self._latency_samples += 1
+
+        # 백분위 재계산은 16건마다 한 번만 수행
+        if len(self._latencies) >= self.hedging.min_samples and self._latency_samples % 16 == 0:
+            ordered = sorted(self._latencies)
+            index = min(len(ordered) - 1, int(len(ordered) * self.hedging.percentile / 100))
+            delay = ordered[index]
+            self._hedge_delay = min(max(delay, self.hedging.min_delay_ms / 1000),
+                                    self.hedging.max_delay_ms / 1000)
+
+    def _pick(self, exclude: Set[int] = frozenset()) -> Optional[int]:
+        """진행 중 요청이 가장 적은 가용 백엔드 선택"""
+        now = time.time()
+        candidates = [i for i, b in enumerate(self.backends) if i not in exclude and b.is_available(now)]
+        if not candidates:
+            # 모두 다운으로 표시된 경우 제외 목록만 적용
+            candidates = [i for i in range(len(self.backends)) if i not in exclude]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda i: self.backends[i].in_flight)
+
+    def _take_retry_token(self) -> bool:
+        if self._retry_tokens >= 1:
+            self._retry_tokens -= 1
+            return True
+        return False
+
+    async def _send(self, index: int, path: str, payload: Dict[str, Any],
+                    record_latency: bool = False) -> httpx.Response:
+        backend = self.backends[index]
+        backend.in_flight += 1
+        backend.total_requests += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(f"{backend.url}{path}", json=payload)
+            if record_latency:
+                self._record_latency(time.perf_counter() - start)
+            return response
+        finally:
+            backend.in_flight -= 1
+
+    async def _send_with_retry(self, path: str, payload: Dict[str, Any], tried: Set[int],
+                               record_latency: bool = False) -> httpx.Response:
+        """연결 오류 시 다른 백엔드로 예산 범위 내에서 재시도 (record_latency 면 헤징 지연 표본에 추가)"""
+        attempt = 0
+        while True:
+            index = self._pick(tried)
+            if index is None:
+                index = self._pick()
+            tried.add(index)
+
+            try:
+                return await self._send(index, path, payload, record_latency)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                backend = self.backends[index]
+                backend.connect_errors += 1
+                backend.down_until = time.time() + self.retry.backend_cooldown_s
+                logger.warning(f"⚠️ Upstream connect error: {backend.url}")
+
+                if attempt >= self.retry.max_retries:
+                    raise
+                if not self._take_retry_token():
+                    self.stats.retries_denied += 1
+                    raise
+
+                attempt += 1
+                self.stats.retries += 1
+                backoff = self.retry.backoff_ms / 1000 * attempt
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+
+    async def post(self, path: str, payload: Dict[str, Any], hedge: bool = False) -> httpx.Response:
+        """업스트림으로 POST 요청 (필요 시 헤징)"""
+        self.stats.requests += 1
+        self._retry_tokens = min(self.retry.budget_cap, self._retry_tokens + self.retry.budget_ratio)
+
+        try:
+            if hedge:
+                return await self._hedged(path, payload)
+            return await self._send_with_retry(path, payload, set())
+        except Exception:
+            self.stats.failures += 1
+            raise
+
+    async def _hedged(self, path: str, payload: Dict[str, Any]) -> httpx.Response:
+        tried: Set[int] = set()
+        primary = asyncio.ensure_future(self._send_with_retry(path, payload, tried, record_latency=True))
+        tasks = {primary}
+        try:
+            # asyncio.wait 는 호출자가 취소되어도 작업을 취소하지 않으므로 finally 에서 정리
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+            if done:
+                return primary.result()
+
+            # 다른 백엔드가 없으면 헤징하지 않음
+            if self._pick(tried) is None:
+                return await primary
+
+            self.stats.hedges += 1
+            secondary = asyncio.ensure_future(self._send_with_retry(path, payload, tried, record_latency=True))
+            tasks.add(secondary)
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # 늦게 끝난 요청과 호출자 취소 시 진행 중인 요청은 취소 (vLLM은 연결 종료 시 생성을 중단)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """풀 상태 요약"""
+        now = time.time()
+        return {
+            'requests': self.stats.requests,
+            'hedges': self.stats.hedges,
+            'hedge_wins': self.stats.hedge_wins,
+            'retries': self.stats.retries,
+            'retries_denied': self.stats.retries_denied,
+            'failures': self.stats.failures,
+            'hedge_delay_ms': round(self._hedge_delay * 1000, 1),
+            'retry_tokens': round(self._retry_tokens, 2),
+            'backends': [
+                {
+                    'url': b.url,
+                    'in_flight': b.in_flight,
+                    'total_requests': b.total_requests,
+                    'connect_errors': b.connect_errors,
+                    'available': b.is_available(now)
+                }
+                for b in self.backends
+            ]
+        }
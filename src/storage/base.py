@@ -0,0 +1,90 @@
+"""
+Storage interface shared by the Korean usage storage backends
+"""
+
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+
+@runtime_checkable
+class UsageStorage(Protocol):
+    """KoreanRateLimiter 가 사용하는 저장소 인터페이스
+
+    RedisStorage, SQLiteStorage, MemoryStorage 가 같은 동작을 보장해야 하는 계약이며
+    tester/storage_conformance.py 가 모든 백엔드에 대해 확인합니다.
+
+    - 구간: 분/시간/일은 로컬 시각 경계 기준이며, 다음 구간이 되면 0 부터 다시
+      셉니다. 요청 수는 모든 구간에 함께 기록합니다.
+    - 사용량 딕셔너리: requests_this_minute, tokens_this_minute, tokens_this_hour,
+      tokens_today, total_requests, total_tokens, last_request_time,
+      cooldown_until, user_type. 기록이 없는 사용자는 모두 0 입니다.
+    - get_user_usage, gcra_acquire: 제한 판정에 쓰이므로 조회 실패를 0 으로 감추지
+      않고 예외를 올립니다. 제한기는 이를 저장소 장애로 보고 저하 모드로 판정합니다.
+    - reset_user_usage: 현재 구간 사용량, GCRA 상태, 쿨다운만 지우고 누적
+      통계(total_*)와 히스토리는 유지합니다.
+    - get_top_users: minute/hour/today 는 해당 구간에 사용 기록이 있는 사용자만
+      토큰 내림차순으로, requests 는 그 구간의 요청 수입니다. total 은 누적 기준.
+    - get_user_history: 최신순이며 사용자별 최근 기록을 보존합니다.
+      update_actual_tokens 도 actual_* 필드가 있는 항목으로 남깁니다.
+    """
+
+    async def ping(self) -> bool:
+        """연결 상태 확인"""
+        ...
+
+    async def close(self):
+        """연결 종료 (미기록 상태가 있으면 반영)"""
+        ...
+
+    async def get_user_usage(self, user_id: str, group_ids: Sequence[str] = ()) -> Dict[str, int]:
+        """사용자 현재 구간/누적 사용량 (group_ids 지정 시 'groups' 에 그룹별 구간 사용량)"""
+        ...
+
+    async def get_users_usage(self, user_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, int]]:
+        """여러 사용자 사용량 (None 이면 오늘 활성 사용자 전체)"""
+        ...
+
+    async def record_usage(self, user_id: str, tokens: int, requests: int = 1, group_ids: Sequence[str] = ()):
+        """사용량 기록 (group_ids 의 공유 사용량도 함께 증가)"""
+        ...
+
+    async def record_usage_many(self, entries: Sequence[Tuple[str, int, int, Sequence[str]]],
+                                timestamp: Optional[float] = None):
+        """(user_id, tokens, requests, group_ids) 목록을 한 번에 기록 (timestamp 지정 시 그 시각의 구간에 기록)"""
+        ...
+
+    async def gcra_acquire(self, user_id: str, entries: Sequence[Tuple[str, str, int, float, float]],
+                           now: Optional[float] = None) -> Tuple[int, float]:
+        """GCRA 원자적 확인/갱신: (0, 0) 허용, (-1, cooldown_until) 쿨다운, (i, retry_after) 초과"""
+        ...
+
+    async def update_actual_tokens(self, user_id: str, actual_input: int, actual_output: int):
+        """실제 토큰 사용량을 히스토리에 기록"""
+        ...
+
+    async def set_user_cooldown(self, user_id: str, cooldown_until: float):
+        """쿨다운 설정"""
+        ...
+
+    async def reset_user_usage(self, user_id: str):
+        """현재 구간 사용량, GCRA 상태, 쿨다운 초기화"""
+        ...
+
+    async def get_all_users(self) -> List[str]:
+        """기록이 있는 모든 사용자"""
+        ...
+
+    async def get_top_users(self, limit: int = 10, period: str = "today") -> List[Dict]:
+        """상위 사용자 (period: minute, hour, today, total)"""
+        ...
+
+    async def get_usage_statistics(self) -> Dict:
+        """전체 사용자 수와 오늘 활성 사용자/토큰/요청 합계"""
+        ...
+
+    async def cleanup_expired_data(self, time_budget: Optional[float] = None) -> bool:
+        """만료 데이터 정리 (time_budget 초 안에 모두 끝나면 True)"""
+        ...
+
+    async def get_user_history(self, user_id: str, limit: int = 100) -> List[Dict]:
+        """최근 사용량 히스토리 (최신순)"""
+        ...
@@ -0,0 +1,509 @@
+"""
+In-process memory storage for Korean token usage tracking with periodic snapshots
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from src.utils.metrics import timed_storage_call
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def _get_buckets(timestamp: float) -> Tuple[int, int, int]:
+    """분/시간/일 bucket 번호 (로컬 시각 기준, SQLiteStorage 와 같은 경계)"""
+    local_seconds = int(timestamp) + time.localtime(timestamp).tm_gmtoff
+    return local_seconds // 60, local_seconds // 3600, local_seconds // 86400
+
+
+class _WindowSlot:
+    """분/시간/일 현재 구간 카운터 (구간이 바뀌면 다음 기록 때 0 부터 다시 셈)"""
+
+    __slots__ = ('minute_bucket', 'minute_tokens', 'minute_requests',
+                 'hour_bucket', 'hour_tokens', 'hour_requests',
+                 'day_bucket', 'day_tokens', 'day_requests')
+
+    def __init__(self):
+        self.minute_bucket = self.hour_bucket = self.day_bucket = -1
+        self.minute_tokens = self.minute_requests = 0
+        self.hour_tokens = self.hour_requests = 0
+        self.day_tokens = self.day_requests = 0
+
+    def add(self, buckets: Tuple[int, int, int], tokens: int, requests: int) -> bool:
+        """현재 구간에 더하고, 그날 첫 기록이면 True
+
+        저장된 구간보다 이전 구간의 기록(늦게 도착한 일괄 기록)은 그 구간을 건너뜁니다
+        (Redis USAGE_SCRIPT 와 같은 동작).
+        """
+        minute, hour, day = buckets
+        if self.minute_bucket < minute:
+            self.minute_bucket, self.minute_tokens, self.minute_requests = minute, 0, 0
+        if self.minute_bucket == minute:
+            self.minute_tokens += tokens
+            self.minute_requests += requests
+        if self.hour_bucket < hour:
+            self.hour_bucket, self.hour_tokens, self.hour_requests = hour, 0, 0
+        if self.hour_bucket == hour:
+            self.hour_tokens += tokens
+            self.hour_requests += requests
+        new_day = self.day_bucket < day
+        if new_day:
+            self.day_bucket, self.day_tokens, self.day_requests = day, 0, 0
+        if self.day_bucket == day:
+            self.day_tokens += tokens
+            self.day_requests += requests
+        return new_day
+
+    def usage(self, buckets: Tuple[int, int, int]) -> Dict[str, int]:
+        minute, hour, day = buckets
+        current_minute = self.minute_bucket == minute
+        return {
+            'requests_this_minute': self.minute_requests if current_minute else 0,
+            'tokens_this_minute': self.minute_tokens if current_minute else 0,
+            'tokens_this_hour': self.hour_tokens if self.hour_bucket == hour else 0,
+            'tokens_today': self.day_tokens if self.day_bucket == day else 0
+        }
+
+    def window(self, period: str, buckets: Tuple[int, int, int]) -> Tuple[int, int]:
+        """period('minute'/'hour'/'today') 의 (토큰, 요청), 지난 구간이면 (0, 0)"""
+        minute, hour, day = buckets
+        if period == 'minute':
+            return (self.minute_tokens, self.minute_requests) if self.minute_bucket == minute else (0, 0)
+        if period == 'hour':
+            return (self.hour_tokens, self.hour_requests) if self.hour_bucket == hour else (0, 0)
+        return (self.day_tokens, self.day_requests) if self.day_bucket == day else (0, 0)
+
+    def to_row(self) -> List[int]:
+        return [getattr(self, name) for name in _WindowSlot.__slots__]
+
+    def load_row(self, row: Sequence[int]):
+        for name, value in zip(_WindowSlot.__slots__, row):
+            setattr(self, name, value)
+
+
+class _UserSlot(_WindowSlot):
+    """사용자별 카운터 + 누적 통계 + 최근 히스토리"""
+
+    __slots__ = ('total_tokens', 'total_requests', 'last_request_time', 'cooldown_until', 'history')
+
+    def __init__(self, history_size: int):
+        super().__init__()
+        self.total_tokens = 0
+        self.total_requests = 0
+        self.last_request_time = 0.0
+        self.cooldown_until = 0.0
+        # (timestamp, tokens, requests, 추가 데이터 또는 None)
+        self.history: Deque[Tuple[float, int, int, Optional[Dict[str, Any]]]] = deque(maxlen=history_size)
+
+
+class MemoryStorage:
+    """프로세스 메모리 기반 한국어 사용량 저장소 (단일 프로세스/단일 노드용)
+
+    사용자마다 __slots__ 객체 하나에 분/시간/일 카운터와 누적 통계를 두며, 모든
+    연산은 이벤트 루프 안에서 I/O 없이 끝납니다. snapshot_path 를 지정하면
+    snapshot_interval 초마다 변경분이 있을 때 상태를 복사해 별도 스레드에서
+    파일로 쓰고(임시 파일 후 교체), 시작 시 다시 읽습니다. 사용자 행은 지난
+    스냅샷 이후 바뀐 사용자만 다시 복사합니다. 여러 워커 프로세스가
+    같은 사용량을 공유해야 하면 Redis 를 사용하세요.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_interval: float = 10.0,
+                 history_per_user: int = 1000, user_retention_days: int = 30):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.history_per_user = history_per_user
+        self.user_retention_days = user_retention_days
+
+        self._users: Dict[str, _UserSlot] = {}
+        self._groups: Dict[str, _WindowSlot] = {}
+        self._gcra: Dict[str, float] = {}
+        self._day_totals = [-1, 0, 0, 0]  # [day bucket, 토큰, 요청, 활성 사용자]
+
+        self._dirty = False
+        # 지난 스냅샷 이후 바뀐 사용자와 사용자별 마지막 스냅샷 행 (행 목록은 교체만 하고 수정하지 않음)
+        self._dirty_users = set()
+        self._snapshot_rows: Dict[str, List[Any]] = {}
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_lock = asyncio.Lock()
+        self.snapshots_written = 0
+        self.last_snapshot_at = 0.0
+
+        if snapshot_path:
+            self._load_snapshot()
+
+    async def ping(self) -> bool:
+        """메모리 저장소는 항상 사용 가능"""
+        return True
+
+    async def close(self):
+        """스냅샷 주기 중지 후 마지막 스냅샷 저장"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        if self.snapshot_path and self._dirty:
+            await self.save_snapshot()
+        logger.info("✅ Memory storage closed")
+
+    def _user(self, user_id: str) -> _UserSlot:
+        slot = self._users.get(user_id)
+        if slot is None:
+            slot = self._users[user_id] = _UserSlot(self.history_per_user)
+        return slot
+
+    def _mark_dirty(self, user_ids: Sequence[str] = ()):
+        self._dirty = True
+        self._dirty_users.update(user_ids)
+        if self.snapshot_path and self._snapshot_task is None and self.snapshot_interval > 0:
+            self._snapshot_task = asyncio.get_running_loop().create_task(self._snapshot_loop())
+
+    def _user_usage(self, slot: Optional[_UserSlot], buckets: Tuple[int, int, int]) -> Dict[str, Any]:
+        if slot is None:
+            return {
+                'requests_this_minute': 0, 'tokens_this_minute': 0, 'tokens_this_hour': 0, 'tokens_today': 0,
+                'total_requests': 0, 'total_tokens': 0, 'last_request_time': 0, 'cooldown_until': 0,
+                'user_type': 'korean_user'
+            }
+        usage = slot.usage(buckets)
+        usage.update({
+            'total_requests': slot.total_requests,
+            'total_tokens': slot.total_tokens,
+            'last_request_time': slot.last_request_time,
+            'cooldown_until': slot.cooldown_until,
+            'user_type': 'korean_user'
+        })
+        return usage
+
+    @timed_storage_call('memory')
+    async def get_user_usage(self, user_id: str, group_ids: Sequence[str] = ()) -> Dict[str, int]:
+        """한국어 사용자 사용량 조회 (group_ids 지정 시 그룹 사용량 포함)"""
+        buckets = _get_buckets(time.time())
+        usage = self._user_usage(self._users.get(user_id), buckets)
+        if group_ids:
+            empty = _WindowSlot()
+            usage['groups'] = {
+                group_id: self._groups.get(group_id, empty).usage(buckets) for group_id in group_ids
+            }
+        return usage
+
+    @timed_storage_call('memory')
+    async def get_users_usage(self, user_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, int]]:
+        """여러 사용자 사용량 조회 (None 이면 오늘 활성 사용자 전체)"""
+        buckets = _get_buckets(time.time())
+        if user_ids is None:
+            return {
+                user_id: self._user_usage(slot, buckets)
+                for user_id, slot in self._users.items() if slot.day_bucket == buckets[2]
+            }
+        return {user_id: self._user_usage(self._users.get(user_id), buckets) for user_id in user_ids}
+
+    def _write_usage(self, user_id: str, tokens: int, requests: int, group_ids: Sequence[str],
+                     current_time: float, buckets: Tuple[int, int, int]):
+        slot = self._user(user_id)
+        new_today = slot.add(buckets, tokens, requests)
+        slot.total_tokens += tokens
+        slot.total_requests += requests
+        slot.last_request_time = max(slot.last_request_time, current_time)
+        slot.history.append((current_time, tokens, requests, None))
+
+        # 지난 날의 늦은 기록은 오늘 합계에 넣지 않음
+        totals = self._day_totals
+        if totals[0] < buckets[2]:
+            totals[:] = [buckets[2], 0, 0, 0]
+        if totals[0] == buckets[2]:
+            totals[1] += tokens
+            totals[2] += requests
+            totals[3] += int(new_today)
+
+        for group_id in group_ids:
+            group = self._groups.get(group_id)
+            if group is None:
+                group = self._groups[group_id] = _WindowSlot()
+            group.add(buckets, tokens, requests)
+
+    @timed_storage_call('memory')
+    async def record_usage(self, user_id: str, tokens: int, requests: int = 1, group_ids: Sequence[str] = ()):
+        """한국어 사용자 사용량 기록 (group_ids 의 공유 사용량도 함께 증가)"""
+        current_time = time.time()
+        self._write_usage(user_id, tokens, requests, group_ids, current_time, _get_buckets(current_time))
+        self._mark_dirty((user_id,))
+        logger.debug(f"📊 Recorded Korean usage: {user_id} -> {tokens} tokens, {requests} requests")
+
+    @timed_storage_call('memory')
+    async def record_usage_many(self, entries: Sequence[Tuple[str, int, int, Sequence[str]]],
+                                timestamp: Optional[float] = None):
+        """여러 사용자의 누적 사용량 (user_id, tokens, requests, group_ids) 기록"""
+        if not entries:
+            return
+        current_time = time.time() if timestamp is None else timestamp
+        buckets = _get_buckets(current_time)
+        for user_id, tokens, requests, group_ids in entries:
+            self._write_usage(user_id, tokens, requests, group_ids, current_time, buckets)
+        self._mark_dirty([entry[0] for entry in entries])
+        logger.debug(f"📊 Recorded Korean usage batch: {len(entries)} users")
+
+    @timed_storage_call('memory')
+    async def gcra_acquire(self, user_id: str, entries: Sequence[Tuple[str, str, int, float, float]],
+                           now: Optional[float] = None) -> Tuple[int, float]:
+        """GCRA 제한 확인 및 갱신 (await 없이 처리하므로 원자적)
+
+        반환: (0, 0) 허용, (-1, cooldown_until) 쿨다운, (i, retry_after) i번째(1부터) 제한 초과
+        limit <= 0 인 제한은 항상 초과이며 retry_after 는 period 입니다.
+        """
+        if now is None:
+            now = time.time()
+
+        slot = self._users.get(user_id)
+        if slot is not None and slot.cooldown_until > now:
+            return -1, slot.cooldown_until
+
+        new_tats = []
+        for i, (subject, name, limit, period, cost) in enumerate(entries, start=1):
+            if limit <= 0:
+                return i, float(period)
+            state_key = f"{subject}:{name}"
+            tat = max(self._gcra.get(state_key, 0.0), now)
+            new_tat = tat + cost * period / limit
+            if new_tat - now > period:
+                return i, new_tat - now - period
+            new_tats.append((state_key, new_tat))
+
+        self._gcra.update(new_tats)
+        self._mark_dirty()
+        return 0, 0.0
+
+    @timed_storage_call('memory')
+    async def update_actual_tokens(self, user_id: str, actual_input: int, actual_output: int):
+        """실제 토큰 사용량을 히스토리에 기록"""
+        current_time = time.time()
+        actual_total = actual_input + actual_output
+        self._user(user_id).history.append((current_time, actual_total, 0, {
+            'actual_input': actual_input,
+            'actual_output': actual_output,
+            'actual_total': actual_total,
+            'updated_at': current_time
+        }))
+        self._mark_dirty((user_id,))
+        logger.debug(f"🔄 Updated actual tokens for Korean user {user_id}: {actual_total}")
+
+    @timed_storage_call('memory')
+    async def set_user_cooldown(self, user_id: str, cooldown_until: float):
+        """한국어 사용자 쿨다운 설정"""
+        self._user(user_id).cooldown_until = cooldown_until
+        self._mark_dirty((user_id,))
+        logger.info(f"⏰ Set cooldown for Korean user '{user_id}' until {cooldown_until}")
+
+    @timed_storage_call('memory')
+    async def reset_user_usage(self, user_id: str):
+        """한국어 사용자 현재 구간 사용량, GCRA 상태, 쿨다운 초기화"""
+        slot = self._users.get(user_id)
+        if slot is not None:
+            totals = self._day_totals
+            if slot.day_bucket == totals[0]:
+                totals[1] -= slot.day_tokens
+                totals[2] -= slot.day_requests
+                totals[3] -= 1
+            _WindowSlot.__init__(slot)
+            slot.cooldown_until = 0.0
+
+        for name in ('rpm', 'tpm', 'tph', 'daily'):
+            self._gcra.pop(f"{user_id}:{name}", None)
+        self._mark_dirty((user_id,))
+        logger.info(f"🔄 Reset usage for Korean user '{user_id}'")
+
+    async def get_all_users(self) -> List[str]:
+        """모든 한국어 사용자 목록 (최근 사용 순)"""
+        return sorted(self._users, key=lambda user_id: self._users[user_id].last_request_time, reverse=True)
+
+    @timed_storage_call('memory')
+    async def get_top_users(self, limit: int = 10, period: str = "today") -> List[Dict]:
+        """상위 한국어 사용자 조회"""
+        buckets = _get_buckets(time.time())
+        stats = []
+        for user_id, slot in self._users.items():
+            if period in ("today", "hour", "minute"):
+                tokens, requests = slot.window(period, buckets)
+                if not tokens and not requests:
+                    continue
+            else:  # total
+                tokens, requests = slot.total_tokens, slot.total_requests
+            stats.append({'user_id': user_id, 'tokens': tokens, 'requests': requests, 'user_type': 'korean_user'})
+
+        stats.sort(key=lambda item: item['tokens'], reverse=True)
+        return stats[:limit]
+
+    @timed_storage_call('memory')
+    async def get_usage_statistics(self) -> Dict:
+        """전체 한국어 사용량 통계 (오늘 합계는 기록 시 함께 갱신)"""
+        current_time = time.time()
+        day, tokens, requests, active_users = self._day_totals
+        if day != _get_buckets(current_time)[2]:
+            tokens, requests, active_users = 0, 0, 0
+        return {
+            'total_users': len(self._users),
+            'active_users_today': active_users,
+            'total_tokens_today': tokens,
+            'total_requests_today': requests,
+            'average_tokens_per_user': tokens / max(active_users, 1),
+            'timestamp': current_time,
+            'system_type': 'korean_llm_limiter'
+        }
+
+    @timed_storage_call('memory')
+    async def cleanup_expired_data(self, time_budget: Optional[float] = None) -> bool:
+        """오래 사용하지 않은 사용자/그룹과 지난 GCRA 상태 삭제"""
+        current_time = time.time()
+        buckets = _get_buckets(current_time)
+        cutoff_time = current_time - self.user_retention_days * 86400
+
+        expired_users = [
+            user_id for user_id, slot in self._users.items()
+            if slot.last_request_time < cutoff_time and slot.cooldown_until < current_time
+            and (not slot.history or slot.history[-1][0] < cutoff_time)
+        ]
+        for user_id in expired_users:
+            del self._users[user_id]
+
+        cutoff_day = buckets[2] - self.user_retention_days
+        expired_groups = [group_id for group_id, slot in self._groups.items() if slot.day_bucket < cutoff_day]
+        for group_id in expired_groups:
+            del self._groups[group_id]
+
+        expired_tats = [state_key for state_key, tat in self._gcra.items() if tat < current_time]
+        for state_key in expired_tats:
+            del self._gcra[state_key]
+
+        deleted = len(expired_users) + len(expired_groups) + len(expired_tats)
+        if deleted:
+            self._mark_dirty(expired_users)
+            logger.info(f"🧹 Cleaned up {deleted} expired Korean memory entries")
+        return True
+
+    @timed_storage_call('memory')
+    async def get_user_history(self, user_id: str, limit: int = 100) -> List[Dict]:
+        """한국어 사용자 사용량 히스토리 조회 (최신순)"""
+        slot = self._users.get(user_id)
+        if slot is None:
+            return []
+
+        history = []
+        for timestamp, tokens, requests, extra in reversed(slot.history):
+            data = {
+                'tokens': tokens,
+                'requests': requests,
+                'timestamp': timestamp,
+                'date': datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+                'user_id': user_id
+            }
+            if extra:
+                data.update(extra)
+            history.append(data)
+            if len(history) >= limit:
+                break
+        return history
+
+    # 스냅샷
+
+    def _snapshot_state(self) -> Dict[str, Any]:
+        """현재 상태를 JSON 으로 쓸 수 있는 목록으로 복사 (이벤트 루프에서 짧게 실행)
+
+        바뀐 사용자의 행만 새로 만들고 나머지는 지난 스냅샷 행을 재사용하므로,
+        루프에서 드는 시간은 전체 사용자 수가 아니라 변경된 사용자 수에 비례합니다.
+        """
+        rows = self._snapshot_rows
+        for user_id in self._dirty_users:
+            slot = self._users.get(user_id)
+            if slot is None:
+                rows.pop(user_id, None)
+            else:
+                rows[user_id] = [slot.to_row(), slot.total_tokens, slot.total_requests, slot.last_request_time,
+                                 slot.cooldown_until, list(slot.history)]
+        self._dirty_users.clear()
+        return {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'users': dict(rows),
+            'groups': {group_id: slot.to_row() for group_id, slot in self._groups.items()},
+            'gcra': dict(self._gcra),
+            'day_totals': list(self._day_totals)
+        }
+
+    @staticmethod
+    def _write_snapshot(path: str, state: Dict[str, Any]):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    async def save_snapshot(self):
+        """상태를 복사한 뒤 파일 쓰기는 별도 스레드에서 수행"""
+        async with self._snapshot_lock:
+            self._dirty = False
+            state = self._snapshot_state()
+            try:
+                await asyncio.to_thread(self._write_snapshot, self.snapshot_path, state)
+            except Exception as e:
+                self._dirty = True
+                logger.error(f"❌ Failed to write Korean memory snapshot {self.snapshot_path}: {e}")
+                return
+            self.snapshots_written += 1
+            self.last_snapshot_at = time.time()
+            logger.debug(f"💾 Saved Korean memory snapshot: {len(self._users)} users")
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if self._dirty:
+                await self.save_snapshot()
+
+    def _load_snapshot(self):
+        """시작 시 스냅샷 읽기 (없거나 읽을 수 없으면 빈 상태로 시작)"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Failed to read Korean memory snapshot {self.snapshot_path}: {e}")
+            return
+        if state.get('version') != SNAPSHOT_VERSION:
+            logger.warning(f"⚠️ Ignoring Korean memory snapshot version {state.get('version')}")
+            return
+
+        for user_id, (row, total_tokens, total_requests, last_request_time,
+                      cooldown_until, history) in state.get('users', {}).items():
+            slot = self._user(user_id)
+            slot.load_row(row)
+            slot.total_tokens = total_tokens
+            slot.total_requests = total_requests
+            slot.last_request_time = last_request_time
+            slot.cooldown_until = cooldown_until
+            slot.history.extend(tuple(entry) for entry in history)
+        for group_id, row in state.get('groups', {}).items():
+            slot = self._groups[group_id] = _WindowSlot()
+            slot.load_row(row)
+        self._gcra = {state_key: float(tat) for state_key, tat in state.get('gcra', {}).items()}
+        self._day_totals = list(state.get('day_totals', self._day_totals))
+        self._dirty_users.update(self._users)
+        logger.info(f"✅ Loaded Korean memory snapshot: {len(self._users)} users from {self.snapshot_path}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'users': len(self._users),
+            'groups': len(self._groups),
+            'gcra_keys': len(self._gcra),
+            'snapshot_path': self.snapshot_path,
+            'snapshots_written': self.snapshots_written,
+            'last_snapshot_at': self.last_snapshot_at
+        }
@@ -2,338 +2,847 @@
 Redis storage implementation for Korean token usage tracking
 """
 
-import json
+import asyncio
 import time
+import zlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialWithJitterBackoff
 import logging
 
+from src.utils.metrics import timed_storage_call
+
 logger = logging.getLogger(__name__)
 
+# GCRA 원자적 확인/갱신
+# KEYS[1] = 사용자 해시 (쿨다운 필드 cd), KEYS[2..] = 제한별 TAT(이론적 도착 시각) 키
+# ARGV[1] = 현재 시각, 이후 제한마다 (limit, period, cost)
+# 반환: {0, 0} 허용 / {-1, cooldown_until} 쿨다운 / {i, retry_after} i번째 제한 초과
+# limit <= 0 인 제한은 항상 초과이며 retry_after 는 period
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cooldown = tonumber(redis.call('HGET', KEYS[1], 'cd') or '0')
+if cooldown > now then
+    return {-1, string.format('%.6f', cooldown)}
+end
+local new_tats = {}
+for i = 2, #KEYS do
+    local base = (i - 2) * 3
+    local limit = tonumber(ARGV[base + 2])
+    local period = tonumber(ARGV[base + 3])
+    local cost = tonumber(ARGV[base + 4])
+    if limit <= 0 then
+        return {i - 1, string.format('%.6f', period)}
+    end
+    local tat = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + cost * period / limit
+    if new_tat - now > period then
+        return {i - 1, string.format('%.6f', new_tat - now - period)}
+    end
+    new_tats[i] = new_tat
+end
+for i = 2, #KEYS do
+    local ttl_ms = math.ceil((new_tats[i] - now) * 1000) + 1000
+    redis.call('SET', KEYS[i], string.format('%.6f', new_tats[i]), 'PX', ttl_ms)
+end
+return {0, '0'}
+"""
+
+
+# 구간 교체와 증가를 한 해시 안에서 처리 (해시 하나만 다루므로 클러스터에서도 사용 가능)
+# KEYS[1] = 사용자/그룹 해시, 분/시간/일마다 구간 번호(mb/hb/db)와 토큰(mt/ht/dt), 요청(mr/hr/dr) 필드
+# ARGV = 분 구간, 시간 구간, 일 구간, tokens, requests, ttl, [last_request_time (사용자만, 누적 통계 갱신)]
+# 저장된 구간이 같으면 증가, 이전 구간이면 교체, 이미 다음 구간이면(늦게 도착한 기록) 구간 값은 건너뜀
+USAGE_SCRIPT = """
+local tokens = tonumber(ARGV[4])
+local requests = tonumber(ARGV[5])
+local prefixes = {'m', 'h', 'd'}
+for i = 1, 3 do
+    local p = prefixes[i]
+    local bucket = tonumber(ARGV[i])
+    local stored = tonumber(redis.call('HGET', KEYS[1], p .. 'b') or '-1')
+    if stored == bucket then
+        redis.call('HINCRBY', KEYS[1], p .. 't', tokens)
+        redis.call('HINCRBY', KEYS[1], p .. 'r', requests)
+    elseif stored < bucket then
+        redis.call('HSET', KEYS[1], p .. 'b', bucket, p .. 't', tokens, p .. 'r', requests)
+    end
+end
+if ARGV[7] then
+    redis.call('HINCRBY', KEYS[1], 'tt', tokens)
+    redis.call('HINCRBY', KEYS[1], 'tr', requests)
+    if tonumber(ARGV[7]) > tonumber(redis.call('HGET', KEYS[1], 'lt') or '0') then
+        redis.call('HSET', KEYS[1], 'lt', ARGV[7])
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return 1
+"""
+
+# 사용자 ID -> 짧은 번호 발급 (이미 있으면 기존 번호)
+# KEYS = ID -> 번호 해시, 번호 -> ID 해시, 번호 카운터 / ARGV[1] = 사용자 ID
+INTERN_SCRIPT = """
+local number = redis.call('HGET', KEYS[1], ARGV[1])
+if number then
+    return number
+end
+number = redis.call('INCR', KEYS[3])
+redis.call('HSET', KEYS[1], ARGV[1], number)
+redis.call('HSET', KEYS[2], number, ARGV[1])
+return tostring(number)
+"""
+
+# GCRA 되돌리기 (클러스터에서 뒤 대상이 거절했을 때 앞 대상의 차감분 복구)
+# KEYS = TAT 키, ARGV[1] = 현재 시각, ARGV[i + 1] = KEYS[i] 에서 되돌릴 간격 (cost * period / limit)
+GCRA_REFUND_SCRIPT = """
+local now = tonumber(ARGV[1])
+for i = 1, #KEYS do
+    local tat = tonumber(redis.call('GET', KEYS[i]) or '0')
+    local new_tat = tat - tonumber(ARGV[i + 1])
+    if new_tat > now then
+        redis.call('SET', KEYS[i], string.format('%.6f', new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+    else
+        redis.call('DEL', KEYS[i])
+    end
+end
+return 1
+"""
+
+# 키 구조 ({} 는 클러스터 해시 태그: 같은 태그의 키는 같은 슬롯)
+USER_KEY_PREFIX = "ku"      # ku:{번호} 사용자 해시 (구간, 누적 tt/tr, 마지막 요청 lt, 쿨다운 cd)
+GCRA_KEY_PREFIX = "kr"      # kr:{번호}:<제한> 사용자 TAT (사용자 해시와 같은 슬롯)
+GROUP_KEY_PREFIX = "kg"     # kg:{그룹} 그룹 공유 사용량 해시, kg:{그룹}:<제한> 그룹 TAT
+ACTIVE_KEY_PREFIX = "ka"    # ka:<일 구간>:<샤드> 그날 사용 기록이 있는 사용자 번호 집합 (번호 % 샤드 수)
+ID_MAP_KEY = "{kn}:ids"     # 사용자 ID -> 번호
+ID_NAMES_KEY = "{kn}:names"  # 번호 -> 사용자 ID
+ID_SEQ_KEY = "{kn}:seq"
+SCHEMA_KEY = "{kn}:schema"
+SCHEMA_VERSION = 2
+
+WINDOW_FIELDS = ('mb', 'mt', 'mr', 'hb', 'ht', 'hr', 'db', 'dt', 'dr')
+USER_FIELDS = WINDOW_FIELDS + ('tt', 'tr', 'lt', 'cd')
+
+USER_TTL = 2592000      # 30일 (마지막 기록 기준)
+GROUP_TTL = 172800      # 2일
+ACTIVE_TTL = 172800     # 2일
+
+HISTORY_STREAM_PREFIX = "korean_history_stream"
+
+# 히스토리 스트림 필드 (짧은 이름 -> 조회 결과 이름)
+HISTORY_FIELDS = {'t': 'tokens', 'r': 'requests', 'ai': 'actual_input', 'ao': 'actual_output'}
+
+
+def _get_buckets(ts: float) -> Tuple[int, int, int]:
+    """로컬 시각 기준 (분, 시간, 일) 구간 번호"""
+    local_seconds = int(ts) + time.localtime(ts).tm_gmtoff
+    return local_seconds // 60, local_seconds // 3600, local_seconds // 86400
+
 
 class RedisStorage:
-    """Redis 기반 한국어 사용량 저장소"""
+    """Redis 기반 한국어 사용량 저장소
+
+    사용자 ID 는 {kn}:ids 에서 발급한 짧은 번호로 바꿔 키에 쓰고(프로세스 캐시),
+    사용자마다 해시 하나(ku:{번호})에 분/시간/일 구간과 누적 통계, 쿨다운을 모두
+    필드로 둡니다. 구간 필드는 구간 번호(로컬 시각 기준 정수)와 함께 저장해 다음
+    구간의 첫 기록이 덮어쓰므로(USAGE_SCRIPT) 구간마다 키를 만들거나 만료시킬
+    필요가 없고, 작은 해시는 listpack 으로 저장되어 사용자당 메모리가 적습니다.
+
+    사용량 히스토리는 사용자별 리스트 대신 history_shards 개의 Redis Stream
+    (korean_history_stream:<n>) 에 기록합니다. 사용자는 crc32 로 샤드가 정해지고,
+    각 스트림은 XADD MAXLEN ~ history_maxlen 으로 길이를, cleanup_expired_data 의
+    XTRIM MINID ~ 로 보존 기간을 제한합니다. 과금/분석 소비자는 키를 찾을 필요 없이
+    스트림을 XREAD (read_history_events) 로 이어서 읽으면 됩니다. 사용자별 조회
+    (get_user_history)는 공유 샤드를 최신순으로 최대 history_scan_limit 항목까지만
+    훑으므로, 최근 기록이 드문 사용자는 결과가 일부만 나올 수 있습니다.
+
+    cluster=True 이면 RedisCluster 클라이언트를 사용합니다. 한 사용자의 키는 모두
+    {번호} 해시 태그로 같은 슬롯에 있어 사용자 단위 스크립트가 그대로 동작하고,
+    활성 사용자 집합은 aggregate_shards 개로 나눠 여러 노드에 분산한 뒤 읽을 때
+    합칩니다. 개인/그룹 GCRA 는 슬롯이 다르므로 대상별로 순서대로 확인하며, 뒤
+    대상에서 거절되면 앞 대상에서 차감한 양을 되돌립니다.
+
+    연결 풀은 max_connections 개로 제한하고(단일 노드는 가득 차면 pool_timeout
+    초까지 대기), 명령마다 socket_timeout 초 안에 응답이 없으면 지터가 섞인 지수
+    백오프로 retries 번까지 다시 시도합니다. 장애 시 요청이 오래 멈추지 않도록
+    기본값은 짧게 잡았으며, 그래도 실패하면 예외를 올려 제한기가 저하 모드
+    (StorageHealthChecker) 로 전환하게 합니다.
+    """
     
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, history_shards: int = 8, history_maxlen: int = 100000,
+                 history_retention_days: int = 7, history_scan_limit: int = 20000, cluster: bool = False,
+                 aggregate_shards: Optional[int] = None, max_connections: int = 64,
+                 socket_timeout: float = 0.25, connect_timeout: float = 0.5, pool_timeout: float = 0.1,
+                 retries: int = 2, backoff_base: float = 0.005, backoff_cap: float = 0.05,
+                 idle_check_interval: float = 30.0):
         self.redis_url = redis_url
+        self.cluster = cluster
+        self.aggregate_shards = max(1, aggregate_shards or (16 if cluster else 1))
+        self.max_connections = max_connections
+        self.socket_timeout = socket_timeout
+        self.connect_timeout = connect_timeout
+        self.pool_timeout = pool_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.idle_check_interval = idle_check_interval
+        self.reconnects = 0
+        self._ping_ok = True  # 마지막 ping 결과 (상태가 바뀔 때만 로그)
         self.redis = None
+        self._gcra_script = None
+        self._gcra_refund_script = None
+        self._usage_script = None
+        self._intern_script = None
+        self._user_numbers: Dict[str, str] = {}  # 사용자 ID -> 번호
+        self._user_names: Dict[str, str] = {}    # 번호 -> 사용자 ID
+        self.history_shards = max(1, history_shards)
+        self.history_maxlen = history_maxlen
+        self.history_retention_days = history_retention_days
+        self.history_scan_limit = max(1, history_scan_limit)
         self._connect()
     
     def _connect(self):
         """Redis 연결"""
         try:
-            self.redis = redis.from_url(
-                self.redis_url, 
+            options = dict(
                 decode_responses=True,
                 encoding='utf-8',
                 socket_keepalive=True,
-                socket_keepalive_options={}
+                socket_keepalive_options={},
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.connect_timeout,
+                # 연결 오류/시간 초과는 지터 백오프로 재시도 (동시에 몰리는 재연결 분산)
+                retry=Retry(ExponentialWithJitterBackoff(cap=self.backoff_cap, base=self.backoff_base),
+                            self.retries),
+                # 오래 쉰 연결은 사용 전에 PING 으로 확인
+                health_check_interval=self.idle_check_interval
             )
-            logger.info(f"✅ Connected to Redis: {self.redis_url}")
+            if self.cluster:
+                # 클러스터는 노드마다 max_connections 개
+                self.redis = RedisCluster.from_url(self.redis_url, max_connections=self.max_connections, **options)
+            else:
+                pool = redis.BlockingConnectionPool.from_url(
+                    self.redis_url, max_connections=self.max_connections, timeout=self.pool_timeout, **options
+                )
+                self.redis = redis.Redis(connection_pool=pool)
+            logger.info(f"✅ Connected to Redis{' Cluster' if self.cluster else ''}: {self.redis_url} "
+                        f"(pool {self.max_connections}, timeout {self.socket_timeout * 1000:g}ms, "
+                        f"retries {self.retries})")
         except Exception as e:
             logger.error(f"❌ Redis connection failed: {e}")
             raise
     
     async def ping(self) -> bool:
-        """Redis 연결 상태 확인"""
+        """Redis 연결 상태 확인 (장애 중 반복 실패는 처음 한 번만 오류 로그)"""
         try:
             await self.redis.ping()
-            return True
         except Exception as e:
-            logger.error(f"❌ Redis ping failed: {e}")
+            if self._ping_ok:
+                self._ping_ok = False
+                logger.error(f"❌ Redis ping failed: {e}")
+            else:
+                logger.debug(f"Redis ping still failing: {e}")
             return False
+        if not self._ping_ok:
+            self._ping_ok = True
+            logger.info("✅ Redis ping succeeded again")
+        return True
     
+    async def reconnect(self):
+        """풀의 연결을 모두 끊어 다음 명령부터 새 연결 사용 (장애 감지 시 StorageHealthChecker 가 호출)"""
+        try:
+            if self.cluster:
+                for node in self.redis.get_nodes():
+                    await node.disconnect()
+            else:
+                await self.redis.connection_pool.disconnect()
+            self.reconnects += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Redis reconnect failed: {e}")
+
+    def get_pool_stats(self) -> Dict:
+        """연결 풀 설정과 재연결 횟수 (/health)"""
+        return {
+            'cluster': self.cluster,
+            'max_connections': self.max_connections,
+            'socket_timeout_ms': self.socket_timeout * 1000,
+            'pool_timeout_ms': self.pool_timeout * 1000,
+            'retries': self.retries,
+            'reconnects': self.reconnects
+        }
+
     async def close(self):
         """연결 종료"""
         if self.redis:
             await self.redis.close()
             logger.info("✅ Redis connection closed")
     
-    def _get_time_keys(self, user_id: str, timestamp: Optional[float] = None) -> Dict[str, str]:
-        """시간대별 키 생성 (한국어 사용자 ID 지원)"""
-        if timestamp is None:
-            timestamp = time.time()
-        
-        dt = datetime.fromtimestamp(timestamp)
-        
-        # 한국어 사용자 ID를 위해 URL 인코딩
-        encoded_user_id = user_id.encode('utf-8').hex()
-        
+    def _pipeline(self):
+        """쓰기 파이프라인 (클러스터는 여러 슬롯에 걸치므로 MULTI 없이)"""
+        return self.redis.pipeline(transaction=not self.cluster)
+
+    def _user_key(self, number: str) -> str:
+        """사용자 해시 키 (구간/누적/쿨다운 필드)"""
+        return f"{USER_KEY_PREFIX}:{{{number}}}"
+
+    def _group_key(self, group_id: str) -> str:
+        """그룹 공유 사용량 해시 키 (구간 필드)"""
+        return f"{GROUP_KEY_PREFIX}:{{{group_id}}}"
+
+    def _active_key(self, day_bucket: int, shard: int) -> str:
+        """일별 활성 사용자 번호 집합 키 (샤드별)"""
+        return f"{ACTIVE_KEY_PREFIX}:{day_bucket}:{shard}"
+
+    def _active_shard(self, number: str) -> int:
+        return int(number) % self.aggregate_shards
+
+    def _gcra_head_key(self, user_id: str, number: str, subject: str) -> str:
+        """GCRA 대상의 해시 키 (사용자는 쿨다운 필드가 있는 사용자 해시, 같은 슬롯)"""
+        if subject == user_id:
+            return self._user_key(number)
+        if subject.startswith('group:'):
+            return self._group_key(subject[len('group:'):])
+        return f"{GCRA_KEY_PREFIX}:{{{subject}}}"
+
+    def _gcra_key(self, user_id: str, number: str, subject: str, name: str) -> str:
+        """GCRA TAT 키 (대상 해시 키와 같은 해시 태그)"""
+        if subject == user_id:
+            return f"{GCRA_KEY_PREFIX}:{{{number}}}:{name}"
+        return f"{self._gcra_head_key(user_id, number, subject)}:{name}"
+
+    async def _get_user_number(self, user_id: str, create: bool = False) -> Optional[str]:
+        """사용자 ID -> 짧은 번호 (프로세스 캐시, 없으면 create 일 때만 새로 발급)"""
+        number = self._user_numbers.get(user_id)
+        if number is not None:
+            return number
+
+        if create:
+            if self._intern_script is None:
+                self._intern_script = self.redis.register_script(INTERN_SCRIPT)
+            number = str(await self._intern_script(keys=[ID_MAP_KEY, ID_NAMES_KEY, ID_SEQ_KEY], args=[user_id]))
+        else:
+            number = await self.redis.hget(ID_MAP_KEY, user_id)
+            if number is None:
+                return None
+        self._cache_user_number(user_id, number)
+        return number
+
+    async def _get_user_numbers(self, user_ids: Sequence[str]) -> Dict[str, str]:
+        """여러 사용자 번호 조회 (캐시에 없는 사용자는 HMGET 한 번, 번호가 없는 사용자는 제외)"""
+        numbers = {}
+        missing = []
+        for user_id in user_ids:
+            number = self._user_numbers.get(user_id)
+            if number is None:
+                missing.append(user_id)
+            else:
+                numbers[user_id] = number
+        if missing:
+            for user_id, number in zip(missing, await self.redis.hmget(ID_MAP_KEY, missing)):
+                if number is not None:
+                    self._cache_user_number(user_id, number)
+                    numbers[user_id] = number
+        return numbers
+
+    async def _get_user_names(self, numbers: Sequence[str]) -> Dict[str, str]:
+        """번호 -> 사용자 ID (캐시에 없는 번호는 HMGET 한 번)"""
+        names = {}
+        missing = []
+        for number in numbers:
+            user_id = self._user_names.get(number)
+            if user_id is None:
+                missing.append(number)
+            else:
+                names[number] = user_id
+        if missing:
+            for number, user_id in zip(missing, await self.redis.hmget(ID_NAMES_KEY, missing)):
+                if user_id is not None:
+                    self._cache_user_number(user_id, number)
+                    names[number] = user_id
+        return names
+
+    def _cache_user_number(self, user_id: str, number: str):
+        self._user_numbers[user_id] = number
+        self._user_names[number] = user_id
+
+    @staticmethod
+    def _window_values(values: Sequence[Optional[str]], buckets: Tuple[int, int, int]) -> List[int]:
+        """HMGET(WINDOW_FIELDS) 결과에서 현재 구간 값만 [분 토큰, 분 요청, 시간 토큰, 시간 요청, 일 토큰, 일 요청]"""
+        result = []
+        for i, bucket in enumerate(buckets):
+            stored_bucket, tokens, requests = values[i * 3:i * 3 + 3]
+            if stored_bucket is not None and int(stored_bucket) == bucket:
+                result.extend((int(tokens or 0), int(requests or 0)))
+            else:
+                result.extend((0, 0))
+        return result
+
+    @classmethod
+    def _usage_from_fields(cls, values: Optional[Sequence[Optional[str]]],
+                           buckets: Tuple[int, int, int]) -> Dict[str, int]:
+        """HMGET(USER_FIELDS) 결과 -> 사용량 딕셔너리 (None 이면 기록 없음)"""
+        if values is None:
+            values = (None,) * len(USER_FIELDS)
+        minute_tokens, minute_requests, hour_tokens, _, day_tokens, _ = cls._window_values(values, buckets)
+        total_tokens, total_requests, last_request_time, cooldown_until = values[len(WINDOW_FIELDS):]
         return {
-            'minute': f"korean_usage:{encoded_user_id}:minute:{dt.strftime('%Y%m%d%H%M')}",
-            'hour': f"korean_usage:{encoded_user_id}:hour:{dt.strftime('%Y%m%d%H')}",
-            'day': f"korean_usage:{encoded_user_id}:day:{dt.strftime('%Y%m%d')}",
-            'user_info': f"korean_user:{encoded_user_id}:info",
-            'user_mapping': f"korean_mapping:{encoded_user_id}"
+            'requests_this_minute': minute_requests,
+            'tokens_this_minute': minute_tokens,
+            'tokens_this_hour': hour_tokens,
+            'tokens_today': day_tokens,
+            'total_requests': int(total_requests or 0),
+            'total_tokens': int(total_tokens or 0),
+            'last_request_time': float(last_request_time or 0),
+            'cooldown_until': float(cooldown_until or 0),
+            'user_type': 'korean_user'
         }
-    
-    def _encode_user_id(self, user_id: str) -> str:
-        """한국어 사용자 ID 인코딩"""
-        return user_id.encode('utf-8').hex()
-    
-    def _decode_user_id(self, encoded_id: str) -> str:
-        """한국어 사용자 ID 디코딩"""
-        try:
-            return bytes.fromhex(encoded_id).decode('utf-8')
-        except:
-            return encoded_id  # 디코딩 실패 시 원본 반환
-    
-    async def get_user_usage(self, user_id: str) -> Dict[str, int]:
-        """한국어 사용자 사용량 조회"""
+
+    @timed_storage_call('redis')
+    async def get_user_usage(self, user_id: str, group_ids: Sequence[str] = ()) -> Dict[str, int]:
+        """한국어 사용자 사용량 조회 (group_ids 지정 시 그룹 사용량도 같은 파이프라인에서 조회)"""
         try:
-            keys = self._get_time_keys(user_id)
-            
-            # 사용자 ID 매핑 저장 (한국어 -> 인코딩된 형태)
-            await self.redis.hset(keys['user_mapping'], mapping={
-                'original_id': user_id,
-                'encoded_id': self._encode_user_id(user_id),
-                'last_access': time.time()
-            })
-            
-            # 파이프라인으로 모든 데이터 한번에 조회
-            pipe = self.redis.pipeline()
-            pipe.hgetall(keys['minute'])
-            pipe.hgetall(keys['hour'])
-            pipe.hgetall(keys['day'])
-            pipe.hgetall(keys['user_info'])
-            
+            buckets = _get_buckets(time.time())
+            number = await self._get_user_number(user_id)
+            if number is None and not group_ids:
+                return self._usage_from_fields(None, buckets)
+
+            # 사용자 해시 하나와 그룹 해시들을 한 번에 조회
+            pipe = self.redis.pipeline(transaction=False)
+            if number is not None:
+                pipe.hmget(self._user_key(number), USER_FIELDS)
+            for group_id in group_ids:
+                pipe.hmget(self._group_key(group_id), WINDOW_FIELDS)
             results = await pipe.execute()
-            minute_data, hour_data, day_data, user_info = results
-            
-            return {
-                'requests_this_minute': int(minute_data.get('requests', 0)),
-                'tokens_this_minute': int(minute_data.get('tokens', 0)),
-                'tokens_this_hour': int(hour_data.get('tokens', 0)),
-                'tokens_today': int(day_data.get('tokens', 0)),
-                'total_requests': int(user_info.get('total_requests', 0)),
-                'total_tokens': int(user_info.get('total_tokens', 0)),
-                'last_request_time': float(user_info.get('last_request_time', 0)),
-                'cooldown_until': float(user_info.get('cooldown_until', 0)),
-                'user_type': user_info.get('user_type', 'korean_user')
-            }
-        
+
+            usage = self._usage_from_fields(results.pop(0) if number is not None else None, buckets)
+            if group_ids:
+                usage['groups'] = {}
+                for group_id, values in zip(group_ids, results):
+                    minute_tokens, minute_requests, hour_tokens, _, day_tokens, _ = self._window_values(values, buckets)
+                    usage['groups'][group_id] = {
+                        'requests_this_minute': minute_requests,
+                        'tokens_this_minute': minute_tokens,
+                        'tokens_this_hour': hour_tokens,
+                        'tokens_today': day_tokens
+                    }
+
+            return usage
+
         except Exception as e:
             logger.error(f"❌ Failed to get usage for Korean user {user_id}: {e}")
-            return {
-                'requests_this_minute': 0,
-                'tokens_this_minute': 0,
-                'tokens_this_hour': 0,
-                'tokens_today': 0,
-                'total_requests': 0,
-                'total_tokens': 0,
-                'last_request_time': 0,
-                'cooldown_until': 0,
-                'user_type': 'korean_user'
+            raise
+
+    async def _get_active_numbers(self, timestamp: Optional[float] = None) -> List[str]:
+        """오늘 사용 기록이 있는 사용자 번호 목록 (샤드 집합을 읽어 합침)"""
+        if timestamp is None:
+            timestamp = time.time()
+        day_bucket = _get_buckets(timestamp)[2]
+        pipe = self.redis.pipeline(transaction=False)
+        for shard in range(self.aggregate_shards):
+            pipe.smembers(self._active_key(day_bucket, shard))
+        numbers = []
+        for members in await pipe.execute():
+            numbers.extend(members)
+        return numbers
+
+    async def get_active_users(self, timestamp: Optional[float] = None) -> List[str]:
+        """오늘 사용 기록이 있는 사용자 목록 (일별 활성 집합)"""
+        names = await self._get_user_names(await self._get_active_numbers(timestamp))
+        return list(names.values())
+
+    @timed_storage_call('redis')
+    async def get_users_usage(self, user_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, int]]:
+        """여러 사용자 사용량을 파이프라인 한 번으로 조회 (None 이면 오늘 활성 사용자 전체)"""
+        try:
+            current_time = time.time()
+            buckets = _get_buckets(current_time)
+            if user_ids is None:
+                names = await self._get_user_names(await self._get_active_numbers(current_time))
+                numbers = {user_id: number for number, user_id in names.items()}
+                user_ids = list(numbers)
+            else:
+                user_ids = list(dict.fromkeys(user_ids))
+                numbers = await self._get_user_numbers(user_ids)
+            if not user_ids:
+                return {}
+
+            pipe = self.redis.pipeline(transaction=False)
+            known = [user_id for user_id in user_ids if user_id in numbers]
+            for user_id in known:
+                pipe.hmget(self._user_key(numbers[user_id]), USER_FIELDS)
+            results = dict(zip(known, await pipe.execute() if known else []))
+
+            return {user_id: self._usage_from_fields(results.get(user_id), buckets) for user_id in user_ids}
+
+        except Exception as e:
+            # 빈 결과는 "사용자 없음"과 구분되지 않으므로 호출자에게 전달
+            logger.error(f"❌ Failed to get usage for {len(user_ids or ())} Korean users: {e}")
+            raise
+
+    async def _queue_usage(self, pipe, user_id: str, number: str, tokens: int, requests: int,
+                     group_ids: Sequence[str], current_time: float):
+        """사용량 증가 명령을 파이프라인에 추가 (사용자/그룹 해시마다 구간 교체 스크립트 한 번, 실행은 호출자)"""
+        buckets = _get_buckets(current_time)
+        await self._queue_usage_script(pipe, self._user_key(number),
+                                       [*buckets, tokens, requests, USER_TTL, f"{current_time:.3f}"])
+        active_key = self._active_key(buckets[2], self._active_shard(number))
+        pipe.sadd(active_key, number)
+        pipe.expire(active_key, ACTIVE_TTL)
+
+        # 그룹 공유 사용량 증가
+        for group_id in group_ids:
+            await self._queue_usage_script(pipe, self._group_key(group_id), [*buckets, tokens, requests, GROUP_TTL])
+
+        self._queue_history(pipe, user_id, {'t': tokens, 'r': requests}, current_time)
+
+    async def _queue_usage_script(self, pipe, key: str, args: List):
+        """USAGE_SCRIPT 를 파이프라인에 추가
+
+        클러스터 파이프라인은 노드별 스크립트 로드를 처리하지 않으므로 EVAL 로 본문을
+        보냅니다 (서버가 SHA 로 캐시).
+        """
+        if self.cluster:
+            pipe.eval(USAGE_SCRIPT, 1, key, *args)
+            return
+        if self._usage_script is None:
+            self._usage_script = self.redis.register_script(USAGE_SCRIPT)
+        await self._usage_script(keys=[key], args=args, client=pipe)
+
+    async def migrate_legacy_keys(self) -> int:
+        """이전 버전 키(korean_user:<hex>:info, korean_usage:<hex>:..., korean_group_usage:...)를 해시로 변환
+
+        누적 통계, 쿨다운, 현재 분/시간/일 사용량(그룹 포함)을 옮기고 이전 키는 삭제합니다.
+        지난 구간 키는 옮기지 않고 기존 TTL 로 만료됩니다.
+        kn:schema 표시로 한 번만 수행하며, 이전 버전 워커와 함께 실행하지 마세요.
+        """
+        if not await self.redis.set(SCHEMA_KEY, SCHEMA_VERSION, nx=True):
+            return 0
+
+        current_time = time.time()
+        buckets = _get_buckets(current_time)
+        dt = datetime.fromtimestamp(current_time)
+        suffixes = (f"minute:{dt.strftime('%Y%m%d%H%M')}", f"hour:{dt.strftime('%Y%m%d%H')}",
+                    f"day:{dt.strftime('%Y%m%d')}")
+
+        migrated = 0
+        async for info_key in self.redis.scan_iter(match="korean_user:*:info", count=1000):
+            encoded_id = info_key.split(':')[1]
+            try:
+                user_id = bytes.fromhex(encoded_id).decode('utf-8')
+            except ValueError:
+                continue
+            window_keys = [f"korean_usage:{encoded_id}:{suffix}" for suffix in suffixes]
+
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hgetall(info_key)
+            for window_key in window_keys:
+                pipe.hmget(window_key, 'tokens', 'requests')
+            info, *windows = await pipe.execute()
+
+            number = await self._get_user_number(user_id, create=True)
+            fields = {
+                'tt': int(info.get('total_tokens', 0)),
+                'tr': int(info.get('total_requests', 0)),
+                'lt': info.get('last_request_time', 0),
+                'cd': info.get('cooldown_until', 0)
             }
+            for prefix, bucket, (tokens, requests) in zip('mhd', buckets, windows):
+                if tokens is not None or requests is not None:
+                    fields.update({f'{prefix}b': bucket, f'{prefix}t': int(tokens or 0), f'{prefix}r': int(requests or 0)})
+
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(self._user_key(number), mapping=fields)
+            pipe.expire(self._user_key(number), USER_TTL)
+            if 'db' in fields:
+                active_key = self._active_key(buckets[2], self._active_shard(number))
+                pipe.sadd(active_key, number)
+                pipe.expire(active_key, ACTIVE_TTL)
+            pipe.delete(info_key, f"korean_mapping:{encoded_id}", *window_keys)
+            await pipe.execute()
+            migrated += 1
+
+        # 그룹은 오늘 사용 기록이 있는 그룹의 현재 구간만 옮김
+        async for day_key in self.redis.scan_iter(match=f"korean_group_usage:*:{suffixes[2]}", count=1000):
+            encoded_id = day_key.split(':')[1]
+            try:
+                group_id = bytes.fromhex(encoded_id).decode('utf-8')
+            except ValueError:
+                continue
+            window_keys = [f"korean_group_usage:{encoded_id}:{suffix}" for suffix in suffixes]
+            pipe = self.redis.pipeline(transaction=False)
+            for window_key in window_keys:
+                pipe.hmget(window_key, 'tokens', 'requests')
+            fields = {}
+            for prefix, bucket, (tokens, requests) in zip('mhd', buckets, await pipe.execute()):
+                if tokens is not None or requests is not None:
+                    fields.update({f'{prefix}b': bucket, f'{prefix}t': int(tokens or 0), f'{prefix}r': int(requests or 0)})
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(self._group_key(group_id), mapping=fields)
+            pipe.expire(self._group_key(group_id), GROUP_TTL)
+            pipe.delete(*window_keys)
+            await pipe.execute()
+
+        if migrated:
+            logger.info(f"✅ Migrated {migrated} Korean users to compact Redis keys")
+        return migrated
+
+    def _history_stream_key(self, user_id: str) -> str:
+        """사용자의 히스토리 스트림 키 (crc32 샤드)"""
+        return f"{HISTORY_STREAM_PREFIX}:{zlib.crc32(user_id.encode('utf-8')) % self.history_shards}"
+    
+    def _queue_history(self, pipe, user_id: str, entry: Dict[str, int], current_time: float):
+        """히스토리 스트림 XADD 명령을 파이프라인에 추가 (entry 는 HISTORY_FIELDS 의 짧은 필드)"""
+        fields = {'u': user_id, 'ts': f"{current_time:.3f}"}
+        fields.update(entry)
+        pipe.xadd(self._history_stream_key(user_id), fields, maxlen=self.history_maxlen, approximate=True)
     
-    async def record_usage(self, user_id: str, tokens: int, requests: int = 1):
-        """한국어 사용자 사용량 기록"""
+    @staticmethod
+    def _parse_history_entry(fields: Dict[str, str]) -> Dict:
+        """스트림 항목을 다른 저장소와 같은 히스토리 형식으로 변환"""
+        timestamp = float(fields['ts'])
+        entry = {'timestamp': timestamp}
+        for short, name in HISTORY_FIELDS.items():
+            if short in fields:
+                entry[name] = int(fields[short])
+        if 'ai' in fields:
+            entry['actual_total'] = entry['actual_input'] + entry['actual_output']
+            entry['updated_at'] = timestamp
+        entry['user_id'] = fields['u']
+        entry['date'] = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        return entry
+    
+    @timed_storage_call('redis')
+    async def record_usage(self, user_id: str, tokens: int, requests: int = 1, group_ids: Sequence[str] = ()):
+        """한국어 사용자 사용량 기록 (그룹 사용량, 히스토리까지 파이프라인 한 번으로 기록)"""
         try:
-            current_time = time.time()
-            keys = self._get_time_keys(user_id, current_time)
-            
-            # 파이프라인으로 모든 업데이트를 원자적으로 실행
-            pipe = self.redis.pipeline()
-            
-            # 시간대별 사용량 증가
-            pipe.hincrby(keys['minute'], 'tokens', tokens)
-            pipe.hincrby(keys['minute'], 'requests', requests)
-            pipe.hincrby(keys['hour'], 'tokens', tokens)
-            pipe.hincrby(keys['day'], 'tokens', tokens)
-            
-            # 사용자 전체 통계 업데이트
-            pipe.hincrby(keys['user_info'], 'total_tokens', tokens)
-            pipe.hincrby(keys['user_info'], 'total_requests', requests)
-            pipe.hset(keys['user_info'], mapping={
-                'last_request_time': current_time,
-                'user_type': 'korean_user',
-                'original_user_id': user_id
-            })
-            
-            # TTL 설정 (한국어 사용자 데이터는 조금 더 길게 보관)
-            pipe.expire(keys['minute'], 3600)     # 1시간
-            pipe.expire(keys['hour'], 86400)      # 1일
-            pipe.expire(keys['day'], 604800)      # 1주일
-            pipe.expire(keys['user_info'], 2592000)  # 30일
-            pipe.expire(keys['user_mapping'], 2592000)  # 30일
-            
+            number = await self._get_user_number(user_id, create=True)
+            pipe = self._pipeline()
+            await self._queue_usage(pipe, user_id, number, tokens, requests, group_ids, time.time())
             await pipe.execute()
-            
-            # 사용량 히스토리 저장 (선택사항)
-            await self._record_korean_usage_history(user_id, tokens, requests, current_time)
-            
+
             logger.debug(f"📊 Recorded Korean usage: {user_id} -> {tokens} tokens, {requests} requests")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to record usage for Korean user {user_id}: {e}")
             raise
-    
-    async def _record_korean_usage_history(self, user_id: str, tokens: int, requests: int, timestamp: float):
-        """한국어 사용자 사용량 히스토리 저장"""
+
+    @timed_storage_call('redis')
+    async def record_usage_many(self, entries: Sequence[Tuple[str, int, int, Sequence[str]]],
+                                timestamp: Optional[float] = None):
+        """여러 사용자의 누적 사용량 (user_id, tokens, requests, group_ids) 을 파이프라인 한 번으로 기록"""
+        if not entries:
+            return
         try:
-            encoded_user_id = self._encode_user_id(user_id)
-            history_key = f"korean_history:{encoded_user_id}:usage"
-            
-            history_data = {
-                'timestamp': timestamp,
-                'tokens': tokens,
-                'requests': requests,
-                'user_id': user_id,  # 원본 한국어 ID 저장
-                'date': datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # 리스트에 추가 (최근 1000개만 유지)
-            pipe = self.redis.pipeline()
-            pipe.lpush(history_key, json.dumps(history_data, ensure_ascii=False))
-            pipe.ltrim(history_key, 0, 999)  # 최근 1000개만 유지
-            pipe.expire(history_key, 604800)  # 1주일
+            current_time = time.time() if timestamp is None else timestamp
+            numbers = [await self._get_user_number(user_id, create=True) for user_id, _, _, _ in entries]
+            pipe = self._pipeline()
+            for (user_id, tokens, requests, group_ids), number in zip(entries, numbers):
+                await self._queue_usage(pipe, user_id, number, tokens, requests, group_ids, current_time)
             await pipe.execute()
-            
+
+            logger.debug(f"📊 Recorded Korean usage batch: {len(entries)} users")
+
         except Exception as e:
-            logger.debug(f"❌ Failed to record Korean usage history: {e}")
-    
+            logger.error(f"❌ Failed to record Korean usage batch ({len(entries)} users): {e}")
+            raise
+
+    @timed_storage_call('redis')
+    async def gcra_acquire(self, user_id: str, entries: Sequence[Tuple[str, str, int, float, float]],
+                           now: Optional[float] = None) -> Tuple[int, float]:
+        """GCRA 제한 확인 및 갱신 (Lua 스크립트 한 번으로 원자적 처리)
+
+        entries 는 (대상, 제한 이름, limit, period 초, cost) 목록입니다. 모든 제한을
+        통과한 경우에만 모든 TAT 를 갱신합니다.
+        반환: (0, 0) 허용, (-1, cooldown_until) 쿨다운, (i, retry_after) i번째(1부터) 제한 초과
+        """
+        if now is None:
+            now = time.time()
+        if self._gcra_script is None:
+            self._gcra_script = self.redis.register_script(GCRA_SCRIPT)
+
+        number = await self._get_user_number(user_id, create=True)
+        if self.cluster:
+            return await self._gcra_acquire_by_slot(user_id, number, entries, now)
+
+        keys = [self._user_key(number)]
+        args: List = [f"{now:.6f}"]
+        for subject, name, limit, period, cost in entries:
+            keys.append(self._gcra_key(user_id, number, subject, name))
+            args.extend([limit, period, cost])
+
+        status, value = await self._gcra_script(keys=keys, args=args)
+        return int(status), float(value)
+
+    async def _gcra_acquire_by_slot(self, user_id: str, number: str,
+                                    entries: Sequence[Tuple[str, str, int, float, float]],
+                                    now: float) -> Tuple[int, float]:
+        """클러스터 GCRA: 대상(같은 슬롯)마다 스크립트를 실행하고 거절 시 앞 대상의 차감분을 되돌림"""
+        subjects: Dict[str, List[Tuple[int, str, int, float, float]]] = {}
+        for i, (subject, name, limit, period, cost) in enumerate(entries):
+            subjects.setdefault(subject, []).append(
+                (i, self._gcra_key(user_id, number, subject, name), limit, period, cost))
+
+        acquired = []
+        for subject, items in subjects.items():
+            keys = [self._gcra_head_key(user_id, number, subject)]
+            args: List = [f"{now:.6f}"]
+            for _, key, limit, period, cost in items:
+                keys.append(key)
+                args.extend([limit, period, cost])
+
+            status, value = await self._gcra_script(keys=keys, args=args)
+            status = int(status)
+            if status != 0:
+                await self._gcra_refund(acquired, now)
+                if status < 0:
+                    return -1, float(value)
+                return items[status - 1][0] + 1, float(value)
+            acquired.append(items)
+        return 0, 0.0
+
+    async def _gcra_refund(self, acquired: List[List[Tuple[int, str, int, float, float]]], now: float):
+        """앞서 허용된 대상들의 TAT 를 차감 전으로 되돌림 (대상마다 스크립트 한 번)"""
+        if self._gcra_refund_script is None:
+            self._gcra_refund_script = self.redis.register_script(GCRA_REFUND_SCRIPT)
+        for items in acquired:
+            await self._gcra_refund_script(
+                keys=[key for _, key, _, _, _ in items],
+                args=[f"{now:.6f}", *(cost * period / limit for _, _, limit, period, cost in items)])
+
+    @timed_storage_call('redis')
     async def update_actual_tokens(self, user_id: str, actual_input: int, actual_output: int):
-        """실제 토큰 사용량으로 업데이트"""
+        """실제 토큰 사용량을 히스토리 스트림에 기록"""
         try:
             actual_total = actual_input + actual_output
-            current_time = time.time()
-            encoded_user_id = self._encode_user_id(user_id)
-            
-            # 실제 사용량 기록
-            adjustment_key = f"korean_actual:{encoded_user_id}:tokens"
-            await self.redis.hset(adjustment_key, mapping={
-                'last_actual_input': actual_input,
-                'last_actual_output': actual_output,
-                'last_actual_total': actual_total,
-                'updated_at': current_time,
-                'original_user_id': user_id
-            })
-            await self.redis.expire(adjustment_key, 3600)  # 1시간
-            
+            pipe = self._pipeline()
+            self._queue_history(pipe, user_id, {
+                't': actual_total, 'r': 0, 'ai': actual_input, 'ao': actual_output
+            }, time.time())
+            await pipe.execute()
+
             logger.debug(f"🔄 Updated actual tokens for Korean user {user_id}: {actual_total}")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to update actual tokens for Korean user {user_id}: {e}")
-    
+
+    @timed_storage_call('redis')
     async def set_user_cooldown(self, user_id: str, cooldown_until: float):
         """한국어 사용자 쿨다운 설정"""
         try:
-            keys = self._get_time_keys(user_id)
-            await self.redis.hset(keys['user_info'], mapping={
-                'cooldown_until': cooldown_until,
-                'cooldown_set_at': time.time(),
-                'user_type': 'korean_user'
-            })
-            await self.redis.expire(keys['user_info'], 2592000)  # 30일
-            
+            user_key = self._user_key(await self._get_user_number(user_id, create=True))
+            pipe = self._pipeline()
+            pipe.hset(user_key, 'cd', cooldown_until)
+            pipe.expire(user_key, USER_TTL)
+            await pipe.execute()
+
             logger.info(f"⏰ Set cooldown for Korean user '{user_id}' until {cooldown_until}")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to set cooldown for Korean user {user_id}: {e}")
-    
+
+    @timed_storage_call('redis')
     async def reset_user_usage(self, user_id: str):
-        """한국어 사용자 사용량 초기화"""
+        """한국어 사용자 사용량 초기화 (구간 필드, 쿨다운, GCRA 상태 삭제, 누적 통계는 유지)"""
         try:
-            keys = self._get_time_keys(user_id)
-            
-            # 현재 시간 기준 키들 삭제
-            await self.redis.delete(
-                keys['minute'],
-                keys['hour'],
-                keys['day']
-            )
-            
-            # 쿨다운 해제
-            await self.redis.hdel(keys['user_info'], 'cooldown_until', 'cooldown_set_at')
-            
+            number = await self._get_user_number(user_id)
+            if number is not None:
+                pipe = self._pipeline()
+                pipe.hdel(self._user_key(number), *WINDOW_FIELDS, 'cd')
+                pipe.srem(self._active_key(_get_buckets(time.time())[2], self._active_shard(number)), number)
+                pipe.delete(*(self._gcra_key(user_id, number, user_id, name)
+                              for name in ('rpm', 'tpm', 'tph', 'daily')))
+                await pipe.execute()
+
             logger.info(f"🔄 Reset usage for Korean user '{user_id}'")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to reset usage for Korean user {user_id}: {e}")
             raise
-    
+
     async def get_all_users(self) -> List[str]:
-        """모든 한국어 사용자 목록 조회"""
+        """모든 한국어 사용자 목록 조회 (번호 매핑 중 사용자 해시가 남아 있는 사용자)"""
         try:
-            # korean_user:*:info 패턴으로 사용자 찾기
-            pattern = "korean_user:*:info"
-            keys = await self.redis.keys(pattern)
-            
-            users = []
-            for key in keys:
-                # "korean_user:encoded_id:info" 형태에서 encoded_id 추출
-                parts = key.split(':')
-                if len(parts) >= 3:
-                    encoded_id = parts[1]
-                    original_id = self._decode_user_id(encoded_id)
-                    users.append(original_id)
-            
-            # 중복 제거
-            users = list(set(users))
-            
+            names = await self.redis.hgetall(ID_NAMES_KEY)
+            pipe = self.redis.pipeline(transaction=False)
+            for number in names:
+                pipe.exists(self._user_key(number))
+            exists = await pipe.execute() if names else []
+
+            users = [user_id for (number, user_id), found in zip(names.items(), exists) if found]
+            for number, user_id in names.items():
+                self._cache_user_number(user_id, number)
+
             logger.debug(f"📋 Found {len(users)} Korean users")
             return users
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to get all Korean users: {e}")
             return []
-    
+
+    async def _get_window_totals(self, period: str, current_time: float) -> Dict[str, Tuple[int, int]]:
+        """오늘 활성 사용자의 구간(minute/hour/today) (토큰, 요청)을 파이프라인 한 번으로 조회"""
+        buckets = _get_buckets(current_time)
+        names = await self._get_user_names(await self._get_active_numbers(current_time))
+        window = {'minute': 0, 'hour': 1, 'today': 2}[period]
+        prefix = 'mhd'[window]
+        pipe = self.redis.pipeline(transaction=False)
+        for number in names:
+            pipe.hmget(self._user_key(number), f'{prefix}b', f'{prefix}t', f'{prefix}r')
+        results = await pipe.execute() if names else []
+
+        totals = {}
+        for user_id, (bucket, tokens, requests) in zip(names.values(), results):
+            if bucket is not None and int(bucket) == buckets[window]:
+                totals[user_id] = (int(tokens or 0), int(requests or 0))
+            else:
+                totals[user_id] = (0, 0)
+        return totals
+
+    @timed_storage_call('redis')
     async def get_top_users(self, limit: int = 10, period: str = "today") -> List[Dict]:
-        """상위 한국어 사용자 조회"""
+        """상위 한국어 사용자 조회 (구간 기준이면 그 구간에 기록이 있는 사용자만)"""
         try:
-            users = await self.get_all_users()
-            user_stats = []
-            
-            for user_id in users:
-                usage = await self.get_user_usage(user_id)
-                
-                if period == "today":
-                    tokens = usage['tokens_today']
-                elif period == "hour":
-                    tokens = usage['tokens_this_hour']
-                elif period == "minute":
-                    tokens = usage['tokens_this_minute']
-                else:
-                    tokens = usage['total_tokens']
-                
-                user_stats.append({
-                    'user_id': user_id,
-                    'tokens': tokens,
-                    'requests': usage.get('total_requests', 0),
-                    'user_type': 'korean_user'
-                })
-            
+            if period in ("today", "hour", "minute"):
+                totals = await self._get_window_totals(period, time.time())
+            else:
+                usages = await self.get_users_usage(await self.get_all_users())
+                totals = {
+                    user_id: (usage['total_tokens'], usage['total_requests'])
+                    for user_id, usage in usages.items()
+                }
+
+            user_stats = [
+                {'user_id': user_id, 'tokens': tokens, 'requests': requests, 'user_type': 'korean_user'}
+                for user_id, (tokens, requests) in totals.items()
+                if tokens or requests or period not in ("today", "hour", "minute")
+            ]
+
             # 토큰 수로 정렬
             user_stats.sort(key=lambda x: x['tokens'], reverse=True)
             return user_stats[:limit]
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to get top Korean users: {e}")
             return []
-    
+
+    @timed_storage_call('redis')
     async def get_usage_statistics(self) -> Dict:
         """전체 한국어 사용량 통계"""
         try:
-            users = await self.get_all_users()
-            
-            total_users = len(users)
-            total_tokens_today = 0
-            total_requests_today = 0
-            active_users_today = 0
-            
-            for user_id in users:
-                usage = await self.get_user_usage(user_id)
-                tokens_today = usage['tokens_today']
-                
-                total_tokens_today += tokens_today
-                if tokens_today > 0:
-                    active_users_today += 1
-                
-                # 오늘의 요청 수는 근사치로 계산
-                if usage['tokens_this_minute'] > 0:
-                    total_requests_today += usage.get('total_requests', 0)
-            
+            current_time = time.time()
+            total_users = len(await self.get_all_users())
+
+            # 오늘 활성 사용자의 일 구간 토큰/요청 합계
+            today = await self._get_window_totals('today', current_time)
+            total_tokens_today = sum(tokens for tokens, _ in today.values())
+            total_requests_today = sum(requests for _, requests in today.values())
+            active_users_today = len(today)
+
             return {
                 'total_users': total_users,
                 'active_users_today': active_users_today,
@@ -343,47 +852,54 @@ class RedisStorage:
                 'timestamp': time.time(),
                 'system_type': 'korean_llm_limiter'
             }
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to get Korean usage statistics: {e}")
             return {}
-    
-    async def cleanup_expired_data(self):
-        """만료된 한국어 데이터 정리"""
+
+    @timed_storage_call('redis')
+    async def cleanup_expired_data(self, time_budget: Optional[float] = None) -> bool:
+        """만료된 한국어 데이터 정리 (사용량 키는 TTL 로 만료되므로 보존 기간이 지난 히스토리만 정리)"""
         try:
-            # 한국어 히스토리 키들 찾기
-            pattern = "korean_history:*:usage"
-            keys = await self.redis.keys(pattern)
-            
-            cleanup_count = 0
-            for key in keys:
-                ttl = await self.redis.ttl(key)
-                if ttl == -1:  # TTL이 설정되지 않은 키
-                    await self.redis.expire(key, 604800)  # 1주일 TTL 설정
-                    cleanup_count += 1
-            
-            if cleanup_count > 0:
-                logger.info(f"🧹 Set TTL for {cleanup_count} Korean history keys")
+            min_id = int((time.time() - self.history_retention_days * 86400) * 1000)
+            pipe = self._pipeline()
+            for shard in range(self.history_shards):
+                pipe.xtrim(f"{HISTORY_STREAM_PREFIX}:{shard}", minid=min_id, approximate=True)
+            trimmed = sum(await pipe.execute())
+            
+            if trimmed > 0:
+                logger.info(f"🧹 Trimmed {trimmed} expired Korean history entries")
                 
         except Exception as e:
             logger.error(f"❌ Failed to cleanup expired Korean data: {e}")
+        return True
     
+    @timed_storage_call('redis')
     async def get_user_history(self, user_id: str, limit: int = 100) -> List[Dict]:
-        """한국어 사용자 사용량 히스토리 조회"""
+        """한국어 사용자 사용량 히스토리 조회 (사용자 샤드 스트림을 최신순으로 읽어 필터링)
+        
+        샤드를 끝까지 훑지 않도록 history_scan_limit 항목까지만 읽으므로, 비활성/없는
+        사용자도 왕복 수가 제한되는 대신 오래된 기록은 빠질 수 있습니다.
+        """
         try:
-            encoded_user_id = self._encode_user_id(user_id)
-            history_key = f"korean_history:{encoded_user_id}:usage"
-            
-            # 최근 limit개 기록 조회
-            history_data = await self.redis.lrange(history_key, 0, limit - 1)
+            stream_key = self._history_stream_key(user_id)
+            page_size = min(max(limit * 4, 500), self.history_scan_limit)
             
             history = []
-            for data_str in history_data:
-                try:
-                    data = json.loads(data_str)
-                    history.append(data)
-                except json.JSONDecodeError:
-                    continue
+            max_id = '+'
+            scanned = 0
+            while len(history) < limit and scanned < self.history_scan_limit:
+                count = min(page_size, self.history_scan_limit - scanned)
+                page = await self.redis.xrevrange(stream_key, max=max_id, count=count)
+                scanned += len(page)
+                for _, fields in page:
+                    if fields.get('u') == user_id:
+                        history.append(self._parse_history_entry(fields))
+                        if len(history) >= limit:
+                            break
+                if len(page) < count:
+                    break
+                max_id = f"({page[-1][0]}"
             
             return history
             
@@ -391,18 +907,53 @@ class RedisStorage:
             logger.error(f"❌ Failed to get Korean user history for {user_id}: {e}")
             return []
     
+    async def read_history_events(self, last_ids: Optional[Dict[str, str]] = None, count: int = 100,
+                                  block_ms: Optional[int] = None) -> Tuple[List[Dict], Dict[str, str]]:
+        """히스토리 스트림 이어 읽기 (과금/분석 소비자용 XREAD)
+        
+        last_ids 는 스트림 키 -> 마지막으로 읽은 ID 이며, 처음에는 None 이면 모든
+        샤드를 처음부터 읽습니다. 반환: (이벤트 목록, 다음 호출에 넘길 last_ids)
+        """
+        if last_ids is None:
+            last_ids = {f"{HISTORY_STREAM_PREFIX}:{shard}": '0-0' for shard in range(self.history_shards)}
+        last_ids = dict(last_ids)
+        
+        if self.cluster:
+            # 스트림 샤드가 여러 슬롯에 있으므로 스트림마다 따로 읽음
+            replies = await asyncio.gather(*(
+                self.redis.xread({stream_key: last_id}, count=count, block=block_ms)
+                for stream_key, last_id in last_ids.items()))
+            results = [stream for reply in replies for stream in reply or []]
+        else:
+            results = await self.redis.xread(last_ids, count=count, block=block_ms) or []
+        
+        events = []
+        for stream_key, entries in results:
+            for entry_id, fields in entries:
+                event = self._parse_history_entry(fields)
+                event['id'] = entry_id
+                events.append(event)
+                last_ids[stream_key] = entry_id
+        return events, last_ids
+    
     async def get_korean_system_info(self) -> Dict:
         """한국어 시스템 정보 조회"""
         try:
             info = await self.redis.info()
             
-            # Redis 메모리 사용량
-            used_memory = info.get('used_memory_human', 'Unknown')
-            connected_clients = info.get('connected_clients', 0)
+            # Redis 메모리 사용량 (클러스터는 노드별 결과를 합침)
+            if self.cluster:
+                nodes = [node_info for node_info in info.values() if isinstance(node_info, dict)]
+                used_memory = f"{sum(node.get('used_memory', 0) for node in nodes) / 1024 / 1024:.2f}M"
+                connected_clients = sum(node.get('connected_clients', 0) for node in nodes)
+            else:
+                used_memory = info.get('used_memory_human', 'Unknown')
+                connected_clients = info.get('connected_clients', 0)
             
             # 한국어 키 개수
             korean_keys = 0
-            patterns = ['korean_usage:*', 'korean_user:*', 'korean_history:*', 'korean_mapping:*']
+            patterns = [f'{USER_KEY_PREFIX}:*', f'{GROUP_KEY_PREFIX}:*', f'{ACTIVE_KEY_PREFIX}:*', f'{GCRA_KEY_PREFIX}:*',
+                        '{kn}:*', f'{HISTORY_STREAM_PREFIX}:*']
             for pattern in patterns:
                 keys = await self.redis.keys(pattern)
                 korean_keys += len(keys)
@@ -3,32 +3,101 @@ SQLite storage implementation for Korean token usage tracking
 """
 
 import aiosqlite
+import asyncio
+import calendar
 import json
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
 import logging
 
+from src.utils.metrics import timed_storage_call
+
 logger = logging.getLogger(__name__)
 
+# PRAGMA user_version (1: 정수 epoch bucket 테이블 + 시간/일 롤업, 2: auto_vacuum=INCREMENTAL,
+# 3: 그룹 사용량/GCRA 상태 정리용 시간 컬럼 인덱스)
+SCHEMA_VERSION = 3
+AUTO_VACUUM_INCREMENTAL = 2
+
+# 정리 시 incremental_vacuum 한 번에 반환할 페이지 수
+VACUUM_PAGES_PER_STEP = 256
+
+WINDOWS = ('minute', 'hour', 'day')
+WINDOW_SECONDS = {'minute': 60, 'hour': 3600, 'day': 86400}
+USAGE_TABLES = {'minute': 'korean_usage_minute', 'hour': 'korean_usage_hour', 'day': 'korean_usage_day'}
+GROUP_USAGE_TABLES = {
+    'minute': 'korean_group_usage_minute', 'hour': 'korean_group_usage_hour', 'day': 'korean_group_usage_day'
+}
+
+# 이전 스키마(korean_usage_by_time)의 time_key 형식
+_LEGACY_KEY_FORMATS = {'minute': '%Y%m%d%H%M', 'hour': '%Y%m%d%H', 'day': '%Y%m%d'}
+
+
+@lru_cache(maxsize=16)
+def _usage_query(group_count: int) -> str:
+    """get_user_usage 용 단일 쿼리 (그룹 수별로 한 번만 생성)
+
+    첫 행은 사용자(group_id NULL), 이후 행은 그룹별 사용량입니다. 각 구간은
+    (id, bucket) PK 조회이며, 기록이 없으면 0 으로 채웁니다.
+    """
+    query = """
+        SELECT NULL, COALESCE(m.tokens, 0), COALESCE(m.requests, 0), COALESCE(h.tokens, 0), COALESCE(d.tokens, 0),
+               COALESCE(u.total_tokens, 0), COALESCE(u.total_requests, 0),
+               COALESCE(u.last_request_time, 0), COALESCE(u.cooldown_until, 0)
+        FROM (SELECT ? AS user_id) k
+        LEFT JOIN korean_users u ON u.user_id = k.user_id
+        LEFT JOIN korean_usage_minute m ON m.user_id = k.user_id AND m.bucket = ?
+        LEFT JOIN korean_usage_hour h ON h.user_id = k.user_id AND h.bucket = ?
+        LEFT JOIN korean_usage_day d ON d.user_id = k.user_id AND d.bucket = ?
+    """
+    if not group_count:
+        return query
+    return query + f"""
+        UNION ALL
+        SELECT k.group_id, COALESCE(m.tokens, 0), COALESCE(m.requests, 0), COALESCE(h.tokens, 0),
+               COALESCE(d.tokens, 0), 0, 0, 0, 0
+        FROM (SELECT column1 AS group_id FROM (VALUES {','.join(['(?)'] * group_count)})) k
+        LEFT JOIN korean_group_usage_minute m ON m.group_id = k.group_id AND m.bucket = ?
+        LEFT JOIN korean_group_usage_hour h ON h.group_id = k.group_id AND h.bucket = ?
+        LEFT JOIN korean_group_usage_day d ON d.group_id = k.group_id AND d.bucket = ?
+    """
+
 
 class SQLiteStorage:
     """SQLite 기반 한국어 사용량 저장소"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, usage_retention_days: int = 7, history_retention_days: int = 7,
+                 history_per_user: int = 1000, cleanup_chunk_size: int = 500,
+                 vacuum_on_upgrade: bool = False):
         self.db_path = db_path
+        self.usage_retention_days = usage_retention_days
+        self.history_retention_days = history_retention_days
+        self.history_per_user = history_per_user
+        self.cleanup_chunk_size = cleanup_chunk_size
+        self.vacuum_on_upgrade = vacuum_on_upgrade
         self._initialized = False
+        self._init_lock = asyncio.Lock()
+        self._history_trim_cursor = ''  # 사용자별 히스토리 정리를 이어서 진행할 위치
 
     async def _ensure_initialized(self):
-        """데이터베이스 초기화 확인"""
-        if not self._initialized:
-            await self._init_db()
-            self._initialized = True
+        """데이터베이스 초기화 확인 (동시에 들어온 첫 요청들도 한 번만 초기화/변환)"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if not self._initialized:
+                await self._init_db()
+                self._initialized = True
 
     async def _init_db(self):
-        """데이터베이스 테이블 생성"""
+        """데이터베이스 테이블 생성 (이전 스키마는 한 번만 변환)"""
         try:
             async with aiosqlite.connect(self.db_path) as db:
+                # 새 데이터베이스는 정리 후 빈 페이지를 조금씩 반환할 수 있도록 설정
+                # (기존 데이터베이스는 VACUUM 해야 적용됨, vacuum_on_upgrade 로 선택)
+                await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
                 # 한국어 사용자 정보 테이블
                 await db.execute("""
                     CREATE TABLE IF NOT EXISTS korean_users (
@@ -43,20 +112,58 @@ class SQLiteStorage:
                     )
                 """)
 
-                # 시간별 사용량 테이블
+                # 분/시간/일 사용량 테이블 (bucket 은 로컬 시각 기준 epoch 구간 번호)
+                # 시간/일 테이블은 분 단위 기록과 같은 트랜잭션에서 함께 증가하는 롤업
+                for window in WINDOWS:
+                    await db.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {USAGE_TABLES[window]} (
+                            user_id TEXT NOT NULL,
+                            bucket INTEGER NOT NULL,
+                            tokens INTEGER NOT NULL DEFAULT 0,
+                            requests INTEGER NOT NULL DEFAULT 0,
+                            PRIMARY KEY (user_id, bucket)
+                        ) WITHOUT ROWID
+                    """)
+                    # 구간별 상위 사용자/활성 사용자 조회용 커버링 인덱스 (PK 인 user_id 포함)
+                    await db.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{USAGE_TABLES[window]}_bucket "
+                        f"ON {USAGE_TABLES[window]}(bucket, tokens, requests)")
+
+                    # 그룹 공유 사용량 테이블
+                    await db.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {GROUP_USAGE_TABLES[window]} (
+                            group_id TEXT NOT NULL,
+                            bucket INTEGER NOT NULL,
+                            tokens INTEGER NOT NULL DEFAULT 0,
+                            requests INTEGER NOT NULL DEFAULT 0,
+                            PRIMARY KEY (group_id, bucket)
+                        ) WITHOUT ROWID
+                    """)
+                    # 보존 기간 정리(bucket < ?)가 전체 테이블을 훑지 않도록
+                    await db.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{GROUP_USAGE_TABLES[window]}_bucket "
+                        f"ON {GROUP_USAGE_TABLES[window]}(bucket)")
+
+                # 일별 전체 합계 롤업 (대시보드 통계는 이 행 하나만 조회)
                 await db.execute("""
-                    CREATE TABLE IF NOT EXISTS korean_usage_by_time (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id TEXT NOT NULL,
-                        time_key TEXT NOT NULL,
-                        time_type TEXT NOT NULL,  -- 'minute', 'hour', 'day'
-                        tokens INTEGER DEFAULT 0,
-                        requests INTEGER DEFAULT 0,
-                        timestamp REAL NOT NULL,
-                        UNIQUE(user_id, time_key, time_type)
+                    CREATE TABLE IF NOT EXISTS korean_usage_daily_totals (
+                        bucket INTEGER PRIMARY KEY,
+                        tokens INTEGER NOT NULL DEFAULT 0,
+                        requests INTEGER NOT NULL DEFAULT 0,
+                        active_users INTEGER NOT NULL DEFAULT 0
                     )
                 """)
 
+                # GCRA 상태 테이블 (제한 키별 이론적 도착 시각)
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS korean_gcra_state (
+                        state_key TEXT PRIMARY KEY,
+                        tat REAL NOT NULL
+                    )
+                """)
+                # 지난 TAT 정리(tat < ?)용
+                await db.execute("CREATE INDEX IF NOT EXISTS idx_korean_gcra_state_tat ON korean_gcra_state(tat)")
+
                 # 사용량 히스토리 테이블
                 await db.execute("""
                     CREATE TABLE IF NOT EXISTS korean_usage_history (
@@ -71,19 +178,97 @@ class SQLiteStorage:
                 """)
 
                 # 인덱스 생성
-                await db.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_korean_usage_user_time ON korean_usage_by_time(user_id, time_key)")
                 await db.execute(
                     "CREATE INDEX IF NOT EXISTS idx_korean_history_user_time ON korean_usage_history(user_id, timestamp)")
                 await db.execute("CREATE INDEX IF NOT EXISTS idx_korean_users_updated ON korean_users(updated_at)")
 
+                cursor = await db.execute("PRAGMA user_version")
+                schema_version = (await cursor.fetchone())[0]
+                if schema_version < 1:
+                    await self._migrate_time_keys(db)
+                if schema_version < SCHEMA_VERSION:
+                    await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
                 await db.commit()
+
+                # VACUUM 은 DB 크기에 비례해 시작을 막으므로 설정한 경우에만 수행
+                cursor = await db.execute("PRAGMA auto_vacuum")
+                if (await cursor.fetchone())[0] != AUTO_VACUUM_INCREMENTAL:
+                    if self.vacuum_on_upgrade:
+                        logger.info("🔄 Enabling incremental vacuum for Korean SQLite database (one-time VACUUM)")
+                        await db.execute("VACUUM")
+                    elif schema_version < 2:
+                        logger.info("ℹ️ Existing Korean SQLite database keeps auto_vacuum off; set "
+                                    "storage.sqlite_vacuum_on_upgrade to VACUUM once at startup")
+
                 logger.info(f"✅ SQLite Korean database initialized: {self.db_path}")
 
         except Exception as e:
             logger.error(f"❌ Failed to initialize Korean SQLite database: {e}")
             raise
 
+    async def _migrate_time_keys(self, db):
+        """문자열 time_key 기반 이전 테이블을 정수 bucket 테이블로 변환 후 삭제
+
+        이전 스키마는 시간/일 행에 요청 수를 기록하지 않았으므로 남아 있는 분
+        단위 행에서 다시 합산합니다.
+        """
+        migrated = 0
+        for old_table, id_column, tables in (
+                ('korean_usage_by_time', 'user_id', USAGE_TABLES),
+                ('korean_group_usage_by_time', 'group_id', GROUP_USAGE_TABLES)):
+            cursor = await db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (old_table,))
+            if await cursor.fetchone() is None:
+                continue
+
+            cursor = await db.execute(f"SELECT {id_column}, time_type, time_key, tokens, requests FROM {old_table}")
+            rows: Dict[str, Dict[Tuple[str, int], List[int]]] = {window: {} for window in WINDOWS}
+            minute_requests: Dict[str, Dict[Tuple[str, int], int]] = {'hour': {}, 'day': {}}
+            for owner, time_type, time_key, tokens, requests in await cursor.fetchall():
+                if time_type not in WINDOWS:
+                    continue
+                bucket = calendar.timegm(
+                    datetime.strptime(time_key, _LEGACY_KEY_FORMATS[time_type]).timetuple()
+                ) // WINDOW_SECONDS[time_type]
+                rows[time_type][(owner, bucket)] = [tokens or 0, requests or 0]
+                if time_type == 'minute' and requests:
+                    for window in ('hour', 'day'):
+                        key = (owner, bucket * 60 // WINDOW_SECONDS[window])
+                        minute_requests[window][key] = minute_requests[window].get(key, 0) + requests
+
+            for window in ('hour', 'day'):
+                for key, requests in minute_requests[window].items():
+                    entry = rows[window].setdefault(key, [0, 0])
+                    entry[1] = max(entry[1], requests)
+
+            for window in WINDOWS:
+                await db.executemany(f"""
+                    INSERT INTO {tables[window]} ({id_column}, bucket, tokens, requests) VALUES (?, ?, ?, ?)
+                    ON CONFLICT({id_column}, bucket) DO UPDATE SET
+                        tokens = tokens + excluded.tokens,
+                        requests = requests + excluded.requests
+                """, [(owner, bucket, tokens, requests)
+                      for (owner, bucket), (tokens, requests) in rows[window].items()])
+                migrated += len(rows[window])
+
+            if id_column == 'user_id':
+                totals: Dict[int, List[int]] = {}
+                for (_, bucket), (tokens, requests) in rows['day'].items():
+                    total = totals.setdefault(bucket, [0, 0, 0])
+                    total[0] += tokens
+                    total[1] += requests
+                    total[2] += 1
+                await db.executemany("""
+                    INSERT OR REPLACE INTO korean_usage_daily_totals (bucket, tokens, requests, active_users)
+                    VALUES (?, ?, ?, ?)
+                """, [(bucket, *total) for bucket, total in totals.items()])
+
+            await db.execute(f"DROP TABLE {old_table}")
+
+        if migrated:
+            logger.info(f"🔄 Migrated {migrated} Korean usage rows to epoch-bucket tables")
+
     async def ping(self) -> bool:
         """데이터베이스 연결 상태 확인"""
         try:
@@ -99,64 +284,51 @@ class SQLiteStorage:
         """연결 종료 (SQLite는 자동으로 닫힘)"""
         logger.info("✅ SQLite connection closed")
 
-    def _get_time_keys(self, timestamp: Optional[float] = None) -> Dict[str, str]:
-        """시간대별 키 생성"""
+    def _get_buckets(self, timestamp: Optional[float] = None) -> Dict[str, int]:
+        """분/시간/일 bucket 번호 (로컬 시각 기준 epoch 초를 구간 길이로 나눈 값)
+
+        이전 문자열 키(%Y%m%d%H%M 등)와 같은 로컬 시각 경계를 사용합니다.
+        """
         if timestamp is None:
             timestamp = time.time()
 
-        dt = datetime.fromtimestamp(timestamp)
+        local_seconds = int(timestamp) + time.localtime(timestamp).tm_gmtoff
+        return {window: local_seconds // seconds for window, seconds in WINDOW_SECONDS.items()}
 
-        return {
-            'minute': dt.strftime('%Y%m%d%H%M'),
-            'hour': dt.strftime('%Y%m%d%H'),
-            'day': dt.strftime('%Y%m%d')
-        }
+    @timed_storage_call('sqlite')
+    async def get_user_usage(self, user_id: str, group_ids: Sequence[str] = ()) -> Dict[str, int]:
+        """한국어 사용자 사용량 조회 (group_ids 지정 시 그룹 사용량도 같은 쿼리에서 조회)
 
-    async def get_user_usage(self, user_id: str) -> Dict[str, int]:
-        """한국어 사용자 사용량 조회"""
+        사용자 정보와 분/시간/일 사용량, 그룹 사용량을 PK 조회 JOIN 문장 하나로
+        읽으므로 aiosqlite 스레드 왕복은 연결/조회/종료 세 번뿐입니다.
+        """
         try:
             await self._ensure_initialized()
 
-            current_time = time.time()
-            time_keys = self._get_time_keys(current_time)
+            buckets = self._get_buckets(time.time())
+            window_buckets = (buckets['minute'], buckets['hour'], buckets['day'])
 
             async with aiosqlite.connect(self.db_path) as db:
-                # 사용자 기본 정보 조회
-                cursor = await db.execute("""
-                    SELECT total_tokens, total_requests, last_request_time, cooldown_until
-                    FROM korean_users WHERE user_id = ?
-                """, (user_id,))
-                user_row = await cursor.fetchone()
-
-                if user_row:
-                    total_tokens, total_requests, last_request_time, cooldown_until = user_row
-                else:
-                    total_tokens, total_requests, last_request_time, cooldown_until = 0, 0, 0, 0
-
-                # 시간별 사용량 조회
-                usage_data = {}
-                for time_type, time_key in time_keys.items():
-                    cursor = await db.execute("""
-                        SELECT tokens, requests FROM korean_usage_by_time 
-                        WHERE user_id = ? AND time_key = ? AND time_type = ?
-                    """, (user_id, time_key, time_type))
-                    row = await cursor.fetchone()
-
-                    if row:
-                        tokens, requests = row
-                        usage_data[f'tokens_this_{time_type}'] = tokens
-                        if time_type == 'minute':
-                            usage_data['requests_this_minute'] = requests
-                    else:
-                        usage_data[f'tokens_this_{time_type}'] = 0
-                        if time_type == 'minute':
-                            usage_data['requests_this_minute'] = 0
-
-                return {
-                    'requests_this_minute': usage_data.get('requests_this_minute', 0),
-                    'tokens_this_minute': usage_data.get('tokens_this_minute', 0),
-                    'tokens_this_hour': usage_data.get('tokens_this_hour', 0),
-                    'tokens_today': usage_data.get('tokens_this_day', 0),
+                rows = await db.execute_fetchall(
+                    _usage_query(len(group_ids)),
+                    (user_id, *window_buckets, *group_ids, *window_buckets) if group_ids
+                    else (user_id, *window_buckets))
+
+            usage = {}
+            groups = {}
+            for (group_id, minute_tokens, minute_requests, hour_tokens, day_tokens,
+                 total_tokens, total_requests, last_request_time, cooldown_until) in rows:
+                window_usage = {
+                    'requests_this_minute': minute_requests,
+                    'tokens_this_minute': minute_tokens,
+                    'tokens_this_hour': hour_tokens,
+                    'tokens_today': day_tokens
+                }
+                if group_id is not None:
+                    groups[group_id] = window_usage
+                    continue
+                usage = {
+                    **window_usage,
                     'total_requests': total_requests,
                     'total_tokens': total_tokens,
                     'last_request_time': last_request_time,
@@ -164,60 +336,149 @@ class SQLiteStorage:
                     'user_type': 'korean_user'
                 }
 
+            if group_ids:
+                usage['groups'] = groups
+
+            return usage
+
         except Exception as e:
             logger.error(f"❌ Failed to get usage for Korean user {user_id}: {e}")
-            return {
-                'requests_this_minute': 0,
-                'tokens_this_minute': 0,
-                'tokens_this_hour': 0,
-                'tokens_today': 0,
-                'total_requests': 0,
-                'total_tokens': 0,
-                'last_request_time': 0,
-                'cooldown_until': 0,
-                'user_type': 'korean_user'
-            }
+            raise
 
-    async def record_usage(self, user_id: str, tokens: int, requests: int = 1):
-        """한국어 사용자 사용량 기록"""
+    @timed_storage_call('sqlite')
+    async def get_users_usage(self, user_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, int]]:
+        """여러 사용자 사용량을 PK JOIN 쿼리 하나로 조회 (None 이면 오늘 활성 사용자 전체)"""
         try:
             await self._ensure_initialized()
 
-            current_time = time.time()
-            time_keys = self._get_time_keys(current_time)
-
+            buckets = self._get_buckets(time.time())
+            if user_ids is None:
+                where = "u.user_id IN (SELECT user_id FROM korean_usage_day WHERE bucket = ?)"
+                chunks = [(buckets['day'],)]
+            else:
+                user_ids = list(dict.fromkeys(user_ids))
+                if not user_ids:
+                    return {}
+                # SQLite 바인드 변수 개수 제한 내에서 나눠 조회
+                chunks = [tuple(user_ids[i:i + 500]) for i in range(0, len(user_ids), 500)]
+
+            usages = {}
             async with aiosqlite.connect(self.db_path) as db:
-                # 사용자 기본 정보 업데이트
-                await db.execute("""
-                    INSERT INTO korean_users (user_id, total_tokens, total_requests, last_request_time, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(user_id) DO UPDATE SET
-                        total_tokens = total_tokens + ?,
-                        total_requests = total_requests + ?,
-                        last_request_time = ?,
-                        updated_at = ?
-                """, (user_id, tokens, requests, current_time, current_time, current_time,
-                      tokens, requests, current_time, current_time))
+                for params in chunks:
+                    if user_ids is not None:
+                        where = f"u.user_id IN ({','.join('?' * len(params))})"
+                    cursor = await db.execute(f"""
+                        SELECT u.user_id, u.total_tokens, u.total_requests, u.last_request_time, u.cooldown_until,
+                               COALESCE(m.tokens, 0), COALESCE(m.requests, 0),
+                               COALESCE(h.tokens, 0), COALESCE(d.tokens, 0)
+                        FROM korean_users u
+                        LEFT JOIN korean_usage_minute m ON m.user_id = u.user_id AND m.bucket = ?
+                        LEFT JOIN korean_usage_hour h ON h.user_id = u.user_id AND h.bucket = ?
+                        LEFT JOIN korean_usage_day d ON d.user_id = u.user_id AND d.bucket = ?
+                        WHERE {where}
+                    """, (buckets['minute'], buckets['hour'], buckets['day'], *params))
+
+                    for (user_id, total_tokens, total_requests, last_request_time, cooldown_until,
+                         minute_tokens, minute_requests, hour_tokens, day_tokens) in await cursor.fetchall():
+                        usages[user_id] = {
+                            'requests_this_minute': minute_requests,
+                            'tokens_this_minute': minute_tokens,
+                            'tokens_this_hour': hour_tokens,
+                            'tokens_today': day_tokens,
+                            'total_requests': total_requests,
+                            'total_tokens': total_tokens,
+                            'last_request_time': last_request_time,
+                            'cooldown_until': cooldown_until,
+                            'user_type': 'korean_user'
+                        }
 
-                # 시간별 사용량 업데이트
-                for time_type, time_key in time_keys.items():
-                    await db.execute("""
-                        INSERT INTO korean_usage_by_time (user_id, time_key, time_type, tokens, requests, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(user_id, time_key, time_type) DO UPDATE SET
-                            tokens = tokens + ?,
-                            requests = requests + ?,
-                            timestamp = ?
-                    """, (user_id, time_key, time_type, tokens, requests if time_type == 'minute' else 0, current_time,
-                          tokens, requests if time_type == 'minute' else 0, current_time))
-
-                # 사용량 히스토리 기록
-                await db.execute("""
-                    INSERT INTO korean_usage_history (user_id, tokens, requests, timestamp, date_str)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, tokens, requests, current_time,
-                      datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')))
+            if user_ids is None:
+                return usages
 
+            # 사용 기록이 없는 사용자는 0 으로 채워 요청 순서대로 반환
+            empty = {
+                'requests_this_minute': 0, 'tokens_this_minute': 0, 'tokens_this_hour': 0, 'tokens_today': 0,
+                'total_requests': 0, 'total_tokens': 0, 'last_request_time': 0, 'cooldown_until': 0,
+                'user_type': 'korean_user'
+            }
+            return {user_id: usages.get(user_id) or dict(empty) for user_id in user_ids}
+
+        except Exception as e:
+            # 빈 결과는 "사용자 없음"과 구분되지 않으므로 호출자에게 전달
+            logger.error(f"❌ Failed to get usage for {len(user_ids or ())} Korean users: {e}")
+            raise
+
+    async def _write_usage(self, db, user_id: str, tokens: int, requests: int,
+                           group_ids: Sequence[str], current_time: float):
+        """사용자/시간별/그룹/히스토리 사용량 쓰기 (커밋은 호출자가 수행)"""
+        buckets = self._get_buckets(current_time)
+
+        # 사용자 기본 정보 업데이트
+        await db.execute("""
+            INSERT INTO korean_users (user_id, total_tokens, total_requests, last_request_time, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                total_tokens = total_tokens + ?,
+                total_requests = total_requests + ?,
+                last_request_time = ?,
+                updated_at = ?
+        """, (user_id, tokens, requests, current_time, current_time, current_time,
+              tokens, requests, current_time, current_time))
+
+        # 분 사용량과 시간 롤업 업데이트
+        for time_type in ('minute', 'hour'):
+            await db.execute(f"""
+                INSERT INTO {USAGE_TABLES[time_type]} (user_id, bucket, tokens, requests) VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id, bucket) DO UPDATE SET
+                    tokens = tokens + excluded.tokens,
+                    requests = requests + excluded.requests
+            """, (user_id, buckets[time_type], tokens, requests))
+
+        # 일 롤업은 그날 첫 기록인지 알아야 일별 합계의 활성 사용자 수를 유지할 수 있음
+        cursor = await db.execute("""
+            UPDATE korean_usage_day SET tokens = tokens + ?, requests = requests + ?
+            WHERE user_id = ? AND bucket = ?
+        """, (tokens, requests, user_id, buckets['day']))
+        new_today = cursor.rowcount == 0
+        if new_today:
+            await db.execute("""
+                INSERT INTO korean_usage_day (user_id, bucket, tokens, requests) VALUES (?, ?, ?, ?)
+            """, (user_id, buckets['day'], tokens, requests))
+
+        await db.execute("""
+            INSERT INTO korean_usage_daily_totals (bucket, tokens, requests, active_users) VALUES (?, ?, ?, ?)
+            ON CONFLICT(bucket) DO UPDATE SET
+                tokens = tokens + excluded.tokens,
+                requests = requests + excluded.requests,
+                active_users = active_users + excluded.active_users
+        """, (buckets['day'], tokens, requests, int(new_today)))
+
+        # 그룹 공유 사용량 업데이트
+        for group_id in group_ids:
+            for time_type, bucket in buckets.items():
+                await db.execute(f"""
+                    INSERT INTO {GROUP_USAGE_TABLES[time_type]} (group_id, bucket, tokens, requests)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(group_id, bucket) DO UPDATE SET
+                        tokens = tokens + excluded.tokens,
+                        requests = requests + excluded.requests
+                """, (group_id, bucket, tokens, requests))
+
+        # 사용량 히스토리 기록
+        await db.execute("""
+            INSERT INTO korean_usage_history (user_id, tokens, requests, timestamp, date_str)
+            VALUES (?, ?, ?, ?, ?)
+        """, (user_id, tokens, requests, current_time,
+              datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')))
+
+    @timed_storage_call('sqlite')
+    async def record_usage(self, user_id: str, tokens: int, requests: int = 1, group_ids: Sequence[str] = ()):
+        """한국어 사용자 사용량 기록 (group_ids 의 공유 사용량도 같은 트랜잭션에서 증가)"""
+        try:
+            await self._ensure_initialized()
+
+            async with aiosqlite.connect(self.db_path) as db:
+                await self._write_usage(db, user_id, tokens, requests, group_ids, time.time())
                 await db.commit()
 
                 logger.debug(f"📊 Recorded Korean usage: {user_id} -> {tokens} tokens, {requests} requests")
@@ -226,6 +487,83 @@ class SQLiteStorage:
             logger.error(f"❌ Failed to record usage for Korean user {user_id}: {e}")
             raise
 
+    @timed_storage_call('sqlite')
+    async def record_usage_many(self, entries: Sequence[Tuple[str, int, int, Sequence[str]]],
+                                timestamp: Optional[float] = None):
+        """여러 사용자의 누적 사용량 (user_id, tokens, requests, group_ids) 을 트랜잭션 하나로 기록"""
+        if not entries:
+            return
+        try:
+            await self._ensure_initialized()
+
+            current_time = time.time() if timestamp is None else timestamp
+            async with aiosqlite.connect(self.db_path) as db:
+                for user_id, tokens, requests, group_ids in entries:
+                    await self._write_usage(db, user_id, tokens, requests, group_ids, current_time)
+                await db.commit()
+
+                logger.debug(f"📊 Recorded Korean usage batch: {len(entries)} users")
+
+        except Exception as e:
+            logger.error(f"❌ Failed to record Korean usage batch ({len(entries)} users): {e}")
+            raise
+
+    @timed_storage_call('sqlite')
+    async def gcra_acquire(self, user_id: str, entries: Sequence[Tuple[str, str, int, float, float]],
+                           now: Optional[float] = None) -> Tuple[int, float]:
+        """GCRA 제한 확인 및 갱신 (BEGIN IMMEDIATE 트랜잭션 하나로 원자적 처리)
+
+        entries 는 (대상, 제한 이름, limit, period 초, cost) 목록입니다. 모든 제한을
+        통과한 경우에만 모든 TAT 를 갱신합니다.
+        반환: (0, 0) 허용, (-1, cooldown_until) 쿨다운, (i, retry_after) i번째(1부터) 제한 초과
+        """
+        await self._ensure_initialized()
+        if now is None:
+            now = time.time()
+
+        state_keys = [f"{subject}:{name}" for subject, name, _, _, _ in entries]
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = await db.execute(
+                    "SELECT cooldown_until FROM korean_users WHERE user_id = ?", (user_id,))
+                row = await cursor.fetchone()
+                if row and row[0] > now:
+                    await db.rollback()
+                    return -1, row[0]
+
+                placeholders = ",".join("?" * len(state_keys))
+                cursor = await db.execute(
+                    f"SELECT state_key, tat FROM korean_gcra_state WHERE state_key IN ({placeholders})",
+                    state_keys)
+                stored = dict(await cursor.fetchall())
+
+                new_tats = []
+                for i, (state_key, (_, _, limit, period, cost)) in enumerate(zip(state_keys, entries), start=1):
+                    if limit <= 0:
+                        # 0 이하 제한은 항상 초과 (무한대 대기 대신 한 주기)
+                        await db.rollback()
+                        return i, float(period)
+                    tat = max(stored.get(state_key, 0.0), now)
+                    new_tat = tat + cost * period / limit
+                    if new_tat - now > period:
+                        await db.rollback()
+                        return i, new_tat - now - period
+                    new_tats.append((state_key, new_tat))
+
+                await db.executemany("""
+                    INSERT INTO korean_gcra_state (state_key, tat) VALUES (?, ?)
+                    ON CONFLICT(state_key) DO UPDATE SET tat = excluded.tat
+                """, new_tats)
+                await db.commit()
+                return 0, 0.0
+
+            except Exception:
+                await db.rollback()
+                raise
+
+    @timed_storage_call('sqlite')
     async def update_actual_tokens(self, user_id: str, actual_input: int, actual_output: int):
         """실제 토큰 사용량으로 업데이트"""
         try:
@@ -257,6 +595,7 @@ class SQLiteStorage:
         except Exception as e:
             logger.error(f"❌ Failed to update actual tokens for Korean user {user_id}: {e}")
 
+    @timed_storage_call('sqlite')
     async def set_user_cooldown(self, user_id: str, cooldown_until: float):
         """한국어 사용자 쿨다운 설정"""
         try:
@@ -281,6 +620,7 @@ class SQLiteStorage:
         except Exception as e:
             logger.error(f"❌ Failed to set cooldown for Korean user {user_id}: {e}")
 
+    @timed_storage_call('sqlite')
     async def reset_user_usage(self, user_id: str):
         """한국어 사용자 사용량 초기화"""
         try:
@@ -289,13 +629,29 @@ class SQLiteStorage:
             current_time = time.time()
 
             async with aiosqlite.connect(self.db_path) as db:
-                # 현재 시간 기준 시간별 사용량 삭제
-                time_keys = self._get_time_keys(current_time)
-                for time_type, time_key in time_keys.items():
+                # 현재 시간 기준 시간별 사용량 삭제 (오늘 사용량은 일별 합계에서도 차감)
+                buckets = self._get_buckets(current_time)
+                cursor = await db.execute(
+                    "SELECT tokens, requests FROM korean_usage_day WHERE user_id = ? AND bucket = ?",
+                    (user_id, buckets['day']))
+                today = await cursor.fetchone()
+                if today:
                     await db.execute("""
-                        DELETE FROM korean_usage_by_time 
-                        WHERE user_id = ? AND time_key = ? AND time_type = ?
-                    """, (user_id, time_key, time_type))
+                        UPDATE korean_usage_daily_totals
+                        SET tokens = tokens - ?, requests = requests - ?, active_users = active_users - 1
+                        WHERE bucket = ?
+                    """, (today[0], today[1], buckets['day']))
+
+                for time_type, bucket in buckets.items():
+                    await db.execute(f"""
+                        DELETE FROM {USAGE_TABLES[time_type]}
+                        WHERE user_id = ? AND bucket = ?
+                    """, (user_id, bucket))
+
+                # GCRA 상태 삭제
+                await db.execute(
+                    "DELETE FROM korean_gcra_state WHERE state_key IN (?, ?, ?, ?)",
+                    tuple(f"{user_id}:{name}" for name in ('rpm', 'tpm', 'tph', 'daily')))
 
                 # 쿨다운 해제
                 await db.execute("""
@@ -329,24 +685,19 @@ class SQLiteStorage:
             logger.error(f"❌ Failed to get all Korean users: {e}")
             return []
 
+    @timed_storage_call('sqlite')
     async def get_top_users(self, limit: int = 10, period: str = "today") -> List[Dict]:
         """상위 한국어 사용자 조회"""
         try:
             await self._ensure_initialized()
 
-            current_time = time.time()
-            time_keys = self._get_time_keys(current_time)
+            buckets = self._get_buckets(time.time())
 
             async with aiosqlite.connect(self.db_path) as db:
                 if period == "today":
-                    time_key = time_keys['day']
                     time_type = 'day'
-                elif period == "hour":
-                    time_key = time_keys['hour']
-                    time_type = 'hour'
-                elif period == "minute":
-                    time_key = time_keys['minute']
-                    time_type = 'minute'
+                elif period in ("hour", "minute"):
+                    time_type = period
                 else:  # total
                     # 전체 사용량 기준
                     cursor = await db.execute("""
@@ -367,22 +718,21 @@ class SQLiteStorage:
                         for row in rows
                     ]
 
-                # 시간별 사용량 기준
-                cursor = await db.execute("""
-                    SELECT u.user_id, ut.tokens, ut.requests, u.total_requests
-                    FROM korean_usage_by_time ut
-                    JOIN korean_users u ON ut.user_id = u.user_id
-                    WHERE ut.time_key = ? AND ut.time_type = ?
-                    ORDER BY ut.tokens DESC
+                # 구간별 사용량 기준 ((bucket, tokens, requests) 커버링 인덱스를 역순으로 읽음)
+                cursor = await db.execute(f"""
+                    SELECT user_id, tokens, requests
+                    FROM {USAGE_TABLES[time_type]}
+                    WHERE bucket = ?
+                    ORDER BY tokens DESC
                     LIMIT ?
-                """, (time_key, time_type, limit))
+                """, (buckets[time_type], limit))
                 rows = await cursor.fetchall()
 
                 return [
                     {
                         'user_id': row[0],
                         'tokens': row[1],
-                        'requests': row[2] if row[2] else row[3],
+                        'requests': row[2],
                         'user_type': 'korean_user'
                     }
                     for row in rows
@@ -392,39 +742,26 @@ class SQLiteStorage:
             logger.error(f"❌ Failed to get top Korean users: {e}")
             return []
 
+    @timed_storage_call('sqlite')
     async def get_usage_statistics(self) -> Dict:
         """전체 한국어 사용량 통계"""
         try:
             await self._ensure_initialized()
 
             current_time = time.time()
-            time_keys = self._get_time_keys(current_time)
+            buckets = self._get_buckets(current_time)
 
             async with aiosqlite.connect(self.db_path) as db:
                 # 총 사용자 수
                 cursor = await db.execute("SELECT COUNT(*) FROM korean_users")
                 total_users = (await cursor.fetchone())[0]
 
-                # 오늘 활성 사용자 수
+                # 오늘 토큰/요청/활성 사용자 수 (기록 시 함께 갱신되는 일별 합계 행)
                 cursor = await db.execute("""
-                    SELECT COUNT(*) FROM korean_usage_by_time 
-                    WHERE time_key = ? AND time_type = 'day' AND tokens > 0
-                """, (time_keys['day'],))
-                active_users_today = (await cursor.fetchone())[0]
-
-                # 오늘 총 토큰 사용량
-                cursor = await db.execute("""
-                    SELECT COALESCE(SUM(tokens), 0) FROM korean_usage_by_time 
-                    WHERE time_key = ? AND time_type = 'day'
-                """, (time_keys['day'],))
-                total_tokens_today = (await cursor.fetchone())[0]
-
-                # 오늘 총 요청 수 (근사치)
-                cursor = await db.execute("""
-                    SELECT COALESCE(SUM(requests), 0) FROM korean_usage_by_time 
-                    WHERE time_key = ? AND time_type = 'minute' 
-                """, (time_keys['minute'],))
-                total_requests_today = (await cursor.fetchone())[0]
+                    SELECT tokens, requests, active_users FROM korean_usage_daily_totals WHERE bucket = ?
+                """, (buckets['day'],))
+                total_tokens_today, total_requests_today, active_users_today = (
+                    await cursor.fetchone() or (0, 0, 0))
 
                 return {
                     'total_users': total_users,
@@ -440,40 +777,156 @@ class SQLiteStorage:
             logger.error(f"❌ Failed to get Korean usage statistics: {e}")
             return {}
 
-    async def cleanup_expired_data(self):
-        """만료된 한국어 데이터 정리"""
+    @timed_storage_call('sqlite')
+    async def cleanup_expired_data(self, time_budget: Optional[float] = None) -> bool:
+        """만료된 한국어 데이터 정리 (PK 범위 단위 청크 삭제)
+
+        청크마다 따로 커밋하므로 정리 중에도 기록 트랜잭션이 오래 기다리지
+        않습니다. time_budget(초)을 넘기면 멈추고 False 를 반환하며, 다음 호출이
+        남은 부분을 이어서 정리합니다. 모두 끝나면 True.
+        """
+        deadline = time.monotonic() + time_budget if time_budget else None
         try:
             await self._ensure_initialized()
 
             current_time = time.time()
-            cutoff_time = current_time - (7 * 24 * 3600)  # 7일 전
-
+            deleted_rows = 0
             async with aiosqlite.connect(self.db_path) as db:
-                # 오래된 시간별 사용량 데이터 삭제
-                cursor = await db.execute("""
-                    DELETE FROM korean_usage_by_time 
-                    WHERE timestamp < ?
-                """, (cutoff_time,))
-
-                # 오래된 히스토리 데이터 삭제 (1000개 초과 시)
-                cursor = await db.execute("""
-                    DELETE FROM korean_usage_history 
-                    WHERE id NOT IN (
-                        SELECT id FROM korean_usage_history 
-                        ORDER BY timestamp DESC 
-                        LIMIT 1000
-                    )
-                """)
-
-                deleted_rows = cursor.rowcount
-                await db.commit()
+                for step in (self._cleanup_usage_buckets, self._cleanup_gcra_state,
+                             self._cleanup_old_history, self._cleanup_user_history,
+                             self._cleanup_free_pages):
+                    deleted, done = await step(db, current_time, deadline)
+                    deleted_rows += deleted
+                    if not done:
+                        break
+                else:
+                    done = True
 
-                if deleted_rows > 0:
-                    logger.info(f"🧹 Cleaned up {deleted_rows} expired Korean data rows")
+            if deleted_rows > 0:
+                logger.info(f"🧹 Cleaned up {deleted_rows} expired Korean data rows"
+                            + ("" if done else " (continuing next run)"))
+            return done
 
         except Exception as e:
             logger.error(f"❌ Failed to cleanup expired Korean data: {e}")
+            return True
 
+    async def _delete_chunks(self, db, delete_sql: str, params: Tuple,
+                             deadline: Optional[float]) -> Tuple[int, bool]:
+        """LIMIT 청크 단위 삭제를 남은 행이 없거나 시간 예산이 끝날 때까지 반복"""
+        deleted = 0
+        while True:
+            cursor = await db.execute(delete_sql, (*params, self.cleanup_chunk_size))
+            await db.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.cleanup_chunk_size:
+                return deleted, True
+            if deadline is not None and time.monotonic() >= deadline:
+                return deleted, False
+            # 청크 사이에 대기 중인 기록이 먼저 실행되도록 양보
+            await asyncio.sleep(0)
+
+    async def _cleanup_usage_buckets(self, db, current_time: float,
+                                     deadline: Optional[float]) -> Tuple[int, bool]:
+        """보존 기간이 지난 분/시간/일 사용량 삭제 (일별 합계 행은 하루 한 행이므로 유지)"""
+        cutoff_buckets = self._get_buckets(current_time - self.usage_retention_days * 86400)
+        deleted = 0
+        for time_type, bucket in cutoff_buckets.items():
+            for table, id_column in ((USAGE_TABLES[time_type], 'user_id'),
+                                     (GROUP_USAGE_TABLES[time_type], 'group_id')):
+                count, done = await self._delete_chunks(db, f"""
+                    DELETE FROM {table} WHERE ({id_column}, bucket) IN (
+                        SELECT {id_column}, bucket FROM {table} WHERE bucket < ? LIMIT ?)
+                """, (bucket,), deadline)
+                deleted += count
+                if not done:
+                    return deleted, False
+        return deleted, True
+
+    async def _cleanup_gcra_state(self, db, current_time: float,
+                                  deadline: Optional[float]) -> Tuple[int, bool]:
+        """지난 TAT 삭제 (현재 시각과 같은 의미이므로 삭제해도 동작이 같음)"""
+        return await self._delete_chunks(db, """
+            DELETE FROM korean_gcra_state WHERE state_key IN (
+                SELECT state_key FROM korean_gcra_state WHERE tat < ? LIMIT ?)
+        """, (current_time,), deadline)
+
+    async def _cleanup_old_history(self, db, current_time: float,
+                                   deadline: Optional[float]) -> Tuple[int, bool]:
+        """보존 기간이 지난 히스토리를 가장 오래된 id 부터 id 범위 단위로 삭제
+
+        id 는 기록 순서대로 증가하므로 범위 시작 행이 보존 기간 안이면 멈춥니다.
+        """
+        cutoff_time = current_time - self.history_retention_days * 86400
+        deleted = 0
+        while True:
+            cursor = await db.execute(
+                "SELECT id, timestamp FROM korean_usage_history ORDER BY id LIMIT 1")
+            row = await cursor.fetchone()
+            if row is None or row[1] >= cutoff_time:
+                return deleted, True
+
+            cursor = await db.execute("""
+                DELETE FROM korean_usage_history WHERE id >= ? AND id < ? AND timestamp < ?
+            """, (row[0], row[0] + self.cleanup_chunk_size, cutoff_time))
+            await db.commit()
+            deleted += cursor.rowcount
+            if deadline is not None and time.monotonic() >= deadline:
+                return deleted, False
+            await asyncio.sleep(0)
+
+    async def _cleanup_user_history(self, db, current_time: float,
+                                    deadline: Optional[float]) -> Tuple[int, bool]:
+        """사용자별로 최근 history_per_user 건만 남기고 삭제
+
+        사용자 ID 순으로 진행하며, 시간 예산이 끝나면 다음 호출이 멈춘 사용자부터
+        이어서 정리합니다.
+        """
+        deleted = 0
+        while True:
+            cursor = await db.execute(
+                "SELECT user_id FROM korean_users WHERE user_id > ? ORDER BY user_id LIMIT 100",
+                (self._history_trim_cursor,))
+            user_ids = [row[0] for row in await cursor.fetchall()]
+            if not user_ids:
+                self._history_trim_cursor = ''
+                return deleted, True
+
+            for user_id in user_ids:
+                # (user_id, timestamp) 인덱스에서 보존할 마지막 행 바로 다음 행의 시각
+                cursor = await db.execute("""
+                    SELECT timestamp FROM korean_usage_history WHERE user_id = ?
+                    ORDER BY timestamp DESC LIMIT 1 OFFSET ?
+                """, (user_id, self.history_per_user))
+                boundary = await cursor.fetchone()
+                if boundary is not None:
+                    count, done = await self._delete_chunks(db, """
+                        DELETE FROM korean_usage_history WHERE id IN (
+                            SELECT id FROM korean_usage_history WHERE user_id = ? AND timestamp <= ? LIMIT ?)
+                    """, (user_id, boundary[0]), deadline)
+                    deleted += count
+                    if not done:
+                        return deleted, False
+                self._history_trim_cursor = user_id
+                if deadline is not None and time.monotonic() >= deadline:
+                    return deleted, False
+
+    async def _cleanup_free_pages(self, db, current_time: float,
+                                  deadline: Optional[float]) -> Tuple[int, bool]:
+        """삭제로 생긴 빈 페이지를 incremental_vacuum 으로 조금씩 파일 시스템에 반환"""
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] != AUTO_VACUUM_INCREMENTAL:
+            return 0, True
+        while True:
+            cursor = await db.execute("PRAGMA freelist_count")
+            if (await cursor.fetchone())[0] == 0:
+                return 0, True
+            await db.execute_fetchall(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+            if deadline is not None and time.monotonic() >= deadline:
+                return 0, False
+            await asyncio.sleep(0)
+
+    @timed_storage_call('sqlite')
     async def get_user_history(self, user_id: str, limit: int = 100) -> List[Dict]:
         """한국어 사용자 사용량 히스토리 조회"""
         try:
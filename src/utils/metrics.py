@@ -0,0 +1,193 @@
+"""
+Prometheus metrics for the Korean Token Limiter hot path
+"""
+
+import functools
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import logging
+
+from src.utils.tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# 요청 처리 단계 (limiter, tokenization, queue_wait, upstream_ttft, total)
+STAGES = ("limiter", "tokenization", "queue_wait", "upstream_ttft", "total")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+OTHER_LABEL = "__other__"
+
+
+class BoundedLabelSet:
+    """레이블 카디널리티 제한 (처음 본 max_size 개 값만 유지, 나머지는 __other__)"""
+
+    def __init__(self, max_size: int = 100):
+        self.max_size = max_size
+        self._seen: Dict[str, str] = {}
+
+    def get(self, value: str) -> str:
+        label = self._seen.get(value)
+        if label is not None:
+            return label
+        if len(self._seen) >= self.max_size:
+            return OTHER_LABEL
+        self._seen[value] = value
+        return value
+
+
+class _StatsCollector:
+    """스크레이프 시점에 stats 함수를 호출해 게이지로 노출"""
+
+    def __init__(self, prefix: str, stats_fn: Callable[[], Dict[str, Any]]):
+        self.prefix = prefix
+        self.stats_fn = stats_fn
+
+    def collect(self):
+        try:
+            stats = self.stats_fn()
+        except Exception as e:
+            logger.debug(f"❌ Stats collection failed for {self.prefix}: {e}")
+            return
+
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            yield GaugeMetricFamily(f"{self.prefix}_{key}", f"{self.prefix} {key}", value=value)
+
+        backends = stats.get('backends')
+        if isinstance(backends, list):
+            for field in ('in_flight', 'total_requests', 'connect_errors', 'available'):
+                family = GaugeMetricFamily(f"{self.prefix}_backend_{field}", f"Per-backend {field}",
+                                           labels=['backend'])
+                for backend in backends:
+                    family.add_metric([backend.get('url', '')], float(backend.get(field, 0)))
+                yield family
+
+
+class LimiterMetrics:
+    """제한기/프록시 메트릭 (비활성화 시 모든 호출이 즉시 반환)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.registry = None
+        self._users = BoundedLabelSet()
+        self._groups = BoundedLabelSet()
+        self.rejection_listener: Optional[Callable[[str], None]] = None  # 실시간 스트림 등 (메트릭 비활성화와 무관)
+
+    def configure(self, enabled: bool = True, max_user_labels: int = 100, max_group_labels: int = 100):
+        """메트릭 활성화 (prometheus_client 미설치 시 비활성 유지)"""
+        if not enabled:
+            self.enabled = False
+            return
+
+        if not PROMETHEUS_AVAILABLE:
+            logger.warning("⚠️ prometheus_client 패키지가 없어 메트릭을 비활성화합니다")
+            self.enabled = False
+            return
+
+        self.registry = CollectorRegistry()
+        self._users = BoundedLabelSet(max_user_labels)
+        self._groups = BoundedLabelSet(max_group_labels)
+
+        self.stage_latency = Histogram(
+            'korean_limiter_stage_seconds', 'Request latency by stage',
+            ['stage'], buckets=LATENCY_BUCKETS, registry=self.registry
+        )
+        self.tokens = Counter(
+            'korean_limiter_tokens', 'Tokens by user/group and direction',
+            ['user', 'group', 'direction'], registry=self.registry
+        )
+        self.rejections = Counter(
+            'korean_limiter_rejections', 'Rate limit rejections (429) by reason',
+            ['reason'], registry=self.registry
+        )
+        self.storage_latency = Histogram(
+            'korean_limiter_storage_call_seconds', 'Storage call latency',
+            ['backend', 'operation'], buckets=LATENCY_BUCKETS, registry=self.registry
+        )
+
+        # 단계별 레이블 자식은 미리 생성해 요청 경로에서 조회 비용 제거
+        self._stage_children = {stage: self.stage_latency.labels(stage) for stage in STAGES}
+        self.enabled = True
+        logger.info(f"✅ Prometheus metrics enabled (max user labels: {max_user_labels})")
+
+    def observe_stage(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        child = self._stage_children.get(stage)
+        if child is None:
+            child = self._stage_children[stage] = self.stage_latency.labels(stage)
+        child.observe(seconds)
+
+    def add_tokens(self, user_id: str, input_tokens: int, output_tokens: int, groups: Sequence[str] = ()):
+        """사용자/그룹별 토큰 (여러 그룹 소속이면 중복 집계되지 않도록 'a,b' 레이블 하나)"""
+        if not self.enabled:
+            return
+        user = self._users.get(user_id)
+        group = self._groups.get(','.join(groups)) if groups else ""
+        if input_tokens:
+            self.tokens.labels(user, group, 'in').inc(input_tokens)
+        if output_tokens:
+            self.tokens.labels(user, group, 'out').inc(output_tokens)
+
+    def count_rejection(self, reason: str):
+        if self.rejection_listener is not None:
+            self.rejection_listener(reason)
+        if not self.enabled:
+            return
+        self.rejections.labels(reason).inc()
+
+    def observe_storage(self, backend: str, operation: str, seconds: float):
+        if not self.enabled:
+            return
+        self.storage_latency.labels(backend, operation).observe(seconds)
+
+    def register_stats(self, prefix: str, stats_fn: Callable[[], Dict[str, Any]]):
+        """스크레이프 시점 통계 수집기 등록 (업스트림 풀 등)"""
+        if not self.enabled:
+            return
+        self.registry.register(_StatsCollector(prefix, stats_fn))
+
+    def render(self) -> Tuple[bytes, str]:
+        """Prometheus 텍스트 형식 출력"""
+        if not self.enabled:
+            return b"", CONTENT_TYPE_LATEST
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+# 전역 인스턴스
+metrics = LimiterMetrics()
+
+
+def timed_storage_call(backend: str):
+    """저장소 비동기 메서드의 호출 지연을 메트릭과 요청 트레이스에 기록하는 데코레이터"""
+    def decorator(func):
+        operation = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = current_trace()
+            if not metrics.enabled and trace is None:
+                return await func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.observe_storage(backend, operation, elapsed)
+                if trace is not None:
+                    trace.add('storage', elapsed)
+
+        return wrapper
+    return decorator
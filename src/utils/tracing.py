@@ -0,0 +1,122 @@
+"""
+Lightweight per-request stage tracing with Server-Timing headers
+"""
+
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTrace:
+    """요청 하나의 단계별 소요 시간"""
+
+    __slots__ = ('path', 'user_id', 'started_at', 'start', 'spans')
+
+    def __init__(self, path: str, user_id: str = ""):
+        self.path = path
+        self.user_id = user_id
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing 헤더 값 (밀리초)"""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+    def to_dict(self, total: float, status_code: int) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'user_id': self.user_id,
+            'started_at': self.started_at,
+            'status_code': status_code,
+            'total_ms': round(total * 1000, 2),
+            'spans_ms': {name: round(seconds * 1000, 2) for name, seconds in self.spans.items()}
+        }
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar('korean_limiter_trace', default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """현재 요청의 트레이스 (추적 비활성 시 None)"""
+    return _current_trace.get()
+
+
+def record_span(name: str, seconds: float):
+    """현재 요청 트레이스에 단계 시간 추가 (트레이스가 없으면 무시)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def detach_trace():
+    """현재 컨텍스트에서 트레이스 분리 (여러 요청이 공유하는 백그라운드 작업용)"""
+    _current_trace.set(None)
+
+
+class Tracer:
+    """Server-Timing 헤더 및 느린 요청 샘플링 링 버퍼"""
+
+    def __init__(self):
+        self.server_timing = False
+        self.sample_rate = 0.0
+        self.slow_threshold = 1.0
+        self.enabled = False
+        self._buffer: deque = deque(maxlen=200)
+
+    def configure(self, server_timing: bool = False, sample_rate: float = 0.0,
+                  slow_threshold_ms: float = 1000, buffer_size: int = 200):
+        """추적 설정 (server_timing/sampling 모두 꺼지면 트레이스 객체를 만들지 않음)"""
+        self.server_timing = server_timing
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.slow_threshold = slow_threshold_ms / 1000
+        self._buffer = deque(maxlen=buffer_size)
+        self.enabled = self.server_timing or self.sample_rate > 0
+        if self.enabled:
+            logger.info(f"✅ Request tracing enabled (server_timing={server_timing}, "
+                        f"sample_rate={self.sample_rate}, slow>={slow_threshold_ms}ms)")
+
+    def start(self, path: str, user_id: str = "") -> Optional[RequestTrace]:
+        """요청 트레이스 시작"""
+        if not self.enabled:
+            return None
+        trace = RequestTrace(path, user_id)
+        _current_trace.set(trace)
+        return trace
+
+    def finish(self, trace: Optional[RequestTrace], response) -> None:
+        """트레이스 종료: 헤더 추가 및 느린 요청 샘플링"""
+        if trace is None:
+            return
+        _current_trace.set(None)
+
+        total = trace.elapsed()
+        if self.server_timing:
+            response.headers["Server-Timing"] = trace.server_timing(total)
+
+        if total >= self.slow_threshold and self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._buffer.append(trace.to_dict(total, response.status_code))
+
+    def dump(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """샘플링된 느린 요청 (최신순)"""
+        return list(self._buffer)[-limit:][::-1]
+
+    def clear(self):
+        self._buffer.clear()
+
+
+# 전역 인스턴스
+tracer = Tracer()
@@ -0,0 +1,173 @@
+"""
+In-process usage aggregator pushed to dashboards over server-sent events
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UsageStream:
+    """사용량 변화량을 interval 마다 모아 구독자 전체에 한 번에 전송
+
+    집계 태스크는 구독자 수와 무관하게 하나만 돌며, 구독자가 없으면 기록도
+    하지 않습니다. 대시보드를 여러 개 열어도 제한기/저장소 부하는 늘지 않고
+    구독자마다 큐에 이벤트를 넣는 비용만 듭니다. 느린 구독자의 큐가 차면
+    가장 오래된 이벤트를 버립니다.
+    """
+
+    def __init__(self, interval: float = 1.0, max_users: int = 50,
+                 groups_of: Optional[Callable[[str], Sequence[str]]] = None,
+                 stats_fn: Optional[Callable[[], Dict[str, Any]]] = None,
+                 subscriber_queue_size: int = 30):
+        self.interval = interval
+        self.max_users = max_users
+        self.groups_of = groups_of
+        self.stats_fn = stats_fn
+        self.subscriber_queue_size = subscriber_queue_size
+
+        self._users: Dict[str, List[int]] = {}  # 사용자 -> [토큰, 요청, 429]
+        self._reasons: Dict[str, int] = {}
+        self._subscribers: List[asyncio.Queue] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.events_sent = 0
+        self.events_dropped = 0
+
+    @classmethod
+    def from_config(cls, stream_config: Optional[Dict[str, Any]], **kwargs) -> Optional['UsageStream']:
+        """monitoring.usage_stream 설정에서 생성 (비활성화 시 None)"""
+        stream_config = stream_config or {}
+        if not stream_config.get('enabled', False):
+            return None
+        stream = cls(
+            interval=float(stream_config.get('interval_seconds', 1.0)),
+            max_users=int(stream_config.get('max_users', 50)),
+            **kwargs
+        )
+        logger.info(f"✅ Usage stream enabled (every {stream.interval}s, top {stream.max_users} users)")
+        return stream
+
+    def record(self, user_id: str, tokens: int, requests: int = 1):
+        if not self._subscribers:
+            return
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = [0, 0, 0]
+        entry[0] += tokens
+        entry[1] += requests
+
+    def count_rejection(self, user_id: str):
+        """사용자별 429 (미들웨어에서 호출)"""
+        if not self._subscribers:
+            return
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = [0, 0, 0]
+        entry[2] += 1
+
+    def count_reason(self, reason: str):
+        """사유별 429 (metrics.count_rejection 에서 호출)"""
+        if not self._subscribers:
+            return
+        self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+    def _snapshot(self) -> Dict[str, Any]:
+        users, self._users = self._users, {}
+        reasons, self._reasons = self._reasons, {}
+
+        groups: Dict[str, Dict[str, int]] = {}
+        if self.groups_of is not None:
+            for user_id, (tokens, requests, rejections) in users.items():
+                for group_id in self.groups_of(user_id):
+                    group = groups.setdefault(group_id, {'tokens': 0, 'requests': 0, 'rejections': 0})
+                    group['tokens'] += tokens
+                    group['requests'] += requests
+                    group['rejections'] += rejections
+
+        # 상위 max_users 명만 개별 전송, 나머지는 합계로
+        ranked = sorted(users.items(), key=lambda item: item[1][0], reverse=True)
+        top = ranked[:self.max_users]
+        others = ranked[self.max_users:]
+
+        event = {
+            'timestamp': time.time(),
+            'interval': self.interval,
+            'users': {
+                user_id: {'tokens': tokens, 'requests': requests, 'rejections': rejections}
+                for user_id, (tokens, requests, rejections) in top
+            },
+            'groups': groups,
+            'rejections': {
+                'total': sum(entry[2] for entry in users.values()),
+                'by_reason': reasons
+            }
+        }
+        if others:
+            event['other_users'] = {
+                'count': len(others),
+                'tokens': sum(entry[0] for _, entry in others),
+                'requests': sum(entry[1] for _, entry in others),
+                'rejections': sum(entry[2] for _, entry in others)
+            }
+        if self.stats_fn is not None:
+            try:
+                event['queue'] = self.stats_fn()
+            except Exception as e:
+                logger.debug(f"❌ Usage stream stats failed: {e}")
+        return event
+
+    async def _run(self):
+        while self._subscribers:
+            await asyncio.sleep(self.interval)
+            payload = f"event: usage\ndata: {json.dumps(self._snapshot(), ensure_ascii=False)}\n\n"
+            for queue in self._subscribers:
+                if queue.full():
+                    queue.get_nowait()
+                    self.events_dropped += 1
+                queue.put_nowait(payload)
+                self.events_sent += 1
+        self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.append(queue)
+        if self._task is None:
+            self._users, self._reasons = {}, {}
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def events(self) -> AsyncIterator[str]:
+        """SSE 응답 본문 (연결이 끊기면 구독 해제)"""
+        queue = self.subscribe()
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+    async def close(self):
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self._subscribers),
+            'events_sent': self.events_sent,
+            'events_dropped': self.events_dropped
+        }
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+API 키 인덱스 벤치마크 (키 10만 개 로드 시간, 조회 비용)
+"""
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+
+from src.core.api_key_index import ApiKeyIndex
+from src.core.config_index import UsersConfigReloader
+from src.core.rate_limiter import KoreanRateLimiter
+
+
+def make_users_config(key_count: int, user_count: int):
+    users = {f"사용자{i}": {'rpm': 20, 'tpm': 3000, 'daily': 500000} for i in range(user_count)}
+    keys = {f"sk-{secrets.token_hex(16)}": f"사용자{i % user_count}" for i in range(key_count)}
+    return {'users': users, 'api_keys': keys}, list(keys)
+
+
+def run_benchmark(key_count: int = 100000, user_count: int = 1000, lookups: int = 200000):
+    print(f"🧪 API 키 {key_count:,}개, 사용자 {user_count:,}명")
+    config, keys = make_users_config(key_count, user_count)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False, encoding='utf-8') as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+        path = f.name
+    keys_path = path + '.keys'
+
+    try:
+        limiter = KoreanRateLimiter(storage=None)
+        reloader = UsersConfigReloader(path, limiter, poll_interval=0)
+
+        start = time.perf_counter()
+        reloader.load()
+        print(f"설정 로드 (YAML api_keys)    {time.perf_counter() - start:8.3f}s")
+
+        with open(keys_path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{key} {user_id}\n" for key, user_id in config['api_keys'].items())
+        with open(path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({'users': config['users'], 'api_keys_file': keys_path}, f, allow_unicode=True)
+        start = time.perf_counter()
+        reloader.load()
+        print(f"설정 로드 (api_keys_file)    {time.perf_counter() - start:8.3f}s")
+
+        start = time.perf_counter()
+        ApiKeyIndex.build((key, config['api_keys'][key]) for key in keys)
+        print(f"해시 인덱스 생성만           {time.perf_counter() - start:8.3f}s")
+
+        for key in keys[:1000]:
+            assert limiter.get_user_from_api_key(key) == config['api_keys'][key]
+
+        start = time.perf_counter()
+        for i in range(lookups):
+            limiter.get_user_from_api_key(keys[i % key_count])
+        per_call = (time.perf_counter() - start) / lookups * 1e6
+        print(f"등록 키 조회 (해시 검증)     {per_call:8.2f}µs/회")
+
+        start = time.perf_counter()
+        for i in range(lookups):
+            limiter.get_user_from_api_key(f"sk-unknown-{i}")
+        per_call = (time.perf_counter() - start) / lookups * 1e6
+        print(f"미등록 키 조회               {per_call:8.2f}µs/회")
+        print(f"📊 {limiter.index.api_keys.get_stats()}")
+    finally:
+        os.unlink(path)
+        if os.path.exists(keys_path):
+            os.unlink(keys_path)
+
+
+if __name__ == "__main__":
+    run_benchmark()
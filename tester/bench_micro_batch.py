@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+마이크로 배칭 처리량 벤치마크 (로컬 가짜 vLLM 사용)
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+
+from src.proxy.micro_batcher import MicroBatcher
+from tester.fake_vllm import FakeVLLMConfig, create_app
+
+FAKE_PORT = 18100
+
+# 호출당 20ms + 프롬프트당 2ms 프리필, 8토큰 생성 8ms (지터 없음)
+FAKE_CONFIG = FakeVLLMConfig(call_overhead_ms=20, ttft_ms=2, ttft_sigma=0,
+                             tokens_per_sec=1000, token_rate_jitter=0, slots=4)
+
+
+async def run_benchmark(total_requests: int = 400, concurrency: int = 64):
+    server = uvicorn.Server(uvicorn.Config(create_app(FAKE_CONFIG), port=FAKE_PORT, log_level="error"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    client = httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=concurrency))
+
+    async def send(payload):
+        return await client.post(f"http://127.0.0.1:{FAKE_PORT}/v1/completions", json=payload)
+
+    batcher = MicroBatcher(send, window_ms=5, max_batch_size=16)
+
+    async def drive(label, call):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                payload = {"model": "korean-llama", "prompt": f"안녕하세요 {i}", "max_tokens": 8}
+                await call(payload, f"user{i % 10}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12} {total_requests / elapsed:8.1f} req/s  ({elapsed:.2f}s)")
+        return total_requests / elapsed
+
+    async def direct(payload, user_id):
+        response = await send(payload)
+        response.raise_for_status()
+
+    async def batched(payload, user_id):
+        status, _ = await batcher.submit(payload, user_id)
+        assert status == 200
+
+    print(f"🧪 요청 {total_requests}건, 동시성 {concurrency}")
+    direct_rps = await drive("직접 전송", direct)
+    batched_rps = await drive("마이크로배치", batched)
+    print(f"📊 처리량 향상: {batched_rps / direct_rps:.1f}x, 배치 통계: {batcher.get_stats()}")
+
+    await client.aclose()
+    server.should_exit = True
+    await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Redis 사용자당 메모리 비교 (이전 키 구조 vs 번호 + 사용자 해시 구조)
+
+실제 Redis 가 필요합니다. 비어 있는 DB 번호를 지정하세요 (데이터가 있으면 중단).
+
+    redis-server --maxmemory 256mb --port 6390 &
+    python tester/bench_redis_memory.py --url redis://localhost:6390/15 --users 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis.asyncio as redis
+
+from src.storage.redis_storage import HISTORY_STREAM_PREFIX, RedisStorage
+
+
+async def used_memory(client) -> int:
+    # 지연 해제(lazyfree)가 끝나도록 잠시 대기
+    await asyncio.sleep(0.5)
+    return (await client.info('memory'))['used_memory']
+
+
+async def write_legacy(client, user_ids, groups_per_user: int = 1, batch: int = 500):
+    """이전 버전과 같은 키 구조로 사용자당 기록 1회 (히스토리 제외)"""
+    now = time.time()
+    dt = datetime.fromtimestamp(now)
+    for start in range(0, len(user_ids), batch):
+        pipe = client.pipeline(transaction=False)
+        for user_id in user_ids[start:start + batch]:
+            encoded = user_id.encode('utf-8').hex()
+            windows = {
+                f"korean_usage:{encoded}:minute:{dt.strftime('%Y%m%d%H%M')}": 3600,
+                f"korean_usage:{encoded}:hour:{dt.strftime('%Y%m%d%H')}": 86400,
+                f"korean_usage:{encoded}:day:{dt.strftime('%Y%m%d')}": 604800,
+            }
+            for key, ttl in windows.items():
+                pipe.hset(key, mapping={'tokens': 1234, 'requests': 1})
+                pipe.expire(key, ttl)
+            pipe.hset(f"korean_user:{encoded}:info", mapping={
+                'total_tokens': 1234, 'total_requests': 1, 'last_request_time': now,
+                'user_type': 'korean_user', 'original_user_id': user_id
+            })
+            pipe.expire(f"korean_user:{encoded}:info", 2592000)
+            pipe.hset(f"korean_mapping:{encoded}", mapping={
+                'original_id': user_id, 'encoded_id': encoded, 'last_access': now
+            })
+            pipe.expire(f"korean_mapping:{encoded}", 2592000)
+        await pipe.execute()
+
+
+async def write_compact(storage: RedisStorage, user_ids, batch: int = 500):
+    """현재 키 구조로 사용자당 기록 1회 (히스토리 스트림은 측정 전에 삭제)"""
+    for start in range(0, len(user_ids), batch):
+        await storage.record_usage_many([(user_id, 1234, 1, ()) for user_id in user_ids[start:start + batch]])
+    async for key in storage.redis.scan_iter(match=f"{HISTORY_STREAM_PREFIX}:*"):
+        await storage.redis.delete(key)
+
+
+async def run(url: str, user_count: int):
+    client = redis.from_url(url, decode_responses=True)
+    if await client.dbsize():
+        print(f"❌ {url} 에 데이터가 있습니다. 비어 있는 DB 를 지정하세요.")
+        return 1
+
+    info = await client.info('memory')
+    print(f"🧪 Redis maxmemory={info.get('maxmemory_human')} policy={info.get('maxmemory_policy')}, "
+          f"사용자 {user_count:,}명")
+    user_ids = [f"한국어사용자_{i:06d}" for i in range(user_count)]
+
+    results = {}
+    try:
+        base = await used_memory(client)
+        await write_legacy(client, user_ids)
+        results['이전 구조 (키 5개/사용자)'] = (await used_memory(client) - base, await client.dbsize())
+        await client.flushdb()
+
+        storage = RedisStorage(url)
+        base = await used_memory(client)
+        await write_compact(storage, user_ids)
+        results['번호 + 사용자 해시'] = (await used_memory(client) - base, await client.dbsize())
+        await storage.close()
+    finally:
+        await client.flushdb()
+        await client.close()
+
+    for label, (memory, keys) in results.items():
+        print(f"   {label:<24} {memory / user_count:8,.0f} 바이트/사용자  (키 {keys:,}개)")
+    legacy, compact = (memory for memory, _ in results.values())
+    print(f"📉 사용자당 메모리 {1 - compact / legacy:.0%} 감소, "
+          f"256MB 기준 약 {256 * 1024 * 1024 // max(compact // user_count, 1):,}명")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=os.getenv('REDIS_URL', 'redis://localhost:6379/15'))
+    parser.add_argument('--users', type=int, default=20000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.url, args.users)))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+SQLite 사용량 조회 벤치마크 (get_user_usage 단일 쿼리 vs 이전 4회 조회, 제한 확인 처리량)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosqlite
+
+from src.core.rate_limiter import KoreanRateLimiter, UserLimits
+from src.storage.sqlite_storage import USAGE_TABLES, SQLiteStorage
+
+
+async def legacy_get_user_usage(storage: SQLiteStorage, user_id: str):
+    """이전 방식: 사용자 행 1회 + 분/시간/일 3회 조회 (실행/fetch 마다 스레드 왕복)"""
+    buckets = storage._get_buckets(time.time())
+    async with aiosqlite.connect(storage.db_path) as db:
+        cursor = await db.execute("""
+            SELECT total_tokens, total_requests, last_request_time, cooldown_until
+            FROM korean_users WHERE user_id = ?
+        """, (user_id,))
+        user_row = await cursor.fetchone() or (0, 0, 0, 0)
+        usage = {'total_tokens': user_row[0], 'total_requests': user_row[1]}
+        for time_type, bucket in buckets.items():
+            cursor = await db.execute(
+                f"SELECT tokens, requests FROM {USAGE_TABLES[time_type]} WHERE user_id = ? AND bucket = ?",
+                (user_id, bucket))
+            row = await cursor.fetchone()
+            usage[f'tokens_this_{time_type}'] = row[0] if row else 0
+    return usage
+
+
+async def measure(label: str, call, duration: float = 2.0, concurrency: int = 1):
+    count = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        nonlocal count
+        while time.perf_counter() < deadline:
+            await call(worker_id)
+            count += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {count / elapsed:10,.0f} 회/초  (동시 {concurrency})")
+
+
+async def run_benchmark(user_count: int = 1000, duration: float = 2.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(os.path.join(tmp, "bench.db"))
+        users = [f"사용자{i}" for i in range(user_count)]
+        await storage.record_usage_many([(user_id, 100, 1, ("개발팀",)) for user_id in users])
+        print(f"🧪 SQLite 사용자 {user_count:,}명, 측정 {duration}초")
+
+        def user(i):
+            return users[i * 7919 % user_count]
+
+        for concurrency in (1, 16):
+            await measure("이전 방식 (4회 조회)", lambda i: legacy_get_user_usage(storage, user(i)),
+                          duration, concurrency)
+            await measure("get_user_usage (단일 쿼리)", lambda i: storage.get_user_usage(user(i)),
+                          duration, concurrency)
+            await measure("get_user_usage + 그룹 1개", lambda i: storage.get_user_usage(user(i), ("개발팀",)),
+                          duration, concurrency)
+
+        limiter = KoreanRateLimiter(storage)
+        limiter.default_limits = UserLimits(rpm=10 ** 9, tpm=10 ** 12, tph=10 ** 12, daily=10 ** 12)
+        for concurrency in (1, 16):
+            await measure("check_limit (고정 윈도우)", lambda i: limiter.check_limit(user(i), 100),
+                          duration, concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
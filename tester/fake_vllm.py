@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+GPU 없이 프록시 오버헤드를 측정하기 위한 가짜 vLLM 서버
+
+/v1/models, /v1/completions (스트리밍 포함), /health 를 구현하며
+TTFT 와 토큰 생성 속도를 분포로 설정할 수 있습니다.
+
+사용 예:
+    python tester/fake_vllm.py --port 8000 --ttft-ms 80 --tokens-per-sec 60 --slots 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SYLLABLES = "가나다라마바사아자차카타파하한국어모델응답입니다"
+
+
+@dataclass
+class FakeVLLMConfig:
+    """가짜 vLLM 지연 설정"""
+    model: str = "korean-llama"
+    call_overhead_ms: float = 20.0   # 호출당 고정 비용 (스케줄링)
+    ttft_ms: float = 50.0            # 프롬프트당 프리필 지연 중앙값 (로그정규)
+    ttft_sigma: float = 0.3          # 프리필 지연 로그정규 sigma
+    tokens_per_sec: float = 100.0    # 시퀀스당 평균 생성 속도
+    token_rate_jitter: float = 0.2   # 생성 속도 상대 편차 (정규분포)
+    slots: int = 4                   # 동시에 처리 가능한 호출 수 (GPU 용량)
+    seed: int = 0
+
+
+def _sample_ttft(config: FakeVLLMConfig, rng: random.Random) -> float:
+    if config.ttft_ms <= 0:
+        return 0.0
+    return rng.lognormvariate(0, config.ttft_sigma) * config.ttft_ms / 1000
+
+
+def _sample_token_interval(config: FakeVLLMConfig, rng: random.Random) -> float:
+    rate = max(1.0, rng.gauss(config.tokens_per_sec, config.tokens_per_sec * config.token_rate_jitter))
+    return 1.0 / rate
+
+
+def _fake_text(rng: random.Random, tokens: int) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(tokens))
+
+
+def create_app(config: FakeVLLMConfig = None) -> FastAPI:
+    """가짜 vLLM FastAPI 앱 생성"""
+    config = config or FakeVLLMConfig()
+    rng = random.Random(config.seed)
+    slots = asyncio.Semaphore(config.slots)
+    app = FastAPI(title="Fake vLLM")
+    app.state.config = config
+    app.state.calls = 0
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/v1/models")
+    async def models():
+        return {
+            "object": "list",
+            "data": [{"id": config.model, "object": "model", "created": 0, "owned_by": "fake-vllm"}]
+        }
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        data = await request.json()
+        prompt = data.get("prompt", "")
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        max_tokens = int(data.get("max_tokens") or 16)
+        n = int(data.get("n") or 1)
+        app.state.calls += 1
+
+        if data.get("stream"):
+            return StreamingResponse(_stream(data, prompts[0], max_tokens), media_type="text/event-stream")
+
+        start = time.perf_counter()
+        async with slots:
+            # 프리필은 프롬프트 수만큼, 디코딩은 시퀀스 간 병렬 (연속 배칭)
+            prefill = config.call_overhead_ms / 1000 + sum(_sample_ttft(config, rng) for _ in prompts)
+            decode = max_tokens * _sample_token_interval(config, rng)
+            await asyncio.sleep(prefill + decode)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        choices = []
+        for i, _ in enumerate(prompts):
+            for j in range(n):
+                choices.append({
+                    "index": i * n + j,
+                    "text": _fake_text(rng, max_tokens),
+                    "logprobs": None,
+                    "finish_reason": "length"
+                })
+
+        prompt_tokens = sum(max(1, len(str(p)) // 2) for p in prompts)
+        completion_tokens = max_tokens * len(choices)
+        return JSONResponse(
+            content={
+                "id": f"cmpl-fake-{app.state.calls}",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": config.model,
+                "choices": choices,
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            },
+            headers={"X-Fake-Latency-Ms": f"{elapsed_ms:.2f}"}
+        )
+
+    async def _stream(data, prompt, max_tokens):
+        async with slots:
+            await asyncio.sleep(config.call_overhead_ms / 1000 + _sample_ttft(config, rng))
+            interval = _sample_token_interval(config, rng)
+            for i in range(max_tokens):
+                chunk = {
+                    "id": f"cmpl-fake-{app.state.calls}",
+                    "object": "text_completion",
+                    "created": int(time.time()),
+                    "model": config.model,
+                    "choices": [{
+                        "index": 0,
+                        "text": _fake_text(rng, 1),
+                        "logprobs": None,
+                        "finish_reason": "length" if i == max_tokens - 1 else None
+                    }]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(interval)
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 vLLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=FakeVLLMConfig.model)
+    parser.add_argument("--call-overhead-ms", type=float, default=FakeVLLMConfig.call_overhead_ms)
+    parser.add_argument("--ttft-ms", type=float, default=FakeVLLMConfig.ttft_ms)
+    parser.add_argument("--ttft-sigma", type=float, default=FakeVLLMConfig.ttft_sigma)
+    parser.add_argument("--tokens-per-sec", type=float, default=FakeVLLMConfig.tokens_per_sec)
+    parser.add_argument("--token-rate-jitter", type=float, default=FakeVLLMConfig.token_rate_jitter)
+    parser.add_argument("--slots", type=int, default=FakeVLLMConfig.slots)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeVLLMConfig(
+        model=args.model,
+        call_overhead_ms=args.call_overhead_ms,
+        ttft_ms=args.ttft_ms,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_sec=args.tokens_per_sec,
+        token_rate_jitter=args.token_rate_jitter,
+        slots=args.slots,
+        seed=args.seed
+    )
+    print(f"🤖 가짜 vLLM 시작: http://{args.host}:{args.port} ({config})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Token Limiter 부하 테스트 (korean_users.yaml 의 API 키로 다수 사용자 시뮬레이션)
+
+가짜 vLLM(tester/fake_vllm.py)과 함께 실행하면 GPU 없이 프록시 오버헤드,
+처리량, 지연 백분위, 제한기 판정 비율을 측정할 수 있습니다.
+
+사용 예:
+    python tester/fake_vllm.py --port 8000 &
+    python main.py &
+    python tester/load_test.py --users 200 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+import yaml
+
+
+def load_api_keys(path: str) -> List[str]:
+    """사용자 설정 파일에서 API 키 목록 로드"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    return list((config.get('api_keys') or {}).keys())
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def normalize_reason(message: str) -> str:
+    """429 사유에서 숫자/괄호를 제거해 분류 키 생성"""
+    reason = re.split(r"[(.]", message or "unknown", maxsplit=1)[0]
+    return re.sub(r"\d+", "N", reason).strip()
+
+
+class LoadStats:
+    """부하 테스트 결과 수집"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.overheads: List[float] = []
+        self.decisions = Counter()
+        self.limit_reasons = Counter()
+
+    def record(self, response: httpx.Response, latency: float):
+        if response.status_code == 200:
+            self.decisions['allowed'] += 1
+            self.latencies.append(latency)
+            upstream_ms = response.headers.get('x-fake-latency-ms')
+            if upstream_ms:
+                self.overheads.append(latency - float(upstream_ms) / 1000)
+        elif response.status_code == 429:
+            self.decisions['limited'] += 1
+            try:
+                message = response.json().get('error', {}).get('message', '')
+            except Exception:
+                message = ''
+            self.limit_reasons[normalize_reason(message)] += 1
+        else:
+            self.decisions[f'http_{response.status_code}'] += 1
+
+
+async def simulated_user(client: httpx.AsyncClient, base_url: str, api_key: str, args,
+                         stats: LoadStats, deadline: float, rng: random.Random):
+    """한 명의 가상 사용자: 요청 → 대기 반복"""
+    endpoint = "/v1/chat/completions" if args.endpoint == "chat" else "/v1/completions"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+    while time.perf_counter() < deadline:
+        if args.endpoint == "chat":
+            payload = {
+                "model": "korean-llama",
+                "messages": [{"role": "user", "content": "안녕하세요! 부하 테스트입니다."}],
+                "max_tokens": args.max_tokens
+            }
+        else:
+            payload = {"model": "korean-llama", "prompt": "한국의 수도는", "max_tokens": args.max_tokens}
+
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{base_url}{endpoint}", json=payload, headers=headers)
+            stats.record(response, time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            stats.decisions[f'error_{type(e).__name__}'] += 1
+
+        await asyncio.sleep(rng.expovariate(1000 / args.think_ms) if args.think_ms > 0 else 0)
+
+
+async def run(args) -> Dict:
+    api_keys = load_api_keys(args.users_config)
+    if not api_keys:
+        raise SystemExit(f"❌ API 키가 없습니다: {args.users_config}")
+
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            simulated_user(client, args.url, api_keys[i % len(api_keys)], args, stats, deadline, rng)
+            for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+
+    total = sum(stats.decisions.values())
+    report = {
+        'requests': total,
+        'throughput_rps': total / elapsed,
+        'allowed_rps': stats.decisions['allowed'] / elapsed,
+        'latency_p50_ms': percentile(stats.latencies, 50) * 1000,
+        'latency_p99_ms': percentile(stats.latencies, 99) * 1000,
+        'overhead_p50_ms': percentile(stats.overheads, 50) * 1000,
+        'overhead_p99_ms': percentile(stats.overheads, 99) * 1000,
+        'decisions': dict(stats.decisions),
+        'limit_reasons': dict(stats.limit_reasons)
+    }
+
+    print("\n📊 부하 테스트 결과")
+    print("=" * 50)
+    print(f"가상 사용자: {args.users}명 (API 키 {len(api_keys)}개), 시간: {elapsed:.1f}s")
+    print(f"총 요청: {total:,}건, 처리량: {report['throughput_rps']:.1f} req/s "
+          f"(허용 {report['allowed_rps']:.1f} req/s)")
+    print(f"지연 p50/p99: {report['latency_p50_ms']:.1f} / {report['latency_p99_ms']:.1f} ms")
+    if stats.overheads:
+        print(f"프록시 오버헤드 p50/p99: {report['overhead_p50_ms']:.1f} / {report['overhead_p99_ms']:.1f} ms")
+    print("\n🚦 제한기 판정 비율")
+    for decision, count in stats.decisions.most_common():
+        print(f"  {decision:<20} {count:>8,}  ({count / max(total, 1) * 100:5.1f}%)")
+    if stats.limit_reasons:
+        print("\n🚫 429 사유")
+        for reason, count in stats.limit_reasons.most_common():
+            print(f"  {reason:<40} {count:>8,}")
+
+    return report
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Token Limiter 부하 테스트")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--users-config", default=os.path.join(base_dir, "config", "korean_users.yaml"))
+    parser.add_argument("--users", type=int, default=100, help="가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=30.0, help="실행 시간 (초)")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="요청 간 평균 대기 (지수분포)")
+    parser.add_argument("--endpoint", choices=["completions", "chat"], default="completions")
+    parser.add_argument("--max-tokens", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
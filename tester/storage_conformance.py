@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+저장소 적합성/성능 검사 (Redis(fakeredis), SQLite(임시 파일), Memory)
+
+모든 백엔드에 같은 시나리오를 실행해 src/storage/base.py 의 UsageStorage 계약을
+확인하고, 연산별 처리량(회/초)과 p99 지연을 출력합니다. 외부 서버 없이 실행됩니다.
+
+    python tester/storage_conformance.py            # 전체 백엔드
+    python tester/storage_conformance.py sqlite     # 일부만
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.rate_limiter import KoreanRateLimiter, UserLimits
+from src.storage import memory_storage, redis_storage, sqlite_storage
+from src.storage.base import UsageStorage
+
+STORAGE_MODULES = (memory_storage, redis_storage, sqlite_storage)
+
+
+class FakeClock:
+    """저장소 모듈의 time 을 대신해 time() 만 고정된 시각으로 돌려줌"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def make_memory(tmp: str):
+    return memory_storage.MemoryStorage()
+
+
+def make_sqlite(tmp: str):
+    return sqlite_storage.SQLiteStorage(os.path.join(tmp, f"conformance_{time.monotonic_ns()}.db"))
+
+
+def make_redis(tmp: str):
+    import fakeredis
+
+    storage = redis_storage.RedisStorage("redis://localhost:6379")
+    storage.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return storage
+
+
+BACKENDS = {'memory': make_memory, 'sqlite': make_sqlite, 'redis': make_redis}
+
+
+class Checker:
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.failures = []
+
+    def equal(self, label: str, actual, expected):
+        if actual != expected:
+            self.failures.append(f"{label}: {actual!r} != {expected!r}")
+
+
+def usage_windows(usage):
+    return (usage['requests_this_minute'], usage['tokens_this_minute'],
+            usage['tokens_this_hour'], usage['tokens_today'])
+
+
+# 적합성 시나리오 (각각 새 저장소에서 실행)
+
+async def check_empty_user(storage, clock, check):
+    usage = await storage.get_user_usage("없는사용자", ("없는그룹",))
+    check.equal("빈 사용자 구간", usage_windows(usage), (0, 0, 0, 0))
+    check.equal("빈 사용자 누적", (usage['total_tokens'], usage['total_requests'], usage['cooldown_until']), (0, 0, 0))
+    check.equal("빈 그룹", usage_windows(usage['groups']['없는그룹']), (0, 0, 0, 0))
+    check.equal("빈 히스토리", await storage.get_user_history("없는사용자"), [])
+
+
+async def check_record_and_groups(storage, clock, check):
+    await storage.record_usage("사용자1", 100, 1, ("개발팀",))
+    await storage.record_usage("사용자1", 50, 1, ("개발팀",))
+    await storage.record_usage_many([("사용자2", 30, 1, ("개발팀",)), ("사용자1", 5, 2, ())])
+
+    usage = await storage.get_user_usage("사용자1", ("개발팀",))
+    check.equal("사용자 구간", usage_windows(usage), (4, 155, 155, 155))
+    check.equal("사용자 누적", (usage['total_tokens'], usage['total_requests']), (155, 4))
+    check.equal("마지막 요청 시각", usage['last_request_time'], clock.now)
+    check.equal("그룹 구간", usage_windows(usage['groups']['개발팀']), (3, 180, 180, 180))
+
+    batch = await storage.get_users_usage(["사용자1", "사용자2", "없는사용자"])
+    for user_id in ("사용자1", "사용자2"):
+        single = await storage.get_user_usage(user_id)
+        check.equal(f"일괄 조회 = 단일 조회 ({user_id})", batch[user_id], single)
+    check.equal("일괄 조회 빈 사용자", usage_windows(batch["없는사용자"]), (0, 0, 0, 0))
+    check.equal("오늘 활성 사용자", sorted(await storage.get_users_usage()), ["사용자1", "사용자2"])
+
+
+async def check_window_rollover(storage, clock, check):
+    await storage.record_usage("사용자1", 100, 1, ("개발팀",))
+
+    clock.advance(60)
+    usage = await storage.get_user_usage("사용자1", ("개발팀",))
+    check.equal("다음 분", usage_windows(usage), (0, 0, 100, 100))
+    check.equal("다음 분 그룹", usage_windows(usage['groups']['개발팀']), (0, 0, 100, 100))
+    await storage.record_usage("사용자1", 10, 1)
+    check.equal("다음 분 기록", usage_windows(await storage.get_user_usage("사용자1")), (1, 10, 110, 110))
+
+    clock.advance(3600)
+    check.equal("다음 시간", usage_windows(await storage.get_user_usage("사용자1")), (0, 0, 0, 110))
+
+    clock.advance(86400)
+    usage = await storage.get_user_usage("사용자1")
+    check.equal("다음 날", usage_windows(usage), (0, 0, 0, 0))
+    check.equal("다음 날 누적 유지", (usage['total_tokens'], usage['total_requests']), (110, 2))
+    check.equal("다음 날 활성 사용자", await storage.get_users_usage(), {})
+    stats = await storage.get_usage_statistics()
+    check.equal("다음 날 통계", (stats['active_users_today'], stats['total_tokens_today']), (0, 0))
+
+
+async def check_cooldown_and_reset(storage, clock, check):
+    await storage.record_usage("사용자1", 100, 3)
+    until = clock.now + 300
+    await storage.set_user_cooldown("사용자1", until)
+    check.equal("쿨다운 조회", (await storage.get_user_usage("사용자1"))['cooldown_until'], until)
+
+    status, value = await storage.gcra_acquire("사용자1", [("사용자1", "rpm", 5, 60.0, 1.0)], now=clock.now)
+    check.equal("쿨다운 중 GCRA", (status, value), (-1, until))
+
+    await storage.reset_user_usage("사용자1")
+    usage = await storage.get_user_usage("사용자1")
+    check.equal("초기화 후 구간", usage_windows(usage), (0, 0, 0, 0))
+    check.equal("초기화 후 쿨다운", usage['cooldown_until'], 0)
+    check.equal("초기화 후 누적 유지", (usage['total_tokens'], usage['total_requests']), (100, 3))
+    stats = await storage.get_usage_statistics()
+    check.equal("초기화 후 오늘 통계", (stats['active_users_today'], stats['total_tokens_today']), (0, 0))
+
+
+async def check_gcra(storage, clock, check):
+    entries = [("사용자1", "rpm", 2, 60.0, 1.0)]
+    results = [await storage.gcra_acquire("사용자1", entries, now=clock.now) for _ in range(3)]
+    check.equal("GCRA 허용 2회", results[:2], [(0, 0.0), (0, 0.0)])
+    check.equal("GCRA 3번째 초과", results[2][0], 1)
+    check.equal("GCRA 재시도 시간", round(results[2][1], 3), 30.0)
+
+    group_entries = [("사용자2", "rpm", 10, 60.0, 1.0), ("개발팀", "rpm", 1, 60.0, 1.0)]
+    await storage.gcra_acquire("사용자2", group_entries, now=clock.now)
+    status, _ = await storage.gcra_acquire("사용자2", group_entries, now=clock.now)
+    check.equal("GCRA 두 번째 제한 초과 위치", status, 2)
+
+    await storage.reset_user_usage("사용자1")
+    check.equal("초기화 후 GCRA", await storage.gcra_acquire("사용자1", entries, now=clock.now), (0, 0.0))
+
+
+async def check_top_users_and_statistics(storage, clock, check):
+    await storage.record_usage("사용자1", 100, 1)
+    await storage.record_usage("사용자2", 300, 2)
+    await storage.record_usage("사용자3", 200, 1)
+    await storage.set_user_cooldown("쿨다운만", clock.now + 60)
+
+    top = await storage.get_top_users(2, "today")
+    check.equal("오늘 상위 사용자", [(u['user_id'], u['tokens'], u['requests']) for u in top],
+                [("사용자2", 300, 2), ("사용자3", 200, 1)])
+
+    clock.advance(60)
+    await storage.record_usage("사용자1", 500, 1)
+    check.equal("이번 분 상위 사용자", [(u['user_id'], u['tokens'], u['requests'])
+                                   for u in await storage.get_top_users(10, "minute")], [("사용자1", 500, 1)])
+    check.equal("누적 상위 사용자", [(u['user_id'], u['tokens'])
+                                for u in await storage.get_top_users(1, "total")], [("사용자1", 600)])
+
+    stats = await storage.get_usage_statistics()
+    check.equal("통계", (stats['total_users'], stats['active_users_today'], stats['total_tokens_today'],
+                        stats['total_requests_today']), (4, 3, 1100, 5))
+    check.equal("전체 사용자", sorted(await storage.get_all_users()), ["사용자1", "사용자2", "사용자3", "쿨다운만"])
+
+
+async def check_history(storage, clock, check):
+    for i in range(5):
+        await storage.record_usage("사용자1", 10 + i, 1)
+        clock.advance(1)
+    await storage.update_actual_tokens("사용자1", 7, 8)
+
+    history = await storage.get_user_history("사용자1", limit=3)
+    check.equal("히스토리 개수", len(history), 3)
+    check.equal("히스토리 최신순", [entry['tokens'] for entry in history], [15, 14, 13])
+    check.equal("실제 토큰 항목", (history[0].get('actual_total'), history[0].get('requests')), (15, 0))
+    check.equal("히스토리 사용자", {entry['user_id'] for entry in history}, {"사용자1"})
+    check.equal("히스토리 날짜", history[1]['date'],
+                datetime.fromtimestamp(history[1]['timestamp']).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+SCENARIOS = (check_empty_user, check_record_and_groups, check_window_rollover, check_cooldown_and_reset,
+             check_gcra, check_top_users_and_statistics, check_history)
+
+
+def install_clock(clock: FakeClock):
+    for module in STORAGE_MODULES:
+        module.time = clock
+
+
+def restore_clock():
+    for module in STORAGE_MODULES:
+        module.time = time
+
+
+async def run_conformance(backend: str, factory, tmp: str) -> Checker:
+    check = Checker(backend)
+    # 로컬 시각 02:10:05 에서 시작 (다음 분/시간이 같은 날 안에 있도록)
+    start = datetime.now().replace(hour=2, minute=10, second=5, microsecond=0).timestamp()
+
+    for scenario in SCENARIOS:
+        clock = FakeClock(start)
+        install_clock(clock)
+        storage = factory(tmp)
+        try:
+            if not isinstance(storage, UsageStorage):
+                check.failures.append(f"{type(storage).__name__} 가 UsageStorage 인터페이스를 구현하지 않음")
+            await scenario(storage, clock, check)
+        except Exception:
+            check.failures.append(f"{scenario.__name__} 예외:\n{traceback.format_exc()}")
+        finally:
+            restore_clock()
+            await storage.close()
+    return check
+
+
+# 성능 측정
+
+async def measure(call, count: int):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        await call(i)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return count / elapsed, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+async def run_performance(backend: str, factory, tmp: str, count: int, user_count: int = 200):
+    storage = factory(tmp)
+    users = [f"사용자{i}" for i in range(user_count)]
+    await storage.record_usage_many([(user_id, 100, 1, ("개발팀",)) for user_id in users])
+
+    limiter = KoreanRateLimiter(storage)
+    limiter.default_limits = UserLimits(rpm=10 ** 9, tpm=10 ** 12, tph=10 ** 12, daily=10 ** 12)
+
+    operations = {
+        'get_user_usage': lambda i: storage.get_user_usage(users[i % user_count]),
+        'get_user_usage+그룹': lambda i: storage.get_user_usage(users[i % user_count], ("개발팀",)),
+        'record_usage': lambda i: storage.record_usage(users[i % user_count], 100, 1, ("개발팀",)),
+        'get_users_usage(50)': lambda i: storage.get_users_usage(users[i % 4 * 50:i % 4 * 50 + 50]),
+        'gcra_acquire': lambda i: storage.gcra_acquire(
+            users[i % user_count], [(users[i % user_count], "tpm", 10 ** 9, 60.0, 1.0)]),
+        'check_limit': lambda i: limiter.check_limit(users[i % user_count], 100),
+    }
+    results = {}
+    for name, call in operations.items():
+        results[name] = await measure(call, count)
+    await storage.close()
+    return results
+
+
+async def main(selected):
+    logging.disable(logging.CRITICAL)
+    failed = False
+    performance = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in selected:
+            factory = BACKENDS[backend]
+            check = await run_conformance(backend, factory, tmp)
+            if check.failures:
+                failed = True
+                print(f"❌ {backend}: {len(check.failures)}건 실패")
+                for failure in check.failures:
+                    print(f"   - {failure}")
+            else:
+                print(f"✅ {backend}: 적합성 시나리오 {len(SCENARIOS)}개 통과")
+
+        for backend in selected:
+            count = 20000 if backend == 'memory' else 1000
+            performance[backend] = await run_performance(backend, BACKENDS[backend], tmp, count)
+
+    print(f"\n📊 {'연산':<22}" + "".join(f"{backend:>22}" for backend in selected))
+    for name in next(iter(performance.values())):
+        row = "".join(f"{performance[b][name][0]:>10,.0f}/s p99 {performance[b][name][1]:5.2f}ms"
+                      for b in selected)
+        print(f"   {name:<22}{row}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    selected = [arg for arg in sys.argv[1:] if arg in BACKENDS] or list(BACKENDS)
+    sys.exit(asyncio.run(main(selected)))
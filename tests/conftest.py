@@ -0,0 +1,30 @@
+"""
+Shared pytest fixtures (저장소 백엔드는 외부 서버 없이: fakeredis, 임시 SQLite, 메모리)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage.memory_storage import MemoryStorage  # noqa: E402
+
+
+def _make_storage(kind: str, tmp_path):
+    if kind == 'memory':
+        return MemoryStorage()
+    if kind == 'sqlite':
+        from src.storage.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(str(tmp_path / "usage.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    from src.storage.redis_storage import RedisStorage
+    storage = RedisStorage("redis://localhost:6379")
+    storage.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return storage
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def storage(request, tmp_path):
+    """백엔드별 빈 저장소"""
+    return _make_storage(request.param, tmp_path)
@@ -0,0 +1,43 @@
+"""
+API 키 인덱스 조회와 설정 검증 오류 표시
+"""
+import pytest
+
+from src.core.api_key_index import ApiKeyIndex
+from src.core.config_index import ConfigValidationError, build_limiter_index
+from src.core.rate_limiter import UserLimits
+
+
+def test_lookup_resolves_registered_keys_only():
+    index = ApiKeyIndex.build([("sk-alpha-000", "alpha"), ("sk-beta-111", "beta")])
+    assert index.lookup("sk-alpha-000") == "alpha"
+    assert index.lookup("sk-beta-111") == "beta"
+    assert index.lookup("sk-alpha-000") == "alpha"
+    assert index.lookup("sk-unknown") is None
+    assert index.lookup("") is None
+    assert len(index) == 2
+
+
+def test_index_holds_digests_not_plaintext_keys():
+    index = ApiKeyIndex.build([("sk-secret-key", "alpha")])
+    assert index.lookup("sk-secret-key") == "alpha"
+    assert index.get_stats() == {'keys': 1, 'verifications': 1}
+    stored = list(index._entries.items())
+    assert all(b"sk-secret" not in prefix + rest and user == "alpha" for prefix, (rest, user) in stored)
+
+
+def test_readd_replaces_user():
+    index = ApiKeyIndex.build([("sk-k", "alpha")])
+    assert index.lookup("sk-k") == "alpha"
+    index.add("sk-k", "beta")
+    assert index.lookup("sk-k") == "beta"
+    assert len(index) == 1
+
+
+def test_validation_errors_do_not_include_key_material():
+    config = {'users': {'alpha': {}}, 'api_keys': {'sk-topsecret-123': 'ghost'}}
+    with pytest.raises(ConfigValidationError) as excinfo:
+        build_limiter_index(config, UserLimits())
+    message = str(excinfo.value)
+    assert "sk-top" not in message
+    assert "#1" in message and "ghost" in message
@@ -0,0 +1,33 @@
+"""
+GCRA 제한 확인 (limit 0, 기본 제한 검증)
+"""
+import asyncio
+import math
+
+import pytest
+
+from src.core.config_index import ConfigValidationError, build_default_limits
+from src.core.rate_limiter import ALGORITHM_GCRA, KoreanRateLimiter, UserLimits
+
+
+def test_zero_limit_returns_finite_retry(storage):
+    entries = [("u1", "rpm", 0, 60.0, 1.0), ("u1", "tpm", 100, 60.0, 10.0)]
+    status, retry_after = asyncio.run(storage.gcra_acquire("u1", entries, now=1000.0))
+    assert status == 1
+    assert math.isfinite(retry_after) and retry_after == pytest.approx(60.0)
+
+
+def test_zero_limit_is_rejected_not_failed_open(storage):
+    limiter = KoreanRateLimiter(storage, algorithm=ALGORITHM_GCRA)
+    limiter.set_default_limits(UserLimits(rpm=10, tpm=0, tph=1000, daily=1000))
+    allowed, message = asyncio.run(limiter.check_limit("u1", 10))
+    assert not allowed
+    assert "분당 토큰" in message
+
+
+def test_default_limits_validated():
+    assert build_default_limits({'rpm': 5, 'cooldown_minutes': 0}).rpm == 5
+    with pytest.raises(ConfigValidationError):
+        build_default_limits({'tpm': 0})
+    with pytest.raises(ConfigValidationError):
+        build_default_limits({'rpm': 'many'})
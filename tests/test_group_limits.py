@@ -0,0 +1,43 @@
+"""
+그룹 공유 제한에도 시간대/고부하 배수 적용
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.rate_limiter import ALGORITHM_FIXED_WINDOW, ALGORITHM_GCRA, KoreanRateLimiter, UserLimits
+from src.storage.memory_storage import MemoryStorage
+
+
+def _limiter(algorithm: str) -> KoreanRateLimiter:
+    limiter = KoreanRateLimiter(MemoryStorage(), algorithm=algorithm)
+    limiter.set_default_limits(UserLimits(rpm=100, tpm=10**6, tph=10**7, daily=10**8, cooldown_minutes=0))
+    limiter.set_group_limits("team", UserLimits(rpm=4, tpm=10**6, tph=10**7, daily=10**8), ["u1"])
+    return limiter
+
+
+async def _allowed(limiter: KoreanRateLimiter, count: int) -> int:
+    allowed = 0
+    for _ in range(count):
+        ok, _ = await limiter.check_limit("u1", 1)
+        if ok:
+            allowed += 1
+            await limiter.record_usage("u1", 1, 0)
+    return allowed
+
+
+@pytest.mark.parametrize('algorithm', [ALGORITHM_FIXED_WINDOW, ALGORITHM_GCRA])
+def test_group_limits_follow_load_multiplier(algorithm):
+    limiter = _limiter(algorithm)
+    limiter.set_load_controller(SimpleNamespace(multiplier=0.5))
+    assert limiter.get_group_limits("team").rpm == 2
+    assert asyncio.run(_allowed(limiter, 6)) == 2
+
+
+def test_group_daily_limit_not_scaled():
+    limiter = _limiter(ALGORITHM_FIXED_WINDOW)
+    limiter.set_load_controller(SimpleNamespace(multiplier=0.5))
+    assert limiter.get_group_limits("team").daily == 10**8
+    limiter.set_load_controller(SimpleNamespace(multiplier=1.0))
+    assert limiter.get_group_limits("team").rpm == 4
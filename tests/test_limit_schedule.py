@@ -0,0 +1,44 @@
+"""
+시간대 배수: 자정을 넘는 구간과 경계 시각 갱신
+"""
+from datetime import datetime
+
+from src.core.limit_schedule import LimitSchedule
+
+
+def _ts(day: int, hour: int, minute: int, second: int = 0) -> float:
+    return datetime(2026, 3, day, hour, minute, second).timestamp()
+
+
+def _schedule() -> LimitSchedule:
+    return LimitSchedule.from_config({
+        'work_hours': {'start_time': '09:00', 'end_time': '18:00', 'multiplier': 1.5},
+        'night_hours': {'start_time': '22:00', 'end_time': '06:00', 'multiplier': 0.5}
+    })
+
+
+def test_night_window_flips_across_midnight():
+    schedule = _schedule()
+    assert schedule.current(_ts(10, 21, 59, 30)) == 1.0
+    assert schedule._next_flip == _ts(10, 22, 0)
+
+    assert schedule.current(_ts(10, 22, 0)) == 0.5
+    assert schedule.active_windows == ('night_hours',)
+    # 다음 경계는 다음 날 06:00 (자정은 경계가 아님)
+    assert schedule._next_flip == _ts(11, 6, 0)
+
+    assert schedule.current(_ts(11, 0, 10)) == 0.5
+    assert schedule.current(_ts(11, 5, 59, 59)) == 0.5
+    assert schedule.current(_ts(11, 6, 0)) == 1.0
+    assert schedule.active_windows == ()
+    assert schedule._next_flip == _ts(11, 9, 0)
+
+
+def test_window_ending_at_24_00_covers_last_minute():
+    schedule = LimitSchedule.from_config({
+        'evening': {'start_time': '18:00', 'end_time': '24:00', 'multiplier': 0.8}
+    })
+    assert schedule.current(_ts(10, 23, 59, 59)) == 0.8
+    assert schedule.current(_ts(11, 0, 0)) == 1.0
+    assert schedule.current(_ts(11, 17, 59)) == 1.0
+    assert schedule.current(_ts(11, 18, 0)) == 0.8
@@ -0,0 +1,75 @@
+"""
+고부하 제어기: 게이트 없이도 진행 중 요청/지연으로 배수 전환, 유휴 시 복귀
+"""
+import asyncio
+
+from src.core.load_controller import LoadController, UpstreamGate
+
+
+def test_track_without_gate_activates_and_releases():
+    controller = LoadController(max_concurrent=2, trigger_threshold=80, reduced_multiplier=0.5,
+                                min_hold_seconds=0, max_response_time=60)
+
+    async def run():
+        entered = asyncio.Event()
+        release = asyncio.Event()
+
+        async def call():
+            async with controller.track():
+                entered.set()
+                await release.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(2)]
+        await entered.wait()
+        await asyncio.sleep(0)
+        during = controller.multiplier
+        release.set()
+        await asyncio.gather(*tasks)
+        return during
+
+    assert asyncio.run(run()) == 0.5
+    assert controller.in_flight == 0
+    assert controller.multiplier == 1.0
+
+
+def test_gate_feeds_controller():
+    controller = LoadController(max_concurrent=1, trigger_threshold=80, reduced_multiplier=0.5,
+                                min_hold_seconds=60, max_response_time=60)
+    gate = UpstreamGate(1, controller=controller)
+
+    async def run():
+        async with gate.slot():
+            return controller.multiplier
+
+    assert asyncio.run(run()) == 0.5
+
+
+def test_idle_controller_recovers_without_upstream_calls():
+    controller = LoadController(max_concurrent=100, trigger_threshold=80, release_threshold=60,
+                                reduced_multiplier=0.5, min_hold_seconds=10, max_response_time=1.0,
+                                latency_half_life=5.0)
+    controller.observe_latency(2.0, now=100.0)
+    controller.update(0, 0, now=100.0)
+    assert controller.active and controller._multiplier == 0.5
+
+    # 업스트림 호출 없이 시간만 흐름: EWMA 가 줄고 hold 가 지나야 복귀
+    controller.update(0, 0, now=106.0)
+    assert controller.active and controller.latency_ewma < 0.9
+    controller.update(0, 0, now=116.5)
+    assert not controller.active and controller._multiplier == 1.0
+
+
+def test_multiplier_read_refreshes_stale_load(monkeypatch):
+    controller = LoadController(max_concurrent=10, trigger_threshold=80, reduced_multiplier=0.5,
+                                min_hold_seconds=0, max_response_time=1.0, latency_half_life=1.0)
+    clock = [1000.0]
+    monkeypatch.setattr("src.core.load_controller.time.monotonic", lambda: clock[0])
+    controller.observe_latency(2.0)
+    controller.update(0, 0)
+    assert controller.multiplier == 0.5
+
+    # 다음 업스트림 호출 없이 제한기가 배수만 읽음 (1초 안에는 다시 계산하지 않음)
+    clock[0] += 0.5
+    assert controller.multiplier == 0.5
+    clock[0] += 2.5
+    assert controller.multiplier == 1.0
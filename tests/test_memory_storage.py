@@ -0,0 +1,64 @@
+"""
+메모리 저장소 확인 (바뀐 사용자만 스냅샷 복사, 늦게 도착한 일괄 기록)
+"""
+import asyncio
+import time
+
+from src.storage.memory_storage import MemoryStorage
+
+
+def test_snapshot_copies_only_dirty_users(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    storage = MemoryStorage(snapshot_path=path, snapshot_interval=0)
+
+    async def run():
+        await storage.record_usage_many([("u1", 10, 1, ()), ("u2", 20, 1, ())])
+        first = storage._snapshot_state()['users']
+        await storage.record_usage("u2", 5)
+        await storage.reset_user_usage("u3")
+        second = storage._snapshot_state()['users']
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second['u1'] is first['u1']
+    assert second['u2'] is not first['u2'] and second['u2'][1] == 25
+    assert 'u3' not in second
+
+
+def test_snapshot_round_trip_after_cleanup(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    storage = MemoryStorage(snapshot_path=path, snapshot_interval=0, user_retention_days=0)
+
+    async def run():
+        await storage.record_usage("old", 10)
+        await storage.save_snapshot()
+        storage._users["old"].last_request_time = 0.0
+        storage._users["old"].history.clear()
+        await storage.cleanup_expired_data()
+        await storage.record_usage("new", 7)
+        await storage.save_snapshot()
+
+    asyncio.run(run())
+    restored = MemoryStorage(snapshot_path=path, snapshot_interval=0)
+    assert list(restored._users) == ["new"]
+    assert restored._users["new"].total_tokens == 7
+    assert restored._snapshot_state()['users']['new'][1] == 7
+
+
+def test_late_batch_does_not_reset_current_windows():
+    storage = MemoryStorage()
+
+    async def run():
+        await storage.record_usage("u", 100, group_ids=("g",))
+        now = time.time()
+        # 다른 버퍼가 늦게 보낸 어제 기록
+        await storage.record_usage_many([("u", 5, 1, ("g",))], timestamp=now - 90000)
+        usage = await storage.get_user_usage("u", ("g",))
+        stats = await storage.get_usage_statistics()
+        return now, usage, stats
+
+    now, usage, stats = asyncio.run(run())
+    assert usage['tokens_today'] == 100 and usage['tokens_this_minute'] == 100
+    assert usage['groups']['g']['tokens_today'] == 100
+    assert usage['total_tokens'] == 105 and usage['last_request_time'] >= now - 1
+    assert stats['total_tokens_today'] == 100 and stats['active_users_today'] == 1
@@ -0,0 +1,28 @@
+"""
+토큰 메트릭의 그룹 레이블 (제한된 카디널리티)
+"""
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from src.utils.metrics import OTHER_LABEL, LimiterMetrics  # noqa: E402
+
+
+def _tokens(metrics, user, group, direction):
+    return metrics.registry.get_sample_value(
+        'korean_limiter_tokens_total', {'user': user, 'group': group, 'direction': direction})
+
+
+def test_token_metrics_carry_bounded_group_labels():
+    metrics = LimiterMetrics()
+    metrics.configure(max_user_labels=10, max_group_labels=2)
+    metrics.add_tokens("alice", 10, 5, ("team-a",))
+    metrics.add_tokens("bob", 3, 0, ("team-a", "team-b"))
+    metrics.add_tokens("carol", 1, 1)
+    metrics.add_tokens("dave", 2, 0, ("team-c",))
+
+    assert _tokens(metrics, "alice", "team-a", "in") == 10
+    assert _tokens(metrics, "alice", "team-a", "out") == 5
+    assert _tokens(metrics, "bob", "team-a,team-b", "in") == 3
+    assert _tokens(metrics, "carol", "", "in") == 1
+    assert _tokens(metrics, "dave", OTHER_LABEL, "in") == 2
@@ -0,0 +1,37 @@
+"""
+마이크로 배치: 전송 중인 배치 보관과 종료 시 정리
+"""
+import asyncio
+
+import httpx
+
+from src.proxy.micro_batcher import MicroBatcher
+
+
+def test_close_sends_pending_batches_and_waits_for_inflight():
+    sent = []
+
+    async def sender(payload):
+        sent.append(payload['prompt'])
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={
+            'choices': [{'index': i, 'text': 'ok'} for i in range(len(payload['prompt']))],
+            'usage': {'prompt_tokens': 4, 'completion_tokens': 2}
+        })
+
+    async def run():
+        batcher = MicroBatcher(sender, window_ms=60000, max_batch_size=2)
+        full = [asyncio.create_task(batcher.submit({'prompt': p, 'model': 'm'}, 'u')) for p in ('a', 'b')]
+        waiting = asyncio.create_task(batcher.submit({'prompt': 'c', 'model': 'm'}, 'u'))
+        await asyncio.sleep(0)
+        # 꽉 찬 배치는 전송 중이며 배처가 태스크를 보관
+        assert len(batcher._sending) == 1
+
+        await batcher.close()
+        results = await asyncio.gather(*full, waiting)
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert sent == [['a', 'b'], ['c']]
+    assert [status for status, _ in results] == [200, 200, 200]
+    assert not batcher._sending and batcher.get_stats()['pending_batches'] == 0
@@ -0,0 +1,57 @@
+"""
+근사 모드: 기록 중인 누적분 합산, 구간별 합산, flush 직렬화
+"""
+import asyncio
+
+from src.core.near_cache import NearCache
+from src.storage.memory_storage import MemoryStorage
+
+
+class SlowStorage(MemoryStorage):
+    """record_usage_many 가 release 될 때까지 대기하는 메모리 저장소"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.batches = []
+
+    async def record_usage_many(self, entries, timestamp=None):
+        self.batches.append(list(entries))
+        await self.release.wait()
+        await super().record_usage_many(entries, timestamp=timestamp)
+
+
+def test_inflight_deltas_are_merged_and_flush_is_serialized():
+    async def run():
+        storage = SlowStorage()
+        cache = NearCache(storage, flush_interval_ms=60000)
+        cache.record("u1", 100, 1)
+
+        first = asyncio.create_task(cache.flush())
+        second = asyncio.create_task(cache.flush())
+        await asyncio.sleep(0)
+
+        # 기록 중에도 조회 결과에 포함
+        usage = cache.merge_pending("u1", (), await storage.get_user_usage("u1"))
+        assert usage['tokens_this_minute'] == 100
+
+        storage.release.set()
+        await asyncio.gather(first, second)
+        await cache.close()
+        return storage
+
+    storage = asyncio.run(run())
+    assert len(storage.batches) == 1
+    assert asyncio.run(storage.get_user_usage("u1"))['total_tokens'] == 100
+
+
+def test_deltas_only_count_toward_their_own_window():
+    cache = NearCache(MemoryStorage())
+    now = 1_700_000_000.0
+    cache._buffer.record("u1", 50, 1, now=now - 120)
+    cache._buffer.record("u1", 7, 1, now=now)
+
+    usage = cache._buffer.merge_pending("u1", (), {}, now=now)
+    assert usage['tokens_this_minute'] == 7
+    assert usage['requests_this_minute'] == 1
+    assert usage['tokens_today'] == 57
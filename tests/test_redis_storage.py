@@ -0,0 +1,123 @@
+"""
+Redis 저장소 (fakeredis): 히스토리 조회 범위 제한, 이전 키 변환, 클러스터 해시 슬롯
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from redis.crc import key_slot  # noqa: E402
+
+from src.storage.redis_storage import RedisStorage  # noqa: E402
+
+
+def _storage(**kwargs) -> RedisStorage:
+    storage = RedisStorage("redis://localhost:6379", **kwargs)
+    storage.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return storage
+
+
+def test_user_history_scan_is_bounded():
+    storage = _storage(history_shards=1, history_scan_limit=600)
+    calls = []
+
+    async def run():
+        await storage.record_usage("active", 7)
+        pipe = storage.redis.pipeline(transaction=False)
+        for _ in range(2000):
+            storage._queue_history(pipe, "other", {'t': 1, 'r': 1}, 0.0)
+        await pipe.execute()
+
+        xrevrange = storage.redis.xrevrange
+
+        async def counting_xrevrange(*args, **kwargs):
+            calls.append(kwargs.get('count'))
+            return await xrevrange(*args, **kwargs)
+
+        storage.redis.xrevrange = counting_xrevrange
+        unknown = await storage.get_user_history("unknown", limit=10)
+        scanned = sum(calls)
+        active = await storage.get_user_history("active", limit=10)
+        return unknown, scanned, active
+
+    unknown, scanned, active = asyncio.run(run())
+    assert unknown == [] and scanned == 600
+    # 최근 2000건 뒤의 기록은 범위 밖이라 일부(여기서는 빈) 결과
+    assert active == []
+
+
+def test_user_history_returns_recent_entries():
+    storage = _storage(history_shards=1, history_scan_limit=600)
+
+    async def run():
+        for tokens in (1, 2, 3):
+            await storage.record_usage("u1", tokens)
+        return await storage.get_user_history("u1", limit=2)
+
+    history = asyncio.run(run())
+    assert [entry['tokens'] for entry in history] == [3, 2]
+
+
+def _hex(value: str) -> str:
+    return value.encode('utf-8').hex()
+
+
+def test_migrate_legacy_keys_once():
+    storage = _storage()
+    if time.time() % 60 > 58:
+        # 시드와 변환 사이에 분 구간이 바뀌지 않도록
+        time.sleep(2)
+    dt = datetime.fromtimestamp(time.time())
+    suffixes = (f"minute:{dt.strftime('%Y%m%d%H%M')}", f"hour:{dt.strftime('%Y%m%d%H')}",
+                f"day:{dt.strftime('%Y%m%d')}")
+
+    async def seed():
+        redis = storage.redis
+        user = _hex("사용자1")
+        await redis.hset(f"korean_user:{user}:info", mapping={
+            'total_tokens': 500, 'total_requests': 7, 'last_request_time': 123.0, 'cooldown_until': 0})
+        await redis.hset(f"korean_usage:{user}:{suffixes[0]}", mapping={'tokens': 30, 'requests': 2})
+        await redis.hset(f"korean_usage:{user}:{suffixes[1]}", mapping={'tokens': 80, 'requests': 4})
+        await redis.hset(f"korean_usage:{user}:{suffixes[2]}", mapping={'tokens': 200, 'requests': 5})
+        group = _hex("팀")
+        for suffix, tokens in zip(suffixes, (11, 22, 33)):
+            await redis.hset(f"korean_group_usage:{group}:{suffix}", mapping={'tokens': tokens, 'requests': 1})
+
+    async def run():
+        await seed()
+        first = await storage.migrate_legacy_keys()
+        usage = await storage.get_user_usage("사용자1", ("팀",))
+        leftover = [key async for key in storage.redis.scan_iter(match="korean_*")]
+        # 두 번째 실행은 표시 키 때문에 아무것도 하지 않음
+        await storage.redis.hset(f"korean_user:{_hex('늦게')}:info", mapping={'total_tokens': 1})
+        second = await storage.migrate_legacy_keys()
+        late = await storage.get_user_usage("늦게")
+        return first, usage, leftover, second, late
+
+    first, usage, leftover, second, late = asyncio.run(run())
+    assert first == 1 and second == 0
+    assert (usage['total_tokens'], usage['total_requests']) == (500, 7)
+    assert (usage['tokens_this_minute'], usage['requests_this_minute']) == (30, 2)
+    assert usage['tokens_this_hour'] == 80 and usage['tokens_today'] == 200
+    assert usage['groups']['팀']['tokens_today'] == 33
+    assert leftover == []
+    assert late['total_tokens'] == 0
+
+
+def test_per_user_keys_share_one_hash_slot():
+    storage = _storage(cluster=False)
+
+    async def run():
+        return await storage._get_user_number("사용자1", create=True)
+
+    number = asyncio.run(run())
+    user_keys = [storage._user_key(number)] + [
+        storage._gcra_key("사용자1", number, "사용자1", name) for name in ('rpm', 'tpm', 'tph', 'daily')]
+    group_keys = [storage._gcra_head_key("사용자1", number, "group:팀")] + [
+        storage._gcra_key("사용자1", number, "group:팀", name) for name in ('rpm', 'tpm', 'tph', 'daily')]
+
+    assert len({key_slot(key.encode()) for key in user_keys}) == 1
+    assert len({key_slot(key.encode()) for key in group_keys}) == 1
@@ -0,0 +1,65 @@
+"""
+SQLite 저장소 초기화 확인 (동시 초기화, 업그레이드 VACUUM 선택)
+"""
+import asyncio
+
+import aiosqlite
+
+from src.storage.sqlite_storage import SQLiteStorage
+
+
+def test_concurrent_first_requests_initialize_once(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "usage.db"))
+    calls = []
+    init_db = storage._init_db
+
+    async def counting_init_db():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        await init_db()
+
+    storage._init_db = counting_init_db
+
+    async def run():
+        await asyncio.gather(*(storage.get_user_usage(f"u{i}") for i in range(5)))
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_upgrade_vacuum_is_opt_in(tmp_path):
+    db_path = str(tmp_path / "old.db")
+
+    async def make_old_db():
+        async with aiosqlite.connect(db_path) as db:
+            await db.execute("CREATE TABLE legacy (x INTEGER)")
+            await db.commit()
+
+    async def auto_vacuum(vacuum_on_upgrade):
+        storage = SQLiteStorage(db_path, vacuum_on_upgrade=vacuum_on_upgrade)
+        await storage._ensure_initialized()
+        async with aiosqlite.connect(db_path) as db:
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            return (await cursor.fetchone())[0]
+
+    asyncio.run(make_old_db())
+    assert asyncio.run(auto_vacuum(False)) == 0
+    assert asyncio.run(auto_vacuum(True)) == 2
+
+
+def test_cleanup_queries_use_time_indexes(tmp_path):
+    db_path = str(tmp_path / "usage.db")
+
+    async def plans():
+        await SQLiteStorage(db_path)._ensure_initialized()
+        async with aiosqlite.connect(db_path) as db:
+            result = []
+            for query in ("SELECT group_id, bucket FROM korean_group_usage_minute WHERE bucket < 1 LIMIT 10",
+                          "SELECT state_key FROM korean_gcra_state WHERE tat < 1.0 LIMIT 10"):
+                cursor = await db.execute(f"EXPLAIN QUERY PLAN {query}")
+                result.append(" ".join(row[3] for row in await cursor.fetchall()))
+            return result
+
+    group_plan, gcra_plan = asyncio.run(plans())
+    assert "idx_korean_group_usage_minute_bucket" in group_plan
+    assert "idx_korean_gcra_state_tat" in gcra_plan
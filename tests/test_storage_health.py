@@ -0,0 +1,179 @@
+"""
+저장소 장애 시 저하 모드: 로컬 판정, 기록 실패 반영, 복구, Redis ping 로그
+"""
+import asyncio
+import logging
+
+import pytest
+
+from src.core.rate_limiter import KoreanRateLimiter, UserLimits
+from src.core.storage_health import DEGRADATION_CLOSED, StorageHealthChecker
+from src.core.usage_buffer import UsageBuffer
+from src.storage.memory_storage import MemoryStorage
+
+
+class DownStorage(MemoryStorage):
+    """down 동안 모든 조회/기록/ping 이 실패하는 메모리 저장소"""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("storage down")
+
+    async def ping(self):
+        return not self.down
+
+    async def get_user_usage(self, user_id, group_ids=()):
+        self._check()
+        return await super().get_user_usage(user_id, group_ids)
+
+    async def get_users_usage(self, user_ids=None):
+        self._check()
+        return await super().get_users_usage(user_ids)
+
+    async def record_usage(self, user_id, tokens, requests=1, group_ids=()):
+        self._check()
+        await super().record_usage(user_id, tokens, requests, group_ids)
+
+    async def record_usage_many(self, entries, timestamp=None):
+        self._check()
+        await super().record_usage_many(entries, timestamp=timestamp)
+
+
+def _limiter(storage, mode='local'):
+    limiter = KoreanRateLimiter(storage)
+    limiter.set_default_limits(UserLimits(rpm=2, tpm=10000, tph=100000, daily=1000000, cooldown_minutes=0))
+    health = StorageHealthChecker(storage, mode=mode, interval=0, failure_threshold=2, recovery_threshold=1)
+    limiter.set_storage_health(health)
+    return limiter, health
+
+
+def test_degraded_mode_applies_local_limits_and_recovers():
+    async def run():
+        storage = DownStorage()
+        limiter, health = _limiter(storage)
+        storage.down = True
+
+        results = []
+        for _ in range(3):
+            allowed, _ = await limiter.check_limit("u1", 10)
+            results.append(allowed)
+            if allowed:
+                await limiter.record_usage("u1", 5, 5)
+        assert not health.healthy
+        # 장애 중에도 로컬 메모리로 같은 rpm 제한 적용
+        assert results == [True, True, False]
+
+        storage.down = False
+        assert await health.check_once()
+        assert health.healthy
+        assert (await limiter.check_limit("u2", 10))[0]
+
+    asyncio.run(run())
+
+
+def test_closed_mode_rejects_during_outage():
+    async def run():
+        storage = DownStorage()
+        limiter, health = _limiter(storage, mode=DEGRADATION_CLOSED)
+        storage.down = True
+        await health.check_once()
+        await health.check_once()
+        return await limiter.check_limit("u1", 10)
+
+    allowed, message = asyncio.run(run())
+    assert not allowed and "장애" in message
+
+
+def test_record_failures_reach_health_checker():
+    async def run():
+        storage = DownStorage()
+        limiter, health = _limiter(storage)
+        storage.down = True
+        await limiter.record_usage("u1", 10, 10)
+        await limiter.record_usage("u1", 10, 10)
+        assert not health.healthy
+        # 기록하지 못한 사용량은 로컬 판정에 남음
+        assert (await health.fallback.get_user_usage("u1"))['tokens_this_minute'] == 40
+
+    asyncio.run(run())
+
+
+def test_buffer_flush_failures_reach_health_checker():
+    async def run():
+        storage = DownStorage()
+        limiter, health = _limiter(storage)
+        buffer = UsageBuffer(storage, flush_interval_ms=60000)
+        limiter.set_usage_buffer(buffer)
+        storage.down = True
+        for _ in range(2):
+            buffer.record("u1", 10, 1)
+            await buffer.flush()
+        assert not health.healthy and health.failures == 2
+
+    asyncio.run(run())
+
+
+def test_users_status_read_error_is_not_empty_result():
+    async def run():
+        storage = DownStorage()
+        limiter, _ = _limiter(storage)
+        storage.down = True
+        await limiter.get_users_status(["u1"])
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
+
+
+def test_redis_ping_logs_only_on_state_change(caplog):
+    fakeredis = pytest.importorskip("fakeredis")
+    from src.storage.redis_storage import RedisStorage
+
+    server = fakeredis.FakeServer()
+    storage = RedisStorage("redis://localhost:6379")
+    storage.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    async def run():
+        server.connected = False
+        results = [await storage.ping() for _ in range(3)]
+        with pytest.raises(Exception):
+            await storage.get_users_usage(["u1"])
+        server.connected = True
+        results.append(await storage.ping())
+        return results
+
+    with caplog.at_level(logging.INFO, logger="src.storage.redis_storage"):
+        results = asyncio.run(run())
+    assert results == [False, False, False, True]
+    ping_errors = [r for r in caplog.records if r.levelno == logging.ERROR and "ping" in r.getMessage()]
+    assert len(ping_errors) == 1
+    assert any("succeeded again" in r.getMessage() for r in caplog.records)
+
+
+def test_redis_startup_services_retry_until_redis_is_up(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import main
+    from src.storage.redis_storage import RedisStorage
+
+    server = fakeredis.FakeServer()
+    storage = RedisStorage("redis://localhost:6379")
+    storage.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    limiter = KoreanRateLimiter(storage)
+    monkeypatch.setattr(main, "storage", storage)
+    monkeypatch.setattr(main, "rate_limiter", limiter)
+    monkeypatch.setattr(main, "_redis_migrated", False)
+
+    async def run():
+        server.connected = False
+        assert not await main.start_redis_services()
+        assert limiter.cooldown_bus is None and not main._redis_migrated
+
+        server.connected = True
+        assert await main.start_redis_services()
+        assert main._redis_migrated and limiter.cooldown_bus is not None
+        await limiter.cooldown_bus.close()
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+"""
+업스트림 풀 헤징: 호출자 취소 시 요청 정리, 헤징 대상만 지연 표본에 포함
+"""
+import asyncio
+
+import httpx
+
+from src.proxy.upstream_pool import HedgingPolicy, UpstreamPool
+
+
+def _pool(handler) -> UpstreamPool:
+    pool = UpstreamPool(["http://a", "http://b"], hedging=HedgingPolicy(enabled=True, initial_delay_ms=1000))
+    pool._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return pool
+
+
+def test_cancelled_caller_cancels_primary_request():
+    cancelled = []
+
+    async def handler(request):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(request.url.host)
+            raise
+        return httpx.Response(200, json={})
+
+    async def run():
+        pool = _pool(handler)
+        caller = asyncio.create_task(pool.post("/v1/completions", {"max_tokens": 8}, hedge=True))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        try:
+            await caller
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0)
+        in_flight = [backend.in_flight for backend in pool.backends]
+        await pool.close()
+        return in_flight
+
+    in_flight = asyncio.run(run())
+    assert len(cancelled) == 1
+    assert in_flight == [0, 0]
+
+
+def test_only_hedge_eligible_requests_feed_hedge_delay():
+    async def handler(request):
+        return httpx.Response(200, json={})
+
+    async def run():
+        pool = _pool(handler)
+        for _ in range(5):
+            await pool.post("/v1/completions", {"max_tokens": 4096})
+        plain = len(pool._latencies)
+        for _ in range(3):
+            await pool.post("/v1/completions", {"max_tokens": 8}, hedge=True)
+        hedged = len(pool._latencies)
+        await pool.close()
+        return plain, hedged
+
+    assert asyncio.run(run()) == (0, 3)
@@ -0,0 +1,80 @@
+"""
+write-behind 버퍼: 기록 실패 시 재합산, 백오프, 장애당 한 번 로그, 미기록분 상한
+"""
+import asyncio
+import logging
+
+from src.core.usage_buffer import UsageBuffer
+from src.storage.memory_storage import MemoryStorage
+
+
+class FlakyStorage(MemoryStorage):
+    """failing 동안 record_usage_many 가 실패하는 메모리 저장소"""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+        self.attempts = 0
+
+    async def record_usage_many(self, entries, timestamp=None):
+        self.attempts += 1
+        if self.failing:
+            raise ConnectionError("storage down")
+        await super().record_usage_many(entries, timestamp=timestamp)
+
+
+def test_failed_flush_requeues_and_recovers():
+    async def run():
+        storage = FlakyStorage()
+        buffer = UsageBuffer(storage, flush_interval_ms=60000)
+        buffer.record("u1", 100, 1)
+        await buffer.flush()
+        buffer.record("u1", 50, 1)
+
+        # 실패분도 제한 확인에 계속 반영
+        usage = buffer.merge_pending("u1", (), await storage.get_user_usage("u1"))
+        assert usage['tokens_this_minute'] == 150
+
+        storage.failing = False
+        await buffer.flush()
+        assert (await storage.get_user_usage("u1"))['tokens_this_minute'] == 150
+        stats = buffer.get_stats()
+        assert stats['pending_users'] == 0 and stats['flush_errors'] == 1 and stats['retry_delay_ms'] == 0
+
+    asyncio.run(run())
+
+
+def test_flush_loop_backs_off_and_logs_once(caplog):
+    async def run():
+        storage = FlakyStorage()
+        buffer = UsageBuffer(storage, flush_interval_ms=1, retry_max_ms=40)
+        buffer.record("u1", 10, 1)
+        await asyncio.sleep(0.2)
+        attempts = storage.attempts
+        storage.failing = False
+        await buffer.close()
+        return attempts, buffer.get_stats()
+
+    with caplog.at_level(logging.INFO, logger="src.core.usage_buffer"):
+        attempts, stats = asyncio.run(run())
+    # 백오프 없이 1ms 마다 재시도했다면 200회 가까이 시도
+    assert 3 <= attempts <= 15
+    assert stats['pending_users'] == 0
+    errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert any("recovered" in r.getMessage() for r in caplog.records)
+
+
+def test_pending_is_bounded_during_outage():
+    async def run():
+        storage = FlakyStorage()
+        buffer = UsageBuffer(storage, flush_interval_ms=60000, max_pending_users=3)
+        for minute in range(4):
+            buffer.record(f"u{minute}", 10, 1, now=1_700_000_000 + minute * 60)
+            buffer.record(f"v{minute}", 10, 1, now=1_700_000_000 + minute * 60)
+            await buffer.flush()
+        return buffer.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats['pending_users'] <= 3
+    assert stats['dropped_users'] == 6 and stats['dropped_tokens'] == 60